@@ -5,17 +5,19 @@ Provides RAG-based responses with source citations
 """
 import os
 import sys
+import json
 import time
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Add src directory to path
 sys.path.append(str(Path(__file__).parent))
 
-from src.knowledge_base_loader import KnowledgeBaseLoader
-from src.rag_chatbot import RAGChatbot
+from src.server_state import ServerState
+from src.api_utils import batch_concurrency, batch_line, batch_questions_error, format_sources, session_id_error, sse_event
+from src.metrics import span
 
 # Load environment variables
 load_dotenv()
@@ -24,36 +26,54 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for browser access
 
 # Initialize knowledge base and chatbot
+# By default this happens in a background thread so the server can bind
+# immediately; /health reports 'warming' with progress until it is done.
 print("Initializing knowledge base...")
-kb_loader = KnowledgeBaseLoader(
-    knowledge_base_path="./knowledge_base",
-    persist_directory="./chroma_db"
+state = ServerState(
+    knowledge_base_path=os.getenv('KNOWLEDGE_BASE_PATH', "./knowledge_base"),
+    persist_directory=os.getenv('PERSIST_DIRECTORY', "./chroma_db"),
+    warmup_query=os.getenv('WARMUP_QUERY', 'Was ist BAföG?') or None
 )
+state.start(background=os.getenv('BACKGROUND_WARMUP', 'true').lower() == 'true')
 
-try:
-    vectorstore = kb_loader.setup()
-    print("Knowledge base loaded successfully!")
-except Exception as e:
-    print(f"Error loading knowledge base: {e}")
-    vectorstore = None
+
+def knowledge_base_unavailable():
+    """Error response while the knowledge base is warming up or failed to load"""
+    if state.status == 'warming':
+        return jsonify({
+            'error': 'Knowledge base is warming up, please retry shortly',
+            'status': 'warming',
+            'progress': state.health()['progress']
+        }), 503
+    return jsonify({
+        'error': 'Knowledge base not loaded'
+    }), 500
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'ok',
-        'knowledge_base_loaded': vectorstore is not None
-    })
+    return jsonify(state.health())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, stage timing, cache and token metrics in the Prometheus text format"""
+    return Response(state.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/usage', methods=['GET'])
+def usage():
+    """Token usage and cost per API key (hashed) and model, with budget status"""
+    return jsonify(state.usage_tracker.report())
 
 
 @app.route('/chat', methods=['POST'])
 def chat():
     """Chat endpoint that returns responses with source citations"""
-    if vectorstore is None:
-        return jsonify({
-            'error': 'Knowledge base not loaded'
-        }), 500
+    if not state.ready():
+        state.metrics.record_request('/chat', 0.0, error=True)
+        return knowledge_base_unavailable()
     
     data = request.json
     question = data.get('question')
@@ -69,56 +89,194 @@ def chat():
             'error': 'No API key provided'
         }), 400
     
+    # Optional: continue a conversation (the web UI sends one ID per chat)
+    session_id = data.get('session_id')
+    session_error = session_id_error(data)
+    if session_error:
+        return jsonify({
+            'error': session_error
+        }), 400
+    
     try:
         start_time = time.time()
         
-        # Create chatbot instance with provided API key
-        chatbot = RAGChatbot(vectorstore, api_key=api_key)
+        # Get pooled chatbot instance for the provided API key
+        chatbot = state.chatbot_pool.get(api_key)
         
         # Get answer with sources
-        result = chatbot.ask(question)
+        result = chatbot.ask(question, session_id=session_id)
+        timings = result.get('timings', {})
         
-        # Calculate response time
-        response_time = round(time.time() - start_time, 2)
-        
-        # Check if this is a non-BAföG question response
-        is_non_bafog = chatbot._is_non_bafog_response(result['answer'])
-        
-        # Format sources for response (only if BAföG-related)
-        sources = []
-        if not is_non_bafog:
-            seen_sources = set()
+        with span('format', timings, state.metrics):
+            # Check if this is a non-BAföG question response
+            is_non_bafog = chatbot._is_non_bafog_response(result['answer'])
             
-            for doc in result['sources']:
-                source_file = os.path.basename(doc.metadata.get('source', 'Unknown'))
-                url = doc.metadata.get('url', '')
-                
-                # Create unique identifier
-                source_id = f"{source_file}|{url}"
-                if source_id in seen_sources:
-                    continue
-                seen_sources.add(source_id)
-                
-                if url:
-                    sources.append({
-                        'name': source_file.replace('.txt', '').replace('-', ' ').title(),
-                        'url': url,
-                        'file': source_file
-                    })
+            # Format sources for response (only if BAföG-related)
+            sources = [] if is_non_bafog else format_sources(result['sources'])
         
-        return jsonify({
+        # Calculate response time
+        elapsed = time.time() - start_time
+        state.metrics.record_request('/chat', elapsed)
+        
+        response = {
             'answer': result['answer'],
             'sources': sources,
-            'token_usage': result.get('token_usage')
-        })
+            'token_usage': result.get('token_usage'),
+            'cache_hit': result.get('cache_hit', False),
+            'saved_token_usage': result.get('saved_token_usage'),
+            'faq_match': result.get('faq_match'),
+            'session_id': result.get('session_id'),
+            'response_time': round(elapsed, 2)
+        }
+        # Per-stage timings (seconds) on request
+        if data.get('debug'):
+            response['timings'] = timings
+        return jsonify(response)
     
     except Exception as e:
         print(f"Error processing question: {e}")
+        state.metrics.record_request('/chat', time.time() - start_time, error=True)
+        # Don't keep a chatbot around for a key that may be invalid
+        state.chatbot_pool.invalidate(api_key)
         return jsonify({
             'error': str(e)
         }), 500
 
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chat endpoint that streams sources, answer tokens and usage as server-sent events"""
+    if not state.ready():
+        state.metrics.record_request('/chat/stream', 0.0, error=True)
+        return knowledge_base_unavailable()
+    
+    data = request.json
+    question = data.get('question')
+    api_key = data.get('api_key')
+    
+    if not question:
+        return jsonify({
+            'error': 'No question provided'
+        }), 400
+    
+    if not api_key:
+        return jsonify({
+            'error': 'No API key provided'
+        }), 400
+    
+    # Optional: continue a conversation (the web UI sends one ID per chat)
+    session_id = data.get('session_id')
+    session_error = session_id_error(data)
+    if session_error:
+        return jsonify({
+            'error': session_error
+        }), 400
+    
+    def generate():
+        start_time = time.time()
+        try:
+            chatbot = state.chatbot_pool.get(api_key)
+            for event in chatbot.ask_stream(question, session_id=session_id):
+                if event['type'] == 'sources':
+                    yield sse_event('sources', {'sources': format_sources(event['sources'])})
+                elif event['type'] == 'token':
+                    yield sse_event('token', {'token': event['token']})
+                elif event['type'] == 'done':
+                    elapsed = time.time() - start_time
+                    state.metrics.record_request('/chat/stream', elapsed)
+                    yield sse_event('done', {
+                        'answer': event['answer'],
+                        'token_usage': event['token_usage'],
+                        'cache_hit': event.get('cache_hit', False),
+                        'saved_token_usage': event.get('saved_token_usage'),
+                        'faq_match': event.get('faq_match'),
+                        'session_id': event.get('session_id'),
+                        'timings': event['timings'],
+                        'response_time': round(elapsed, 2)
+                    })
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            state.metrics.record_request('/chat/stream', time.time() - start_time, error=True)
+            state.chatbot_pool.invalidate(api_key)
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer a list of questions, streaming one NDJSON line per result as it completes"""
+    if not state.ready():
+        state.metrics.record_request('/chat/batch', 0.0, error=True)
+        return knowledge_base_unavailable()
+    
+    data = request.json
+    questions = data.get('questions')
+    api_key = data.get('api_key')
+    
+    questions_error = batch_questions_error(questions)
+    if questions_error:
+        return jsonify({
+            'error': questions_error
+        }), 400
+    
+    if not api_key:
+        return jsonify({
+            'error': 'No API key provided'
+        }), 400
+    
+    def generate():
+        start_time = time.time()
+        errors = 0
+        try:
+            chatbot = state.chatbot_pool.get(api_key)
+            for item in chatbot.ask_batch(questions, max_concurrency=batch_concurrency(data.get('max_concurrency'))):
+                errors += 'error' in item
+                yield batch_line(chatbot, item)
+            state.metrics.record_request('/chat/batch', time.time() - start_time, error=errors > 0)
+        except Exception as e:
+            print(f"Error processing batch: {e}")
+            state.chatbot_pool.invalidate(api_key)
+            state.metrics.record_request('/chat/batch', time.time() - start_time, error=True)
+            yield json.dumps({'error': str(e)}) + "\n"
+            return
+        yield json.dumps({
+            'done': True,
+            'questions': len(questions),
+            'errors': errors,
+            'response_time': round(time.time() - start_time, 2)
+        }) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/sources', methods=['GET'])
+def sources():
+    """Citation lookup endpoint answering from the keyword citation index"""
+    if state.citation_index is None:
+        return jsonify({
+            'error': 'Citation index not loaded'
+        }), 500
+    
+    question = request.args.get('q', '').strip()
+    if not question:
+        return jsonify({
+            'error': 'No question provided'
+        }), 400
+    
+    start_time = time.time()
+    k = min(request.args.get('k', 3, type=int), 10)
+    sources = state.citation_index.lookup(question, k=k)
+    state.metrics.record_request('/sources', time.time() - start_time)
+    return jsonify({
+        'sources': sources
+    })
+
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -126,6 +284,11 @@ if __name__ == '__main__':
     print(f"\n🚀 Starting BAföG Chatbot API server on port {port}")
     print(f"   Health check: http://localhost:{port}/health")
     print(f"   Chat endpoint: http://localhost:{port}/chat")
+    print(f"   Streaming chat endpoint: http://localhost:{port}/chat/stream")
+    print(f"   Batch chat endpoint: http://localhost:{port}/chat/batch")
+    print(f"   Sources endpoint: http://localhost:{port}/sources?q=...")
+    print(f"   Metrics endpoint: http://localhost:{port}/metrics")
+    print(f"   Usage report: http://localhost:{port}/usage")
     print(f"   Debug mode: {debug_mode}")
     
     app.run(host='0.0.0.0', port=port, debug=debug_mode)
@@ -1,13 +1,16 @@
 // BAföG Chatbot Web Application
-// Client-side citations using keyword matching
+// Citations from the keyword citation index (via the backend /sources endpoint or client-side)
 
 class ChatbotApp {
     constructor() {
         this.apiKey = null;
         this.conversationHistory = [];
+        // The backend keeps the conversation per session (see /chat session_id)
+        this.sessionId = this.newSessionId();
         this.isProcessing = false;
-        this.knowledgeIndex = [];
+        this.knowledgeIndex = null;
         this.backendAvailable = false;
+        this.backendReachable = false;
         this.backendUrl = 'http://localhost:5000';
         
         // UI Elements
@@ -25,9 +28,6 @@ class ChatbotApp {
     }
     
     async init() {
-        // Load knowledge index for client-side citations
-        await this.loadKnowledgeIndex();
-        
         // Check if backend API is available (optional)
         await this.checkBackend();
         
@@ -75,118 +75,96 @@ class ChatbotApp {
             clearTimeout(timeoutId);
             
             if (response.ok) {
+                this.backendReachable = true;
                 const data = await response.json();
                 this.backendAvailable = data.status === 'ok' && data.knowledge_base_loaded;
                 console.log('Backend API available:', this.backendAvailable);
+                
+                // Backend is still loading the knowledge base: check again shortly
+                if (data.status === 'warming') {
+                    console.log(`Backend warming up (${Math.round(data.progress * 100)}%)`);
+                    setTimeout(() => this.checkBackend(), 2000);
+                }
             }
         } catch (error) {
             this.backendAvailable = false;
+            this.backendReachable = false;
             console.log('Backend API not available, using direct OpenRouter calls');
         }
     }
     
     async loadKnowledgeIndex() {
+        // Downloaded lazily, only when citations can't come from the backend
+        if (this.knowledgeIndex) {
+            return this.knowledgeIndex;
+        }
+        
         try {
             const response = await fetch('knowledge_base/knowledge_index.json');
             if (response.ok) {
                 this.knowledgeIndex = await response.json();
-                console.log('Knowledge index loaded:', this.knowledgeIndex.length, 'documents');
+                console.log('Knowledge index loaded:', this.knowledgeIndex.documents.length, 'documents');
             } else {
                 console.warn('Knowledge index not found, citations will not be available');
             }
         } catch (error) {
             console.error('Failed to load knowledge index:', error);
         }
+        return this.knowledgeIndex;
     }
     
-    findRelevantSources(question) {
+    async findRelevantSources(question) {
         /**
-         * Find relevant sources based on keyword matching
-         * This provides citations without needing a backend server
+         * Find relevant sources for a question
+         * Asks the backend /sources endpoint when it is reachable, otherwise
+         * scores the (lazily downloaded) citation index in the browser
          */
-        if (!this.knowledgeIndex || this.knowledgeIndex.length === 0) {
-            return [];
+        if (this.backendReachable) {
+            try {
+                const response = await fetch(`${this.backendUrl}/sources?q=${encodeURIComponent(question)}`);
+                if (response.ok) {
+                    const data = await response.json();
+                    return data.sources || [];
+                }
+            } catch (error) {
+                console.log('Backend /sources unavailable, using client-side citation index');
+            }
         }
         
-        // Extract keywords from question
-        const questionLower = question.toLowerCase();
-        
-        // English to German term mappings for better matching
-        const termMappings = {
-            'study': 'studium',
-            'studies': 'studium',
-            'application': 'antrag',
-            'apply': 'antrag',
-            'money': 'förderung',
-            'funding': 'förderung',
-            'age': 'altersgrenze',
-            'limit': 'grenze',
-            'abroad': 'ausland',
-            'foreign': 'ausland',
-            'income': 'einkommen',
-            'parents': 'eltern',
-            'repayment': 'rückzahlung',
-            'amount': 'höhe',
-            'loan': 'darlehen',
-            'grant': 'zuschuss',
-            'bafoeg': 'bafög',
-            'bafög': 'bafög'
-        };
-        
-        const questionWords = questionLower
-            .replace(/[^a-zäöüß\s]/g, ' ')
-            .split(/\s+/)
-            .filter(word => word.length > 2);
+        const index = await this.loadKnowledgeIndex();
+        if (!index) {
+            return [];
+        }
         
-        // Expand question words with German equivalents
-        const expandedWords = new Set(questionWords);
-        questionWords.forEach(word => {
-            if (termMappings[word]) {
-                expandedWords.add(termMappings[word]);
+        // Same tokenization and scoring as src/citation_index.py
+        const stopwords = new Set(index.stopwords);
+        const terms = new Set(
+            (question.toLowerCase().match(/[a-zäöüß]+/g) || [])
+                .filter(term => term.length > 2 && !stopwords.has(term))
+        );
+        Array.from(terms).forEach(term => {
+            if (index.synonyms[term]) {
+                terms.add(index.synonyms[term]);
             }
         });
         
-        // Score each document based on keyword matches
-        const scoredDocs = this.knowledgeIndex.map(doc => {
-            let score = 0;
-            
-            // Check each keyword in the document
-            doc.keywords.forEach(keyword => {
-                // Direct match with question words
-                expandedWords.forEach(qword => {
-                    if (keyword === qword) {
-                        score += 10; // Exact match
-                    } else if (keyword.includes(qword) && qword.length > 3) {
-                        score += 5; // Partial match
-                    } else if (qword.includes(keyword) && keyword.length > 3) {
-                        score += 3; // Word contains keyword
-                    }
-                });
+        const scores = new Map();
+        terms.forEach(term => {
+            (index.postings[term] || []).forEach(([docIndex, weight]) => {
+                scores.set(docIndex, (scores.get(docIndex) || 0) + weight);
             });
-            
-            // Bonus for matching document name
-            const docNameLower = doc.name.toLowerCase();
-            expandedWords.forEach(qword => {
-                if (docNameLower.includes(qword) && qword.length > 3) {
-                    score += 15;
-                }
-            });
-            
-            return { ...doc, score };
         });
         
-        // Sort by score and return top 3 relevant sources
-        const relevantSources = scoredDocs
-            .filter(doc => doc.score > 0)
-            .sort((a, b) => b.score - a.score)
-            .slice(0, 3)
-            .map(doc => ({
-                name: doc.name,
-                url: doc.url,
-                file: doc.file
-            }));
-        
-        return relevantSources;
+        // Fall back to general BAföG sources if nothing matched
+        const ranked = scores.size > 0
+            ? Array.from(scores.entries()).sort((a, b) => b[1] - a[1]).slice(0, 3).map(([docIndex]) => docIndex)
+            : index.default_sources.slice(0, 3);
+        
+        return ranked.map(docIndex => ({
+            name: index.documents[docIndex].name,
+            url: index.documents[docIndex].url,
+            file: index.documents[docIndex].file
+        }));
     }
     
     loadApiKey() {
@@ -241,8 +219,16 @@ class ChatbotApp {
         this.userInput.focus();
     }
     
+    newSessionId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    }
+    
     clearChat() {
         this.conversationHistory = [];
+        this.sessionId = this.newSessionId();
         this.messagesContainer.innerHTML = '';
         this.showEmptyPlaceholder();
     }
@@ -311,28 +297,7 @@ class ChatbotApp {
             if (this.backendAvailable) {
                 response = await this.callBackendAPI(message);
             } else {
-                // Get response from OpenRouter
-                response = await this.callOpenRouter(message);
-                // Add client-side citations based on keyword matching
-                let sources = this.findRelevantSources(message);
-                
-                // If no specific sources found, provide general BAföG information sources
-                if (sources.length === 0 && this.knowledgeIndex.length > 0) {
-                    sources = this.knowledgeIndex
-                        .filter(doc => 
-                            (doc.keywords && doc.keywords.includes('bafög')) ||
-                            (doc.name && doc.name.toLowerCase().includes('bafoeg')) ||
-                            (doc.name && doc.name.toLowerCase().includes('bafög'))
-                        )
-                        .slice(0, 2)
-                        .map(doc => ({
-                            name: doc.name,
-                            url: doc.url,
-                            file: doc.file
-                        }));
-                }
-                
-                response.sources = sources;
+                response = await this.callOpenRouterWithCitations(message);
             }
             
             // Calculate response time
@@ -358,36 +323,106 @@ class ChatbotApp {
     
     async callBackendAPI(userMessage) {
         try {
-            const response = await fetch(`${this.backendUrl}/chat`, {
+            const response = await fetch(`${this.backendUrl}/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
                     question: userMessage,
-                    api_key: this.apiKey
+                    api_key: this.apiKey,
+                    session_id: this.sessionId
                 })
             });
             
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 // If backend fails, fall back to direct OpenRouter
                 console.log('Backend API failed, falling back to direct OpenRouter');
                 this.backendAvailable = false;
-                return await this.callOpenRouter(userMessage);
+                return await this.callOpenRouterWithCitations(userMessage);
             }
             
-            const data = await response.json();
-            return {
-                answer: data.answer,
-                sources: data.sources || [],
-                tokenUsage: data.token_usage
-            };
+            return await this.readAnswerStream(response);
         } catch (error) {
             // If backend is unreachable, fall back to direct OpenRouter
             console.log('Backend API unreachable, falling back to direct OpenRouter');
             this.backendAvailable = false;
-            return await this.callOpenRouter(userMessage);
+            return await this.callOpenRouterWithCitations(userMessage);
+        }
+    }
+    
+    async readAnswerStream(response) {
+        /**
+         * Consume the server-sent events from /chat/stream
+         * Sources arrive first, then answer tokens (shown live), then usage
+         */
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const streamingMessage = this.addStreamingMessage();
+        let buffer = '';
+        let answer = '';
+        let sources = [];
+        let tokenUsage = null;
+        
+        try {
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                
+                for (const rawEvent of events) {
+                    const event = this.parseServerSentEvent(rawEvent);
+                    if (!event) continue;
+                    
+                    if (event.type === 'sources') {
+                        sources = event.data.sources || [];
+                    } else if (event.type === 'token') {
+                        answer += event.data.token;
+                        streamingMessage.textContent = answer;
+                    } else if (event.type === 'done') {
+                        answer = event.data.answer;
+                        tokenUsage = event.data.token_usage;
+                    } else if (event.type === 'error') {
+                        throw new Error(event.data.error);
+                    }
+                }
+            }
+        } finally {
+            // The final message is rendered (with markdown and sources) by sendMessage
+            streamingMessage.parentElement.remove();
         }
+        
+        return {
+            answer: answer,
+            sources: sources,
+            tokenUsage: tokenUsage
+        };
+    }
+    
+    parseServerSentEvent(rawEvent) {
+        let type = 'message';
+        const dataLines = [];
+        
+        rawEvent.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        
+        if (dataLines.length === 0) return null;
+        return { type: type, data: JSON.parse(dataLines.join('\n')) };
+    }
+    
+    async callOpenRouterWithCitations(userMessage) {
+        // Get response from OpenRouter and add citations from the citation index
+        const response = await this.callOpenRouter(userMessage);
+        response.sources = await this.findRelevantSources(userMessage);
+        return response;
     }
     
     async callOpenRouter(userMessage) {
@@ -481,7 +516,7 @@ When providing information, if you have specific knowledge from documents, menti
         // Return answer (sources will be added by sendMessage using client-side matching)
         return {
             answer: assistantMessage,
-            sources: [], // Will be populated by findRelevantSources in sendMessage
+            sources: [], // Will be populated by findRelevantSources in callOpenRouterWithCitations
             tokenUsage: tokenUsage
         };
     }
@@ -560,6 +595,20 @@ When providing information, if you have specific knowledge from documents, menti
         });
     }
     
+    addStreamingMessage() {
+        // Placeholder bot message that shows tokens while they arrive
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'message bot-message';
+        
+        const contentDiv = document.createElement('div');
+        contentDiv.className = 'message-content';
+        
+        messageDiv.appendChild(contentDiv);
+        this.messagesContainer.appendChild(messageDiv);
+        
+        return contentDiv;
+    }
+    
     addErrorMessage(errorText) {
         const messageDiv = document.createElement('div');
         messageDiv.className = 'message error-message';
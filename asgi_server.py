@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+ASGI API Server for BAföG Chatbot
+Asyncio-based alternative to api_server.py with the same endpoints.
+Retrieval runs in a bounded thread pool and LLM calls are awaited on a
+shared, connection-pooled HTTP client, so a slow OpenRouter round-trip
+does not pin a worker thread.
+
+Run with:
+    uvicorn asgi_server:app --port 5000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+# Add src directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from src.server_state import ServerState
+from src.api_utils import batch_concurrency, batch_line, batch_questions_error, format_sources, session_id_error, sse_event
+from src.metrics import span
+
+# Load environment variables
+load_dotenv()
+
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', "https://openrouter.ai/api/v1")
+# Attempts after a rate-limit (HTTP 429) response before the request fails
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 5))
+
+# Initialize knowledge base and chatbot (in the background by default,
+# /health reports 'warming' with progress until it is done)
+print("Initializing knowledge base...")
+state = ServerState(
+    knowledge_base_path=os.getenv('KNOWLEDGE_BASE_PATH', "./knowledge_base"),
+    persist_directory=os.getenv('PERSIST_DIRECTORY', "./chroma_db"),
+    warmup_query=os.getenv('WARMUP_QUERY', 'Was ist BAföG?') or None
+)
+state.start(background=os.getenv('BACKGROUND_WARMUP', 'true').lower() == 'true')
+
+# Embedding, vector search, context building and cache writes block: keep them off the event loop
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RETRIEVAL_THREADS', 4)),
+    thread_name_prefix='retrieval'
+)
+
+# Shared HTTP client with keep-alive connections to OpenRouter
+http_client = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global http_client
+    http_client = httpx.AsyncClient(
+        base_url=OPENROUTER_BASE_URL,
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', 200)),
+            max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE', 50))
+        )
+    )
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+        retrieval_executor.shutdown(wait=False)
+
+
+async def run_blocking(func, *args):
+    """Run a blocking function in the retrieval thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, func, *args)
+
+
+def completion_request(chatbot, prompt, api_key, stream=False):
+    """Arguments for an OpenRouter completion matching the chatbot's LLM settings"""
+    return {
+        'url': '/completions',
+        'headers': {'Authorization': f"Bearer {api_key}"},
+        'json': {
+            'model': chatbot.model,
+            'prompt': prompt,
+            'temperature': chatbot.llm.temperature,
+            'max_tokens': chatbot.llm.max_tokens,
+            'stream': stream,
+            # Ask OpenRouter to report the cost of the call with its usage
+            'usage': {'include': True},
+            # Ask for a final chunk with token usage when streaming
+            **({'stream_options': {'include_usage': True}} if stream else {})
+        }
+    }
+
+
+async def send_completion(chatbot, prompt, api_key, stream=False):
+    """
+    Send a completion request to OpenRouter and return the response
+    A rate-limit (HTTP 429) response pauses the API key's LLM calls for its
+    Retry-After (at least an exponentially growing delay) and retries, like
+    RAGChatbot._generate_with_backoff. A streamed response must be closed.
+    """
+    delay = 1.0
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        wait = chatbot._pause_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        request = http_client.build_request('POST', **completion_request(chatbot, prompt, api_key, stream))
+        response = await http_client.send(request, stream=stream)
+        try:
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            await response.aclose()
+            retry_after = chatbot._rate_limit_delay(e)
+            if retry_after is None or attempt == LLM_MAX_RETRIES:
+                raise
+            chatbot._pause_llm_calls(max(retry_after, delay))
+            delay *= 2
+
+
+async def read_json(request):
+    """JSON object of a request body, {} if the body is missing or not JSON, None if not an object"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else None
+
+
+async def parse_request(request):
+    """Validate a chat request; returns (request data, error response)"""
+    if state.status == 'warming':
+        state.metrics.record_request(request.url.path, 0.0, error=True)
+        return None, JSONResponse({
+            'error': 'Knowledge base is warming up, please retry shortly',
+            'status': 'warming',
+            'progress': state.health()['progress']
+        }, status_code=503)
+    if not state.ready():
+        state.metrics.record_request(request.url.path, 0.0, error=True)
+        return None, JSONResponse({'error': 'Knowledge base not loaded'}, status_code=500)
+
+    data = await read_json(request)
+    if data is None:
+        return None, JSONResponse({'error': 'Request body must be a JSON object'}, status_code=400)
+    question = data.get('question')
+    api_key = data.get('api_key')
+
+    if not question:
+        return None, JSONResponse({'error': 'No question provided'}, status_code=400)
+    if not api_key:
+        return None, JSONResponse({'error': 'No API key provided'}, status_code=400)
+    session_error = session_id_error(data)
+    if session_error:
+        return None, JSONResponse({'error': session_error}, status_code=400)
+    return data, None
+
+
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse(state.health())
+
+
+async def metrics(request):
+    """Request, stage timing, cache and token metrics in the Prometheus text format"""
+    return PlainTextResponse(state.metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+async def usage_report(request):
+    """Token usage and cost per API key (hashed) and model, with budget status"""
+    return JSONResponse(state.usage_tracker.report())
+
+
+async def chat(request):
+    """Chat endpoint that returns responses with source citations"""
+    data, error = await parse_request(request)
+    if error:
+        return error
+    question, api_key = data['question'], data['api_key']
+
+    start_time = time.time()
+    timings = {}
+    try:
+        chatbot = await run_blocking(state.chatbot_pool.get, api_key)
+
+        with span('history', timings, state.metrics):
+            history = await run_blocking(chatbot.load_history, data.get('session_id'))
+            query = chatbot.retrieval_query(question, history)
+        with span('embedding', timings, state.metrics):
+            embedding = await run_blocking(chatbot.embed_question, query)
+        with span('cache', timings, state.metrics):
+            result, embedding = await run_blocking(chatbot.check_cache, query, embedding, history)
+        if result is None:
+            with span('retrieval', timings, state.metrics):
+                documents = await run_blocking(chatbot.retrieve, query, embedding)
+            with span('context', timings, state.metrics):
+                documents = await run_blocking(chatbot.build_context, query, documents)
+            with span('prompt', timings, state.metrics):
+                prompt = chatbot.build_prompt(question, documents, history)
+
+            with span('llm', timings, state.metrics):
+                response = await send_completion(chatbot, prompt, api_key)
+                completion = response.json()
+
+            answer = completion['choices'][0]['text']
+            result = {
+                'answer': answer,
+                'sources': documents,
+                'token_usage': chatbot._provider_usage({'token_usage': completion.get('usage')})
+                or chatbot._estimate_token_usage(prompt, answer),
+                'cache_hit': False
+            }
+            chatbot.record_usage(result['token_usage'])
+            # May write ANSWER_CACHE_PATH to disk
+            await run_blocking(chatbot.remember, query, embedding, result, history)
+        await run_blocking(chatbot.save_turn, history, question, result['answer'])
+
+        with span('format', timings, state.metrics):
+            is_non_bafog = chatbot._is_non_bafog_response(result['answer'])
+            sources = [] if is_non_bafog else format_sources(result['sources'])
+
+        elapsed = time.time() - start_time
+        state.metrics.record_request('/chat', elapsed)
+        body = {
+            'answer': result['answer'],
+            'sources': sources,
+            'token_usage': result.get('token_usage'),
+            'cache_hit': result.get('cache_hit', False),
+            'saved_token_usage': result.get('saved_token_usage'),
+            'faq_match': result.get('faq_match'),
+            'session_id': data.get('session_id') if history is not None else None,
+            'response_time': round(elapsed, 2)
+        }
+        # Per-stage timings (seconds) on request
+        if data.get('debug'):
+            body['timings'] = timings
+        return JSONResponse(body)
+
+    except Exception as e:
+        print(f"Error processing question: {e}")
+        state.metrics.record_request('/chat', time.time() - start_time, error=True)
+        state.chatbot_pool.invalidate(api_key)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def chat_stream(request):
+    """Chat endpoint that streams sources, answer tokens and usage as server-sent events"""
+    data, error = await parse_request(request)
+    if error:
+        return error
+    question, api_key = data['question'], data['api_key']
+
+    async def generate():
+        start_time = time.time()
+        timings = {}
+        try:
+            chatbot = await run_blocking(state.chatbot_pool.get, api_key)
+
+            with span('history', timings, state.metrics):
+                history = await run_blocking(chatbot.load_history, data.get('session_id'))
+                query = chatbot.retrieval_query(question, history)
+                session_id = data.get('session_id') if history is not None else None
+            with span('embedding', timings, state.metrics):
+                embedding = await run_blocking(chatbot.embed_question, query)
+            with span('cache', timings, state.metrics):
+                cached, embedding = await run_blocking(chatbot.check_cache, query, embedding, history)
+            if cached:
+                await run_blocking(chatbot.save_turn, history, question, cached['answer'])
+                state.metrics.record_request('/chat/stream', time.time() - start_time)
+                yield sse_event('sources', {'sources': format_sources(cached['sources'])})
+                yield sse_event('token', {'token': cached['answer']})
+                yield sse_event('done', {
+                    'answer': cached['answer'],
+                    'token_usage': None,
+                    'cache_hit': cached.get('cache_hit', False),
+                    'saved_token_usage': cached.get('saved_token_usage'),
+                    'faq_match': cached.get('faq_match'),
+                    'session_id': session_id,
+                    'timings': timings,
+                    'response_time': round(time.time() - start_time, 2)
+                })
+                return
+
+            with span('retrieval', timings, state.metrics):
+                documents = await run_blocking(chatbot.retrieve, query, embedding)
+            with span('context', timings, state.metrics):
+                documents = await run_blocking(chatbot.build_context, query, documents)
+            yield sse_event('sources', {'sources': format_sources(documents)})
+
+            prompt = chatbot.build_prompt(question, documents, history)
+            answer_parts = []
+            usage = None
+            llm_start = time.perf_counter()
+            response = await send_completion(chatbot, prompt, api_key, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == '[DONE]':
+                        break
+                    chunk = json.loads(payload)
+                    usage = chunk.get('usage') or usage
+                    choices = chunk.get('choices') or [{}]
+                    token = choices[0].get('text')
+                    if token:
+                        if not answer_parts:
+                            timings['first_token'] = round(time.time() - start_time, 4)
+                        answer_parts.append(token)
+                        yield sse_event('token', {'token': token})
+            finally:
+                await response.aclose()
+            timings['llm'] = round(time.perf_counter() - llm_start, 4)
+            state.metrics.observe('bafog_stage_duration_seconds', timings['llm'], stage='llm')
+
+            answer = ''.join(answer_parts)
+            result = {
+                'answer': answer,
+                'sources': documents,
+                'token_usage': chatbot._provider_usage({'token_usage': usage})
+                or chatbot._estimate_token_usage(prompt, answer),
+                'cache_hit': False
+            }
+            chatbot.record_usage(result['token_usage'])
+            # May write ANSWER_CACHE_PATH to disk
+            await run_blocking(chatbot.remember, query, embedding, result, history)
+            await run_blocking(chatbot.save_turn, history, question, answer)
+
+            elapsed = time.time() - start_time
+            state.metrics.record_request('/chat/stream', elapsed)
+            yield sse_event('done', {
+                'answer': answer,
+                'token_usage': result['token_usage'],
+                'cache_hit': False,
+                'saved_token_usage': None,
+                'faq_match': None,
+                'session_id': session_id,
+                'timings': timings,
+                'response_time': round(elapsed, 2)
+            })
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            state.metrics.record_request('/chat/stream', time.time() - start_time, error=True)
+            state.chatbot_pool.invalidate(api_key)
+            yield sse_event('error', {'error': str(e)})
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def chat_batch(request):
+    """Answer a list of questions, streaming one NDJSON line per result as it completes"""
+    if not state.ready():
+        state.metrics.record_request('/chat/batch', 0.0, error=True)
+        return JSONResponse({'error': 'Knowledge base not loaded', 'status': state.status}, status_code=503)
+
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse({'error': 'Request body must be a JSON object'}, status_code=400)
+    questions = data.get('questions')
+    api_key = data.get('api_key')
+
+    questions_error = batch_questions_error(questions)
+    if questions_error:
+        return JSONResponse({'error': questions_error}, status_code=400)
+    if not api_key:
+        return JSONResponse({'error': 'No API key provided'}, status_code=400)
+
+    def generate():
+        # A plain generator: Starlette iterates it in its thread pool, so the
+        # batched embedding, searches and LLM threads never block the event loop
+        start_time = time.time()
+        errors = 0
+        try:
+            chatbot = state.chatbot_pool.get(api_key)
+            for item in chatbot.ask_batch(questions, max_concurrency=batch_concurrency(data.get('max_concurrency'))):
+                errors += 'error' in item
+                yield batch_line(chatbot, item)
+            state.metrics.record_request('/chat/batch', time.time() - start_time, error=errors > 0)
+        except Exception as e:
+            print(f"Error processing batch: {e}")
+            state.chatbot_pool.invalidate(api_key)
+            state.metrics.record_request('/chat/batch', time.time() - start_time, error=True)
+            yield json.dumps({'error': str(e)}) + "\n"
+            return
+        yield json.dumps({
+            'done': True,
+            'questions': len(questions),
+            'errors': errors,
+            'response_time': round(time.time() - start_time, 2)
+        }) + "\n"
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+async def sources(request):
+    """Citation lookup endpoint answering from the keyword citation index"""
+    if state.citation_index is None:
+        return JSONResponse({'error': 'Citation index not loaded'}, status_code=500)
+
+    question = request.query_params.get('q', '').strip()
+    if not question:
+        return JSONResponse({'error': 'No question provided'}, status_code=400)
+
+    start_time = time.time()
+    try:
+        k = min(int(request.query_params.get('k', 3)), 10)
+    except ValueError:
+        k = 3
+    sources = state.citation_index.lookup(question, k=k)
+    state.metrics.record_request('/sources', time.time() - start_time)
+    return JSONResponse({'sources': sources})
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/chat', chat, methods=['POST']),
+        Route('/chat/stream', chat_stream, methods=['POST']),
+        Route('/chat/batch', chat_batch, methods=['POST']),
+        Route('/sources', sources, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/usage', usage_report, methods=['GET']),
+    ],
+    middleware=[
+        # Enable CORS for browser access
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 5000))
+
+    print(f"\n🚀 Starting BAföG Chatbot ASGI server on port {port}")
+    print(f"   Health check: http://localhost:{port}/health")
+    print(f"   Chat endpoint: http://localhost:{port}/chat")
+
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the BAföG RAG Chatbot
+Times each stage of the ask() hot path in isolation and end-to-end, with the
+LLM replaced by a local fake server, across retrieval k, chunking strategies,
+chunk sizes and synthetically scaled copies of the knowledge base.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --k 1,3,5 --chunk-sizes 500,1000 --scales 1,4,16
+    python benchmark.py --strategies recursive,structured --k 1,3
+    python benchmark.py --output results.json --baseline previous.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add src directory to path
+sys.path.append(str(Path(__file__).parent))
+
+from evaluate import load_cases, percentiles
+
+STAGES = ['embedding', 'search', 'context', 'prompt', 'llm', 'format_sources', 'end_to_end']
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def parse_names(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def scale_corpus(source_dir, target_dir, scale):
+    """
+    Copy the knowledge base `scale` times into target_dir
+    Copies keep their text (so the embedding cache makes rebuilds cheap) but
+    get distinct file names, so the index holds `scale` times as many chunks.
+    """
+    source_dir = Path(source_dir)
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    mapping_file = source_dir / "url_mapping.json"
+    url_mapping = json.loads(mapping_file.read_text(encoding='utf-8')) if mapping_file.exists() else {}
+    scaled_mapping = {}
+
+    for path in sorted(source_dir.glob("*.txt")):
+        for copy in range(scale):
+            name = path.name if copy == 0 else f"{path.stem}__copy{copy}.txt"
+            shutil.copyfile(path, target_dir / name)
+            if path.name in url_mapping:
+                scaled_mapping[name] = url_mapping[path.name]
+
+    with open(target_dir / "url_mapping.json", 'w', encoding='utf-8') as f:
+        json.dump(scaled_mapping, f, ensure_ascii=False)
+
+
+def time_call(timings, stage, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage].append(time.perf_counter() - start)
+    return result
+
+
+def benchmark_config(kb_loader, vectorstore, llm, questions, k, repeat):
+    """Time every stage for one (corpus, chunk size, k) configuration"""
+    from src.rag_chatbot import RAGChatbot
+    from src.api_utils import format_sources
+    from src.embedding_cache import CachedEmbeddings
+
+    chatbot = RAGChatbot(vectorstore, kb_loader=kb_loader, k=k, llm=llm, retrieval_mode='similarity')
+    timings = {stage: [] for stage in STAGES}
+    prompt_chars = []
+
+    # The uncached model: the query LRU in CachedEmbeddings would hide repeats
+    embeddings = kb_loader.embedding_pipeline
+    # ask() embeds through the vector store's CachedEmbeddings; its query LRU
+    # is emptied before every end-to-end call so each one embeds again
+    query_cache = kb_loader.embeddings if isinstance(kb_loader.embeddings, CachedEmbeddings) else None
+
+    for _ in range(repeat):
+        for question in questions:
+            vector = time_call(timings, 'embedding', embeddings.embed_query, question)
+            documents = time_call(timings, 'search', vectorstore.similarity_search_by_vector, vector, k)
+            context = time_call(timings, 'context', chatbot.build_context, question, documents)
+            prompt = time_call(timings, 'prompt', chatbot.build_prompt, question, context)
+            time_call(timings, 'llm', llm.invoke, prompt)
+            time_call(timings, 'format_sources', format_sources, context)
+            if query_cache:
+                query_cache.clear_queries()
+            time_call(timings, 'end_to_end', chatbot.ask, question)
+            prompt_chars.append(len(prompt))
+
+    return {
+        'stages_ms': {stage: percentiles(values) for stage, values in timings.items()},
+        'mean_prompt_chars': round(sum(prompt_chars) / len(prompt_chars))
+    }
+
+
+def run_key(run):
+    # Results from before chunking strategies were benchmarked used 'recursive'
+    return (run.get('strategy', 'recursive'), run['chunk_size'], run['scale'], run['k'])
+
+
+def compare(results, baseline, tolerance):
+    """Return stage p50 regressions versus a previous results file"""
+    previous = {run_key(run): run for run in baseline['runs']}
+    regressions = []
+    for run in results['runs']:
+        old = previous.get(run_key(run))
+        if not old:
+            continue
+        for stage, stats in run['stages_ms'].items():
+            old_stats = old['stages_ms'].get(stage)
+            if not old_stats or not old_stats['p50']:
+                continue
+            change = stats['p50'] / old_stats['p50'] - 1
+            if change > tolerance:
+                regressions.append({
+                    'strategy': run_key(run)[0], 'chunk_size': run['chunk_size'], 'scale': run['scale'], 'k': run['k'],
+                    'stage': stage, 'baseline_p50': old_stats['p50'], 'p50': stats['p50'],
+                    'change': round(change, 3)
+                })
+    return regressions
+
+
+def print_run(run):
+    print(f"\nstrategy={run['strategy']} chunk_size={run['chunk_size']} scale={run['scale']} k={run['k']} "
+          f"({run['chunks']} chunks, ~{run['mean_prompt_chars']} prompt chars)")
+    for stage, stats in run['stages_ms'].items():
+        print(f"  {stage:<15} p50 {stats['p50']:>9}  p95 {stats['p95']:>9}  "
+              f"p99 {stats['p99']:>9}  max {stats['max']:>9} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the RAG hot path stage by stage')
+    parser.add_argument('--k', type=parse_list, default=[1, 3, 5], help='Comma-separated k values')
+    parser.add_argument('--strategies', type=parse_names, default=['structured'],
+                        help='Comma-separated chunking strategies (recursive, structured)')
+    parser.add_argument('--chunk-sizes', type=parse_list, default=[500, 1000, 2000],
+                        help='Comma-separated chunk sizes (overlap is 10%%)')
+    parser.add_argument('--scales', type=parse_list, default=[1, 4],
+                        help='Comma-separated corpus multipliers')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the questions per configuration')
+    parser.add_argument('--csv', default='evaluation.csv', help='Questions to replay')
+    parser.add_argument('--kb-path', default='./knowledge_base')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Fake LLM time to first token (s)')
+    parser.add_argument('--llm-tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--llm-completion-tokens', type=int, default=50)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed p50 slowdown versus the baseline before failing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    from langchain_community.llms import OpenAI
+    from src.fake_llm_server import FakeLLMServer
+    from src.knowledge_base_loader import KnowledgeBaseLoader
+
+    questions = [case['question'] for case in load_cases(args.csv)]
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'questions': len(questions),
+            'repeat': args.repeat,
+            'llm_latency': args.llm_latency,
+            'llm_tokens_per_second': args.llm_tokens_per_second,
+            'llm_completion_tokens': args.llm_completion_tokens
+        },
+        'runs': []
+    }
+
+    work_dir = tempfile.mkdtemp(prefix='bafoeg_benchmark_')
+    server = FakeLLMServer(
+        latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        completion_tokens=args.llm_completion_tokens
+    ).start()
+    try:
+        llm = OpenAI(api_key='benchmark', base_url=server.url, model='fake', temperature=0.7)
+
+        for scale in args.scales:
+            kb_path = os.path.join(work_dir, f"kb_x{scale}")
+            scale_corpus(args.kb_path, kb_path, scale)
+
+            for strategy in args.strategies:
+                for chunk_size in args.chunk_sizes:
+                    print(f"\n=== Building index: scale x{scale}, {strategy} chunks of {chunk_size} ===")
+                    kb_loader = KnowledgeBaseLoader(
+                        knowledge_base_path=kb_path,
+                        persist_directory=os.path.join(work_dir, f"db_x{scale}_{strategy}_{chunk_size}"),
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_size // 10,
+                        chunking_strategy=strategy
+                    )
+                    vectorstore = kb_loader.setup()
+                    chunks = len(kb_loader.lexical_index.ids)
+                    # Repeats must pay for embedding and search every time, FAQ
+                    # questions must not skip the pipeline, and retrieval is the
+                    # plain top-k (evaluate.py --rerank compare measures reranking)
+                    kb_loader.retrieval_cache = None
+                    kb_loader.faq_store = None
+                    kb_loader.reranker = None
+
+                    for k in args.k:
+                        run = {'strategy': strategy, 'chunk_size': chunk_size, 'scale': scale, 'k': k,
+                               'chunks': chunks}
+                        run.update(benchmark_config(kb_loader, vectorstore, llm, questions, k, args.repeat))
+                        results['runs'].append(run)
+                        print_run(run)
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results['regressions'] = regressions
+        print(f"\n=== {len(regressions)} regression(s) versus {args.baseline} ===")
+        for r in regressions:
+            print(f"  {r['stage']} (strategy={r['strategy']} chunk_size={r['chunk_size']} scale={r['scale']} k={r['k']}): "
+                  f"{r['baseline_p50']} → {r['p50']} ms p50 (+{r['change']:.0%})")
+        exit_code = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
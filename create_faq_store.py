@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Create the FAQ answer store
+Extracts the question/answer pairs of the knowledge base (the FAQ page and the
+one-question pages such as gibt-es-eine-altersgrenze.txt), embeds the
+questions and writes knowledge_base/faq_store.json. RAGChatbot answers user
+questions that match one of them with the canonical answer, without an LLM call.
+
+Run again after changing EMBEDDING_BACKEND; "python kb_manager.py sync"
+rebuilds an existing store. A stale store is ignored.
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.faq_store import FaqStore, FAQ_STORE_FILE, extract_faq
+from src.knowledge_base_loader import KnowledgeBaseLoader
+
+
+def create_faq_store(knowledge_base_path="./knowledge_base", kb_loader=None):
+    if kb_loader is None:
+        kb_loader = KnowledgeBaseLoader(knowledge_base_path=knowledge_base_path)
+    knowledge_base_path = kb_loader.knowledge_base_path
+    pairs = extract_faq(knowledge_base_path, kb_loader.url_mapping)
+    store = FaqStore.build(pairs, kb_loader.embeddings)
+
+    output_file = os.path.join(knowledge_base_path, FAQ_STORE_FILE)
+    store.save(output_file, kb_loader.embedding_name, kb_loader.get_version())
+
+    print(f"✓ Created FAQ store: {output_file}")
+    print(f"  Question/answer pairs: {len(pairs)} from {len({pair['source'] for pair in pairs})} files")
+    print(f"  Embedding model: {kb_loader.embedding_name}")
+    print(f"  Size: {os.path.getsize(output_file) / 1024:.1f} KB")
+    if pairs:
+        print("\nSample entry:")
+        print(f"  Question: {pairs[0]['question']}")
+        print(f"  Answer: {pairs[0]['answer'][:80]}...")
+        print(f"  URL: {pairs[0]['url'][:60]}...")
+
+
+if __name__ == "__main__":
+    create_faq_store()
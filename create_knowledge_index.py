@@ -1,111 +1,191 @@
 #!/usr/bin/env python3
 """
-Create knowledge base index for browser-side citations
-Extracts keywords and metadata from each TXT file for client-side matching
+Create knowledge base index for citations
+Builds an inverted index (term -> weighted postings) over each TXT file,
+used by the /sources API endpoint and by the browser when no backend is running
 """
 import os
 import json
+import math
 import re
 from pathlib import Path
 
+# Questions are tokenized the same way by src/citation_index.py and app.js
+TOKEN_PATTERN = re.compile(r'[a-zäöüß]+')
 
-def extract_keywords(text, filename):
-    """Extract relevant keywords from text"""
-    # Convert to lowercase for matching
-    text_lower = text.lower()
-    
-    # Common BAföG-related keywords to search for (German and English)
-    keywords = []
-    
-    # Extract from filename (more relevant)
-    name_parts = filename.replace('.txt', '').replace('-', ' ').replace('_', ' ')
-    keywords.extend(name_parts.split())
-    
-    # Extract key terms from content (German)
-    german_terms = [
-        'bafög', 'förderung', 'antrag', 'student', 'studium', 'ausbildung',
-        'einkommen', 'eltern', 'vermögen', 'rückzahlung', 'höhe', 'betrag',
-        'altersgrenze', 'ausland', 'darlehen', 'zuschuss', 'bedarfssatz',
-        'studienstarthilfe', 'studienabschluss', 'formblatt', 'amt',
-        'förderungsdauer', 'förderungshöchstdauer', 'fachrichtung',
-        'flexibilitätssemester', 'leistungsbescheinigung'
-    ]
-    
-    # Add English equivalents for better international support
-    english_terms = [
-        'funding', 'application', 'study', 'education', 'income',
-        'parents', 'assets', 'repayment', 'amount', 'age limit',
-        'abroad', 'loan', 'grant', 'form', 'office'
+STOPWORDS = {
+    # German
+    'der', 'die', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einen', 'einem',
+    'einer', 'eines', 'und', 'oder', 'aber', 'als', 'auch', 'auf', 'aus', 'bei',
+    'bis', 'durch', 'für', 'gegen', 'ist', 'sind', 'war', 'wird', 'werden',
+    'wurde', 'kann', 'können', 'mit', 'nach', 'nicht', 'noch', 'nur', 'ohne',
+    'sich', 'sie', 'ich', 'wir', 'ihr', 'man', 'von', 'vom', 'vor', 'wie',
+    'was', 'wer', 'wann', 'wenn', 'zum', 'zur', 'über', 'unter', 'dass', 'hat',
+    'haben', 'mein', 'meine', 'gibt', 'dann', 'denn', 'doch', 'hier', 'mehr',
+    'sehr', 'bzw', 'ihre', 'ihren', 'diese', 'dieser', 'wurden', 'sowie',
+    # English
+    'the', 'and', 'for', 'can', 'how', 'what', 'when', 'who', 'does', 'are',
+    'with', 'from', 'much', 'there', 'get', 'have', 'has', 'you', 'your',
+}
+
+# English to German term mappings for English questions
+SYNONYMS = {
+    'study': 'studium',
+    'studies': 'studium',
+    'application': 'antrag',
+    'apply': 'antrag',
+    'money': 'förderung',
+    'funding': 'förderung',
+    'age': 'altersgrenze',
+    'limit': 'grenze',
+    'abroad': 'ausland',
+    'foreign': 'ausland',
+    'income': 'einkommen',
+    'parents': 'eltern',
+    'repayment': 'rückzahlung',
+    'amount': 'höhe',
+    'loan': 'darlehen',
+    'grant': 'zuschuss',
+    'bafoeg': 'bafög',
+    'bafög': 'bafög'
+}
+
+# Added to the weight of terms in the document name (content weights are at most 1)
+NAME_BOOST = 1.5
+
+# Number of general BAföG sources returned when no term matches
+DEFAULT_SOURCES = 2
+
+
+def tokenize(text):
+    """Split text into lowercase terms without stopwords"""
+    return [
+        term for term in TOKEN_PATTERN.findall(text.lower())
+        if len(term) > 2 and term not in STOPWORDS
     ]
-    
-    all_terms = german_terms + english_terms
-    
-    for term in all_terms:
-        if term in text_lower:
-            keywords.append(term)
-    
-    # Remove duplicates and return
-    return list(set(keywords))
+
+
+def build_postings(documents):
+    """
+    Build weighted postings: term -> [[document index, weight], ...]
+    Weights are log-scaled term frequencies times IDF, normalized per
+    document, plus a boost for terms in the document name.
+    """
+    term_counts = []
+    for doc in documents:
+        counts = {}
+        for term in tokenize(doc['content']):
+            counts[term] = counts.get(term, 0) + 1
+        term_counts.append(counts)
+
+    name_terms = [set(tokenize(doc['name'])) for doc in documents]
+
+    num_docs = len(documents)
+    document_frequency = {}
+    for counts, names in zip(term_counts, name_terms):
+        for term in set(counts) | names:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    idf = {
+        term: round(math.log(1 + num_docs / df), 4)
+        for term, df in document_frequency.items()
+    }
+
+    postings = {}
+    for doc_index, (counts, names) in enumerate(zip(term_counts, name_terms)):
+        weights = {term: (1 + math.log(tf)) * idf[term] for term, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        weights = {term: w / norm for term, w in weights.items()}
+        for term in names:
+            weights[term] = weights.get(term, 0.0) + NAME_BOOST
+        for term, weight in weights.items():
+            postings.setdefault(term, []).append([doc_index, round(weight, 4)])
+
+    for term_postings in postings.values():
+        term_postings.sort(key=lambda posting: posting[1], reverse=True)
+
+    return postings, idf
 
 
 def create_knowledge_index():
     """Create searchable index of knowledge base files"""
     kb_dir = Path("./knowledge_base")
     url_mapping_file = kb_dir / "url_mapping.json"
-    
+
     # Load URL mapping
     with open(url_mapping_file, 'r', encoding='utf-8') as f:
         url_mapping = json.load(f)
-    
-    index = []
-    
+
+    documents = []
+
     # Process each TXT file
     for filename, url in url_mapping.items():
         filepath = kb_dir / filename
-        
+
         if not filepath.exists():
             print(f"Warning: {filename} not found, skipping")
             continue
-        
+
         # Read file content
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
-        
+
         # Extract first 200 characters as preview
         preview = content[:200].replace('\n', ' ').strip()
         if len(content) > 200:
             preview += "..."
-        
-        # Extract keywords
-        keywords = extract_keywords(content, filename)
-        
+
         # Create readable name
         display_name = filename.replace('.txt', '').replace('-', ' ').replace('_', ' ').title()
-        
-        index.append({
+
+        documents.append({
             'file': filename,
             'name': display_name,
             'url': url,
-            'keywords': keywords,
-            'preview': preview
+            'preview': preview,
+            'content': content
         })
-    
+
+    postings, idf = build_postings(documents)
+
+    # General BAföG sources, used when a question matches no indexed term
+    default_sources = [doc_index for doc_index, _ in postings.get('bafög', [])[:DEFAULT_SOURCES]]
+
+    index = {
+        'version': 2,
+        'documents': [
+            {key: doc[key] for key in ('file', 'name', 'url', 'preview')}
+            for doc in documents
+        ],
+        'stopwords': sorted(STOPWORDS),
+        'synonyms': SYNONYMS,
+        'idf': idf,
+        'postings': postings,
+        'default_sources': default_sources
+    }
+
     # Save index
     output_file = kb_dir / "knowledge_index.json"
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
-    
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+
     print(f"✓ Created knowledge index: {output_file}")
-    print(f"  Indexed {len(index)} documents")
-    print(f"  Total keywords: {sum(len(doc['keywords']) for doc in index)}")
-    
+    print(f"  Indexed {len(documents)} documents")
+    print(f"  Total terms: {len(postings)}")
+    print(f"  Total postings: {sum(len(p) for p in postings.values())}")
+    print(f"  Size: {os.path.getsize(output_file) / 1024:.1f} KB")
+
     # Show a sample
-    if index:
+    if documents:
         print("\nSample entry:")
-        sample = index[0]
+        sample = documents[0]
+        top_terms = sorted(
+            (term for term, term_postings in postings.items()
+             if any(doc_index == 0 for doc_index, _ in term_postings)),
+            key=lambda term: -dict(postings[term])[0]
+        )
         print(f"  File: {sample['file']}")
         print(f"  Name: {sample['name']}")
-        print(f"  Keywords: {', '.join(sample['keywords'][:5])}...")
+        print(f"  Top terms: {', '.join(top_terms[:5])}...")
         print(f"  URL: {sample['url'][:60]}...")
 
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Embedding backend benchmark
+Compares the PyTorch and ONNX (float32 and int8) query embedding paths. Each
+backend runs in a fresh process, so import time and memory are its own:
+
+- startup: importing the backend and loading the model
+- query latency: embed_query() per evaluation question, one at a time
+- batch throughput: knowledge base chunks per second with embed_documents()
+- memory: resident memory after the runs, and the peak
+
+Export the ONNX models first: python export_onnx_model.py --quantize
+
+Usage:
+    python embedding_benchmark.py
+    python embedding_benchmark.py --backends torch,onnx --repeat 5 --output embedding.json
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def percentiles(values):
+    values = sorted(values)
+
+    def percentile(p):
+        return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] * 1000, 2)
+
+    return {'p50': percentile(50), 'p90': percentile(90), 'mean': round(sum(values) / len(values) * 1000, 2)}
+
+
+def rss_mb():
+    """Current resident memory of this process"""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def load_model(backend, model_name, onnx_model_dir):
+    if backend == 'torch':
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    from src.onnx_embeddings import OnnxEmbeddings
+    return OnnxEmbeddings(onnx_model_dir, quantized=backend == 'onnx-int8')
+
+
+def run_backend(args):
+    """Measure one backend (runs in its own process)"""
+    sys.path.append(str(SCRIPT_DIR))
+    start = time.perf_counter()
+    model = load_model(args.run, args.model, args.onnx_model_dir)
+    startup = time.perf_counter() - start
+
+    with open(args.texts, 'r', encoding='utf-8') as f:
+        texts = json.load(f)
+    questions, chunks = texts['questions'], texts['chunks']
+
+    start = time.perf_counter()
+    model.embed_query(questions[0])
+    first_query = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.repeat):
+        for question in questions:
+            start = time.perf_counter()
+            model.embed_query(question)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.embed_documents(chunks)
+    batch_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'backend': args.run,
+        'startup_s': round(startup, 2),
+        'first_query_ms': round(first_query * 1000, 2),
+        'query_ms': percentiles(latencies),
+        'chunks_per_s': round(len(chunks) / batch_seconds, 1),
+        'rss_mb': rss_mb(),
+        # ru_maxrss is in kB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }))
+
+
+def write_texts(path, limit):
+    """Evaluation questions and knowledge base chunks for the worker processes"""
+    from langchain.schema import Document
+    from evaluate import load_cases
+    from src.chunking import StructuredSplitter
+
+    questions = [case['question'] for case in load_cases(str(SCRIPT_DIR / 'evaluation.csv'))]
+    documents = [Document(page_content=p.read_text(encoding='utf-8'), metadata={'source': str(p)})
+                 for p in sorted((SCRIPT_DIR / 'knowledge_base').glob('*.txt'))]
+    chunks = [chunk.page_content for chunk in StructuredSplitter().split_documents(documents)][:limit]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'questions': questions, 'chunks': chunks}, f, ensure_ascii=False)
+    return len(questions), len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare embedding backends: startup, latency, throughput, memory')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='Comma-separated: torch, onnx, onnx-int8')
+    parser.add_argument('--model', default=None, help='PyTorch model (default: the knowledge base model)')
+    parser.add_argument('--onnx-model-dir', default=os.getenv("ONNX_MODEL_DIR", "./onnx_model"))
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the evaluation questions')
+    parser.add_argument('--chunks', type=int, default=256, help='Chunks for the batch throughput run')
+    parser.add_argument('--threads', type=int, default=None, help='CPU threads per backend (default: all cores)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--run', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--texts', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_backend(args)
+        return
+
+    sys.path.append(str(SCRIPT_DIR))
+    if args.model is None:
+        from src.knowledge_base_loader import EMBEDDING_MODEL
+        args.model = EMBEDDING_MODEL
+    texts_path = SCRIPT_DIR / '.embedding_benchmark_texts.json'
+    question_count, chunk_count = write_texts(texts_path, args.chunks)
+    print(f"{question_count} questions x{args.repeat}, {chunk_count} chunks\n")
+
+    env = dict(os.environ)
+    if args.threads:
+        env.update(OMP_NUM_THREADS=str(args.threads), ONNX_THREADS=str(args.threads))
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'threads': args.threads
+        },
+        'runs': []
+    }
+    print(f"{'backend':<10} {'startup':>8} {'query p50':>10} {'query p90':>10} {'chunks/s':>9} {'RSS':>9} {'peak RSS':>9}")
+    try:
+        for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+            completed = subprocess.run(
+                [sys.executable, __file__, '--run', backend, '--texts', str(texts_path), '--model', args.model,
+                 '--onnx-model-dir', args.onnx_model_dir, '--repeat', str(args.repeat)],
+                cwd=SCRIPT_DIR, env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'
+                print(f"{backend:<10} {error}")
+                continue
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            results['runs'].append(run)
+            print(f"{backend:<10} {run['startup_s']:>7}s {run['query_ms']['p50']:>7} ms {run['query_ms']['p90']:>7} ms "
+                  f"{run['chunks_per_s']:>9} {run['rss_mb']:>6} MB {run['peak_rss_mb']:>6} MB")
+    finally:
+        texts_path.unlink(missing_ok=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
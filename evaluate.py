@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation for the BAföG RAG Chatbot
+Replays the prompts in evaluation.csv, scores recall of the expected sources
+and reports per-stage latency percentiles.
+
+Usage:
+    python evaluate.py                      # retrieval only
+    python evaluate.py --llm stub           # + offline deterministic answers
+    python evaluate.py --llm openrouter     # + real answers (uses API credits)
+    python evaluate.py --retrieval-mode hybrid --k 5 --output results.json
+    python evaluate.py --rerank compare     # precision and latency with vs. without reranking
+"""
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add src directory to path
+sys.path.append(str(Path(__file__).parent))
+
+SOURCES_PATTERN = re.compile(r'Sources?:(.*)$', re.DOTALL)
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def load_cases(csv_path):
+    """Read evaluation.csv into dicts with question, type, expected answer and sources"""
+    cases = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            expected = row['Expected Answer'].strip()
+            match = SOURCES_PATTERN.search(expected)
+            sources = []
+            if match:
+                sources = [s.strip() for s in re.split(r'[;,\s]+', match.group(1)) if s.strip()]
+                expected = expected[:match.start()].strip()
+            cases.append({
+                'question': row['Test prompts'].strip(),
+                'type': row['Type'].strip(),
+                'expected_answer': expected,
+                'expected_sources': sources
+            })
+    return cases
+
+
+def source_keys(document):
+    """File name and URL a retrieved document can be cited by"""
+    keys = {Path(document.metadata.get('source', '')).name}
+    if document.metadata.get('url'):
+        keys.add(document.metadata['url'])
+    return keys
+
+
+def source_recall(expected_sources, documents):
+    """Fraction of expected sources (file names or URLs) found in the retrieved documents"""
+    retrieved = set()
+    for doc in documents:
+        retrieved |= source_keys(doc)
+    found = [source for source in expected_sources if source in retrieved]
+    return len(found) / len(expected_sources)
+
+
+def source_precision(expected_sources, documents):
+    """Fraction of retrieved documents that come from an expected source (precision@k)"""
+    if not documents:
+        return 0.0
+    relevant = [doc for doc in documents if source_keys(doc) & set(expected_sources)]
+    return len(relevant) / len(documents)
+
+
+def token_f1(answer, expected):
+    """Word-overlap F1 between an answer and the expected answer"""
+    answer_words = WORD_PATTERN.findall(answer.lower())
+    expected_words = WORD_PATTERN.findall(expected.lower())
+    if not answer_words or not expected_words:
+        return 0.0
+    remaining = list(expected_words)
+    common = 0
+    for word in answer_words:
+        if word in remaining:
+            remaining.remove(word)
+            common += 1
+    if not common:
+        return 0.0
+    precision = common / len(answer_words)
+    recall = common / len(expected_words)
+    return 2 * precision * recall / (precision + recall)
+
+
+def percentiles(values):
+    """p50/p90/p95/p99/max in milliseconds (nearest-rank)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    summary = {}
+    for p in (50, 90, 95, 99):
+        index = max(0, -(-p * len(ordered) // 100) - 1)
+        summary[f'p{p}'] = round(ordered[index] * 1000, 2)
+    summary['max'] = round(ordered[-1] * 1000, 2)
+    summary['count'] = len(ordered)
+    return summary
+
+
+def create_llm(backend, latency):
+    """LLM to inject into RAGChatbot, or None to build the real OpenRouter client"""
+    if backend == 'openrouter':
+        return None
+    # Retrieval-only runs never call the LLM, but the stub means no API key is needed
+    from src.stub_llm import StubLLM
+    return StubLLM(latency=latency)
+
+
+def evaluate(chatbot, cases, generate=False, repeat=1):
+    """Run every case and return per-case results plus stage timings"""
+    results = []
+    timings = {'retrieval': [], 'prompt': [], 'generation': [], 'total': []}
+    # The query LRU of CachedEmbeddings would hide the embedding time of repeats
+    embeddings = getattr(chatbot.vectorstore, 'embeddings', None)
+
+    for case in cases:
+        for run in range(repeat):
+            if hasattr(embeddings, 'clear_queries'):
+                embeddings.clear_queries()
+            start = time.perf_counter()
+            documents = chatbot.retrieve(case['question'])
+            retrieved_at = time.perf_counter()
+            prompt = chatbot.build_prompt(case['question'], chatbot.build_context(case['question'], documents))
+            prompt_at = time.perf_counter()
+
+            answer = None
+            if generate:
+                answer = chatbot.llm.invoke(prompt)
+                timings['generation'].append(time.perf_counter() - prompt_at)
+            end = time.perf_counter()
+
+            timings['retrieval'].append(retrieved_at - start)
+            timings['prompt'].append(prompt_at - retrieved_at)
+            timings['total'].append(end - start)
+
+        result = {
+            'question': case['question'],
+            'type': case['type'],
+            'expected_sources': case['expected_sources'],
+            'retrieved_sources': sorted({Path(doc.metadata.get('source', '')).name for doc in documents}),
+            'recall': source_recall(case['expected_sources'], documents) if case['expected_sources'] else None,
+            'precision': source_precision(case['expected_sources'], documents) if case['expected_sources'] else None,
+            # Estimated at ~4 characters per token
+            'prompt_tokens': len(prompt) // 4
+        }
+        if answer is not None:
+            result['answer'] = answer
+            result['answer_f1'] = round(token_f1(answer, case['expected_answer']), 3) if case['expected_answer'] else None
+            result['rejected'] = chatbot._is_non_bafog_response(answer)
+        results.append(result)
+
+    return results, timings
+
+
+def summarize(results, timings):
+    """Aggregate quality metrics and latency percentiles"""
+    scored = [r for r in results if r['recall'] is not None]
+    summary = {
+        'cases': len(results),
+        'cases_with_sources': len(scored),
+        'source_recall': round(sum(r['recall'] for r in scored) / len(scored), 3) if scored else None,
+        'source_hit_rate': round(sum(1 for r in scored if r['recall'] > 0) / len(scored), 3) if scored else None,
+        'source_precision': round(sum(r['precision'] for r in scored) / len(scored), 3) if scored else None,
+        'mean_prompt_tokens': round(sum(r['prompt_tokens'] for r in results) / len(results)) if results else None,
+        'latency_ms': {stage: percentiles(values) for stage, values in timings.items() if values}
+    }
+    answered = [r for r in results if r.get('answer_f1') is not None]
+    if answered:
+        summary['answer_f1'] = round(sum(r['answer_f1'] for r in answered) / len(answered), 3)
+    out_of_scope = [r for r in results if r['type'] == 'Outside Scope' and 'rejected' in r]
+    if out_of_scope:
+        summary['out_of_scope_rejected'] = round(
+            sum(1 for r in out_of_scope if r['rejected']) / len(out_of_scope), 3
+        )
+    return summary
+
+
+def print_report(results, summary):
+    print("\n=== Per-question results ===\n")
+    for r in results:
+        recall = f"{r['recall']:.2f}" if r['recall'] is not None else "  - "
+        f1 = f"  F1 {r['answer_f1']:.2f}" if r.get('answer_f1') is not None else ""
+        print(f"[{r['type']:<13}] recall {recall}{f1}  {r['question'][:60]}")
+        if r['recall'] is not None and r['recall'] < 1:
+            print(f"    expected:  {', '.join(r['expected_sources'])}")
+            print(f"    retrieved: {', '.join(r['retrieved_sources'])}")
+
+    print("\n=== Summary ===\n")
+    print(f"Cases: {summary['cases']} ({summary['cases_with_sources']} with expected sources)")
+    print(f"Source recall: {summary['source_recall']}")
+    print(f"Source hit rate: {summary['source_hit_rate']}")
+    print(f"Source precision@k: {summary['source_precision']}")
+    print(f"Mean prompt tokens: {summary['mean_prompt_tokens']}")
+    if 'answer_f1' in summary:
+        print(f"Answer F1: {summary['answer_f1']}")
+    if 'out_of_scope_rejected' in summary:
+        print(f"Out-of-scope questions rejected: {summary['out_of_scope_rejected']}")
+    print("\nLatency (ms):")
+    for stage, stats in summary['latency_ms'].items():
+        print(f"  {stage:<11} p50 {stats['p50']:>8}  p90 {stats['p90']:>8}  "
+              f"p95 {stats['p95']:>8}  p99 {stats['p99']:>8}  max {stats['max']:>8}")
+
+
+def print_rerank_comparison(baseline, reranked):
+    """Quality gain vs. added retrieval latency of the reranking stage"""
+    print("\n=== Reranking ===\n")
+    print(f"{'':<20} {'without':>9} {'with':>9} {'change':>9}")
+    for key, label in (('source_precision', 'Source precision@k'), ('source_recall', 'Source recall'),
+                       ('source_hit_rate', 'Source hit rate')):
+        before, after = baseline[key], reranked[key]
+        change = f"{after - before:+.3f}" if before is not None and after is not None else '-'
+        print(f"{label:<20} {before!s:>9} {after!s:>9} {change:>9}")
+    for percentile in ('p50', 'p90'):
+        before = baseline['latency_ms']['retrieval'][percentile]
+        after = reranked['latency_ms']['retrieval'][percentile]
+        print(f"{'Retrieval ' + percentile + ' (ms)':<20} {before:>9} {after:>9} {after - before:>+9.2f}")
+    print(f"Budget fallbacks: {reranked['reranker']['fallbacks']} of "
+          f"{reranked['reranker']['reranked'] + reranked['reranker']['fallbacks']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate retrieval quality and latency on evaluation.csv')
+    parser.add_argument('--csv', default='evaluation.csv', help='Evaluation CSV file')
+    parser.add_argument('--llm', choices=['none', 'stub', 'openrouter'], default='none',
+                        help='Generation backend (default: retrieval only)')
+    parser.add_argument('--stub-latency', type=float, default=0.0,
+                        help='Simulated latency of the stub LLM in seconds')
+    parser.add_argument('--retrieval-mode', choices=['similarity', 'hybrid'], default=None)
+    parser.add_argument('--k', type=int, default=None, help='Number of retrieved chunks')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per question (for stable percentiles)')
+    parser.add_argument('--rerank', choices=['off', 'on', 'compare'], default=None,
+                        help='Cross-encoder reranking (default: RERANK); compare runs every case without and with it')
+    parser.add_argument('--rerank-fetch-k', type=int, default=None, help='Candidates to rerank (default: RERANK_FETCH_K)')
+    parser.add_argument('--rerank-budget', type=float, default=None,
+                        help='Reranking time budget in seconds (default: RERANK_TIME_BUDGET)')
+    parser.add_argument('--kb-path', default='./knowledge_base')
+    parser.add_argument('--db-path', default='./chroma_db')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    from src.knowledge_base_loader import KnowledgeBaseLoader
+    from src.rag_chatbot import RAGChatbot
+
+    cases = load_cases(args.csv)
+    print(f"Loaded {len(cases)} test prompts from {args.csv}")
+
+    kb_loader = KnowledgeBaseLoader(knowledge_base_path=args.kb_path, persist_directory=args.db_path)
+    vectorstore = kb_loader.setup()
+    # --repeat measures retrieval latency, which cached results would hide
+    kb_loader.retrieval_cache = None
+
+    reranker = kb_loader.reranker
+    if args.rerank is None:
+        args.rerank = 'on' if reranker else 'off'
+    if args.rerank != 'off':
+        if reranker is None or args.rerank_fetch_k or args.rerank_budget is not None:
+            from src.reranker import Reranker
+            reranker = Reranker(fetch_k=args.rerank_fetch_k, time_budget=args.rerank_budget,
+                                model=reranker.model if reranker else None)
+
+    chatbot = RAGChatbot(
+        vectorstore,
+        kb_loader=kb_loader,
+        retrieval_mode=args.retrieval_mode,
+        k=args.k,
+        llm=create_llm(args.llm, args.stub_latency)
+    )
+
+    def run(with_reranker):
+        chatbot.reranker = reranker if with_reranker else None
+        results, timings = evaluate(chatbot, cases, generate=args.llm != 'none', repeat=args.repeat)
+        summary = summarize(results, timings)
+        summary.update({
+            'llm': args.llm,
+            'retrieval_mode': chatbot.retrieval_mode,
+            'k': chatbot.k,
+            'chunking_strategy': kb_loader.chunking_strategy,
+            'kb_version': kb_loader.version,
+            'reranker': reranker.stats() if with_reranker else None
+        })
+        return results, summary
+
+    baseline = None
+    if args.rerank == 'compare':
+        print("\nRun without reranking...")
+        _, baseline = run(False)
+        print("Run with reranking...")
+    results, summary = run(args.rerank != 'off')
+    print_report(results, summary)
+    if baseline is not None:
+        print_rerank_comparison(baseline, summary)
+        summary['without_rerank'] = baseline
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
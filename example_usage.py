@@ -26,7 +26,7 @@ def example_usage():
     vectorstore = kb_loader.setup()
     
     print("Initializing chatbot...")
-    chatbot = RAGChatbot(vectorstore)
+    chatbot = RAGChatbot(vectorstore, kb_loader=kb_loader)
     
     # Example questions
     questions = [
@@ -53,6 +53,12 @@ def example_usage():
                 print(f"     🔗 {url}")
         
         print("\n" + "-" * 80 + "\n")
+    
+    # Repeated or re-worded questions reuse the embedding and search results
+    if kb_loader.retrieval_cache:
+        stats = kb_loader.retrieval_cache.stats()
+        print(f"Retrieval cache: {stats['entries']} questions cached, "
+              f"hit rate {stats['retrieval']['hit_rate']}")
 
 
 if __name__ == "__main__":
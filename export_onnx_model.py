@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Export the embedding model to ONNX for CPU inference without PyTorch
+Writes model.onnx, tokenizer.json and onnx_config.json (and with --quantize
+an int8 model_int8.onnx) to the output directory, then checks that the ONNX
+vectors match the PyTorch ones.
+
+Usage:
+    python export_onnx_model.py
+    python export_onnx_model.py --quantize --output ./onnx_model
+
+Use the exported model with EMBEDDING_BACKEND=onnx, then rebuild the index:
+    python kb_manager.py sync
+"""
+import os
+import sys
+import json
+import inspect
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.knowledge_base_loader import EMBEDDING_MODEL
+from src.onnx_embeddings import (
+    MODEL_FILE, QUANTIZED_MODEL_FILE, TOKENIZER_FILE, CONFIG_FILE, OnnxEmbeddings, cosine_similarities
+)
+
+PARITY_TEXTS = [
+    "Was ist BAföG?",
+    "Wie hoch ist der Höchstsatz für Studierende, die nicht bei den Eltern wohnen?",
+    "Wann muss ich das BAföG-Darlehen zurückzahlen?",
+    "Can international students get BAföG?",
+    "Das Einkommen der Eltern wird angerechnet, soweit es die Freibeträge übersteigt. " * 20,
+]
+
+
+def export(model_name, output_dir, opset):
+    """Export the transformer of a sentence-transformers model; returns the loaded model"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device='cpu')
+    pooling = next((module for module in model if isinstance(module, Pooling)), None)
+    if pooling is None or pooling.get_pooling_mode_str() != 'mean':
+        raise ValueError(f"{model_name} does not use mean pooling, which OnnxEmbeddings implements")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    sample = tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Newer PyTorch defaults to the dynamo exporter, which needs onnxscript
+    options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(),
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=['token_embeddings'],
+            dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in input_names + ['token_embeddings']},
+            opset_version=opset,
+            **options
+        )
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'max_seq_length': model.max_seq_length,
+            'normalize': any(isinstance(module, Normalize) for module in model),
+            'pad_token': tokenizer.pad_token,
+            'pad_token_id': tokenizer.pad_token_id
+        }, f, indent=2)
+    print(f"Exported {model_name} to {os.path.join(output_dir, MODEL_FILE)}")
+    return model
+
+
+def feed_forward_nodes(model_path):
+    """MatMul nodes of the transformer feed-forward blocks (names as exported from Hugging Face BERT)"""
+    import onnx
+    nodes = onnx.load(model_path, load_external_data=False).graph.node
+    return [node.name for node in nodes if node.op_type == 'MatMul' and
+            ('/intermediate/' in node.name or ('/output/dense/' in node.name and '/attention/' not in node.name))]
+
+
+def quantize(output_dir):
+    """
+    Write an int8 copy of the model (weights quantized per channel, activations at run time)
+    The feed-forward MatMuls stay float32: their inputs have outlier dimensions that
+    per-tensor int8 activations can't represent (all-MiniLM-L6-v2 fully quantized:
+    min cosine similarity 0.69 against PyTorch; without them: 0.997).
+    """
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        print(f"Quantization needs the onnx package (pip install onnx): {e}")
+        return False
+    model_path = os.path.join(output_dir, MODEL_FILE)
+    quantize_dynamic(
+        model_path,
+        os.path.join(output_dir, QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        op_types_to_quantize=['MatMul'],
+        nodes_to_exclude=feed_forward_nodes(model_path)
+    )
+    print(f"Quantized model written to {os.path.join(output_dir, QUANTIZED_MODEL_FILE)}")
+    return True
+
+
+def check_parity(model, output_dir, quantized):
+    """Minimum cosine similarity of ONNX vs PyTorch vectors on PARITY_TEXTS"""
+    reference = model.encode(PARITY_TEXTS)
+    candidate = OnnxEmbeddings(output_dir, quantized=quantized).embed_documents(PARITY_TEXTS)
+    return float(cosine_similarities(reference, candidate).min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the embedding model to ONNX')
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='sentence-transformers model name or path')
+    parser.add_argument('--output', default=os.getenv("ONNX_MODEL_DIR", "./onnx_model"))
+    parser.add_argument('--quantize', action='store_true', help='Also write an int8 quantized model')
+    parser.add_argument('--opset', type=int, default=14)
+    args = parser.parse_args()
+
+    model = export(args.model, args.output, args.opset)
+    variants = [False] + ([True] if args.quantize and quantize(args.output) else [])
+    for quantized in variants:
+        similarity = check_parity(model, args.output, quantized)
+        print(f"Parity ({'int8' if quantized else 'float32'}): min cosine similarity {similarity:.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for the BAföG Chatbot API
+Preforking mode: the parent loads the embedding model and vector index once,
+then forks workers that share those pages copy-on-write.
+
+Usage:
+    VECTOR_BACKEND=numpy gunicorn -c gunicorn.conf.py api_server:app
+    VECTOR_BACKEND=numpy GUNICORN_WORKERS=4 gunicorn -c gunicorn.conf.py api_server:app
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+# Import api_server (and load the knowledge base) in the parent before forking
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+if preload_app:
+    # Threads do not survive fork: warm up synchronously in the parent
+    os.environ["BACKGROUND_WARMUP"] = "false"
+    # Chroma's SQLite connections must not be shared across fork; the NumPy
+    # store is a read-only memory-mapped file, which workers share through
+    # the page cache. The backend is not switched here: the servers would
+    # silently answer from (and build) another store than kb_manager.py syncs
+    if not os.getenv("VECTOR_BACKEND"):
+        raise RuntimeError(
+            "Set VECTOR_BACKEND when preloading: numpy (recommended, build it first with "
+            "VECTOR_BACKEND=numpy python kb_manager.py sync) or chroma; "
+            "or disable preloading with GUNICORN_PRELOAD=false"
+        )
+
+# One compute thread per worker: workers already use the cores, and OpenMP
+# thread pools started in the parent are not usable after fork
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+os.environ.setdefault("ONNX_THREADS", "1")
+
+
+def when_ready(server):
+    """Runs in the parent after the app is loaded, before workers are forked"""
+    if preload_app:
+        # Move everything allocated so far out of the garbage collector's
+        # generations, so collections in the workers don't touch (and copy)
+        # the shared pages of the model and index
+        gc.collect()
+        gc.freeze()
+        server.log.info("Preloaded app, %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
@@ -15,10 +15,28 @@ def rebuild_vector_db():
         print(f"Deleting {chroma_dir}...")
         shutil.rmtree(chroma_dir)
         print("✓ Vector database deleted. It will be rebuilt on next run.")
+        print("  (Unchanged chunks reuse cached embeddings from ./embedding_cache)")
     else:
         print("Vector database doesn't exist yet.")
 
 
+def sync_vector_db():
+    """Re-index only added, changed or removed knowledge base files"""
+    from src.knowledge_base_loader import KnowledgeBaseLoader
+    
+    kb_loader = KnowledgeBaseLoader(
+        knowledge_base_path="./knowledge_base",
+        persist_directory="./chroma_db"
+    )
+    kb_loader.sync()
+    
+    # Keep the FAQ answers in step with the knowledge base, if they are used
+    from src.faq_store import FAQ_STORE_FILE
+    if os.path.exists(os.path.join(kb_loader.knowledge_base_path, FAQ_STORE_FILE)):
+        from create_faq_store import create_faq_store
+        create_faq_store(kb_loader=kb_loader)
+
+
 def list_knowledge_files():
     """List all files in knowledge base"""
     kb_dir = "./knowledge_base"
@@ -65,10 +83,13 @@ def scrape_from_urls():
         return
     
     scraper = WebScraper()
-    scraper.scrape_urls(urls)
+    results = scraper.scrape_urls(urls)
     
-    print("\n⚠️  Remember to rebuild the vector database:")
-    print("    python kb_manager.py rebuild")
+    if results['new'] or results['changed']:
+        print("\n⚠️  Remember to update the vector database:")
+        print("    python kb_manager.py sync")
+    else:
+        print("\nNo pages changed, the vector database is up to date.")
 
 
 def main():
@@ -77,10 +98,12 @@ def main():
         print("\nUsage:")
         print("  python kb_manager.py list       - List all knowledge base files")
         print("  python kb_manager.py scrape     - Scrape content from URLs")
+        print("  python kb_manager.py sync       - Index added/changed/removed files")
         print("  python kb_manager.py rebuild    - Rebuild vector database")
         print("\nExamples:")
         print("  python kb_manager.py list")
         print("  python kb_manager.py scrape")
+        print("  python kb_manager.py sync")
         print("  python kb_manager.py rebuild")
         return
     
@@ -90,11 +113,13 @@ def main():
         list_knowledge_files()
     elif command == "scrape":
         scrape_from_urls()
+    elif command == "sync":
+        sync_vector_db()
     elif command == "rebuild":
         rebuild_vector_db()
     else:
         print(f"Unknown command: {command}")
-        print("Use: list, scrape, or rebuild")
+        print("Use: list, scrape, sync, or rebuild")
 
 
 if __name__ == "__main__":
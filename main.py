@@ -30,7 +30,7 @@ def main():
     
     # Initialize chatbot
     try:
-        chatbot = RAGChatbot(vectorstore)
+        chatbot = RAGChatbot(vectorstore, kb_loader=kb_loader)
     except ValueError as e:
         print(f"\nError: {e}")
         print("Please create a .env file with your OPENROUTER_API_KEY")
@@ -39,6 +39,10 @@ def main():
     
     # Start chat
     chatbot.chat()
+    
+    if kb_loader.retrieval_cache:
+        stats = kb_loader.retrieval_cache.stats()
+        print(f"Retrieval cache: {stats['retrieval']['hits']} hits, {stats['retrieval']['misses']} misses")
 
 
 if __name__ == "__main__":
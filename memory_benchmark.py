@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for multi-process serving
+Starts api_server.py under gunicorn with and without preloading, waits until
+every worker has loaded the knowledge base, and reports memory per worker
+from /proc/<pid>/smaps_rollup (Linux only):
+
+- RSS: resident pages, shared pages counted in every process
+- PSS: shared pages split between the processes sharing them
+- USS: pages private to the process (what one more worker costs)
+
+Usage:
+    python memory_benchmark.py
+    python memory_benchmark.py --workers 1,2,4 --output memory.json
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import platform
+import subprocess
+import urllib.request
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def memory_kb(pid):
+    """RSS, PSS and USS of a process in kB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def children(pid):
+    """PIDs of the direct child processes (gunicorn workers)"""
+    pids = []
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state, ppid, ...
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            pids.append(int(entry.name))
+    return sorted(pids)
+
+
+def get_health(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5) as response:
+            return json.loads(response.read())
+    except Exception:
+        return None
+
+
+def wait_until_ready(process, port, workers, timeout):
+    """Wait until every worker answered /health with status 'ok'"""
+    ready_pids = set()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        health = get_health(port)
+        if health and health.get('status') == 'error':
+            raise RuntimeError(f"Knowledge base failed to load: {health.get('error')}")
+        if health and health.get('status') == 'ok':
+            ready_pids.add(health.get('pid'))
+            if len(ready_pids) >= workers and len(children(process.pid)) == workers:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"Workers not ready after {timeout}s ({len(ready_pids)}/{workers})")
+
+
+def measure(preload, workers, port, timeout, settle, vector_backend):
+    """Start gunicorn, wait for all workers, and measure the memory of every process"""
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD=str(preload).lower(),
+               PORT=str(port), BACKGROUND_WARMUP='false', VECTOR_BACKEND=vector_backend)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app'],
+        cwd=SCRIPT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(process, port, workers, timeout)
+        # Let allocations after the first requests settle
+        time.sleep(settle)
+        master = memory_kb(process.pid)
+        worker_memory = [memory_kb(pid) for pid in children(process.pid)]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def mean(key):
+        return round(sum(m[key] for m in worker_memory) / len(worker_memory) / 1024, 1)
+
+    return {
+        'preload': preload,
+        'workers': workers,
+        'master_mb': {key: round(value / 1024, 1) for key, value in master.items()},
+        'worker_mb': {key: mean(key) for key in ('rss', 'pss', 'uss')},
+        'total_pss_mb': round((master['pss'] + sum(m['pss'] for m in worker_memory)) / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure memory per gunicorn worker with and without preloading')
+    parser.add_argument('--workers', type=parse_list, default=[1, 2, 4], help='Comma-separated worker counts')
+    parser.add_argument('--modes', default='preload,no-preload', help='preload, no-preload or both')
+    parser.add_argument('--vector-backend', choices=['numpy', 'chroma'], default='numpy',
+                        help='Vector store for both modes (build it first: VECTOR_BACKEND=numpy python kb_manager.py sync)')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds to wait for the workers to load')
+    parser.add_argument('--settle', type=float, default=2.0, help='Seconds to wait before measuring')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    if not Path('/proc/self/smaps_rollup').exists():
+        print("This benchmark reads /proc/<pid>/smaps_rollup and needs Linux 4.14 or later.")
+        sys.exit(1)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'vector_backend': args.vector_backend
+        },
+        'runs': []
+    }
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    print(f"{'mode':<11} {'workers':>7} {'worker RSS':>11} {'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}")
+    for mode in modes:
+        for workers in args.workers:
+            run = measure(mode == 'preload', workers, args.port, args.timeout, args.settle, args.vector_backend)
+            results['runs'].append(run)
+            print(f"{mode:<11} {workers:>7} {run['worker_mb']['rss']:>8} MB {run['worker_mb']['pss']:>8} MB "
+                  f"{run['worker_mb']['uss']:>8} MB {run['total_pss_mb']:>7} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,55 +4,172 @@ Scrapes content from provided URLs and saves to knowledge base
 """
 import os
 import json
+import hashlib
+import threading
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import time
 
 
+class HostLimiter:
+    """
+    Politeness limits per host: at most `concurrency` requests in flight
+    and at least `min_interval` seconds between request starts.
+    """
+    
+    def __init__(self, concurrency=2, min_interval=1.0):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self._hosts = {}
+        self._lock = threading.Lock()
+    
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {
+                    'semaphore': threading.BoundedSemaphore(self.concurrency),
+                    'lock': threading.Lock(),
+                    'next_start': 0.0
+                }
+            return self._hosts[host]
+    
+    def acquire(self, host):
+        entry = self._host(host)
+        entry['semaphore'].acquire()
+        with entry['lock']:
+            wait = entry['next_start'] - time.monotonic()
+            entry['next_start'] = max(entry['next_start'], time.monotonic()) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+    
+    def release(self, host):
+        self._host(host)['semaphore'].release()
+
+
 class WebScraper:
-    def __init__(self, output_dir="./knowledge_base"):
+    def __init__(self, output_dir="./knowledge_base", max_workers=8, per_host_concurrency=2,
+                 min_interval=1.0, timeout=10):
         self.output_dir = output_dir
         self.url_mapping = {}
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.limiter = HostLimiter(per_host_concurrency, min_interval)
+        
+        # One pooled session: keep-alive connections are reused across pages
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
+        
+        # ETag / Last-Modified / content hash per URL from earlier runs
+        self.state = self._load_state()
+        self._state_lock = threading.Lock()
     
-    def scrape_url(self, url, delay=1):
+    def _state_path(self):
+        return os.path.join(self.output_dir, "scrape_state.json")
+    
+    def _load_state(self):
+        """Load per-URL scrape state (stored next to url_mapping.json)"""
+        if os.path.exists(self._state_path()):
+            with open(self._state_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    
+    def _save_state(self):
+        with open(self._state_path(), 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+    
+    def _get(self, url, headers=None):
+        """GET a URL within the per-host concurrency and rate limits"""
+        host = urlparse(url).netloc
+        self.limiter.acquire(host)
+        try:
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+        finally:
+            self.limiter.release(host)
+    
+    def extract_text(self, html):
+        """Extract the readable text of an HTML page"""
+        # Parse HTML
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Remove script and style elements
+        for script in soup(["script", "style", "nav", "footer", "header"]):
+            script.decompose()
+        
+        # Get text content
+        text = soup.get_text(separator='\n', strip=True)
+        
+        # Clean up text
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        return '\n'.join(lines)
+    
+    def scrape_url(self, url):
         """Scrape content from a single URL"""
         print(f"Scraping: {url}")
         
         try:
-            # Add delay to be respectful to the server
-            time.sleep(delay)
-            
-            # Send request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._get(url)
             response.raise_for_status()
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text(separator='\n', strip=True)
-            
-            # Clean up text
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            text = '\n'.join(lines)
-            
-            return text
-            
+            return self.extract_text(response.content)
+        
         except Exception as e:
             print(f"Error scraping {url}: {e}")
             return None
     
+    def fetch_page(self, url):
+        """
+        Fetch a URL with a conditional GET and save it if its content changed
+        Returns (status, filename) with status 'new', 'changed', 'unchanged' or 'failed'
+        """
+        previous = self.state.get(url, {})
+        filename = previous.get('filename') or self.generate_filename(url)
+        filepath = os.path.join(self.output_dir, filename)
+        
+        headers = {}
+        if os.path.exists(filepath):
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        
+        try:
+            response = self._get(url, headers=headers)
+            if response.status_code == 304:
+                return 'unchanged', filename
+            response.raise_for_status()
+            content = self.extract_text(response.content)
+        except Exception as e:
+            print(f"Error scraping {url}: {e}")
+            return 'failed', filename
+        
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        unchanged = content_hash == previous.get('content_hash') and os.path.exists(filepath)
+        if not unchanged:
+            # Save content
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(f"Source: {url}\n\n")
+                f.write(content)
+        
+        with self._state_lock:
+            self.state[url] = {
+                'filename': filename,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_hash': content_hash
+            }
+        
+        if unchanged:
+            return 'unchanged', filename
+        return ('changed' if previous else 'new'), filename
+    
     def generate_filename(self, url):
         """Generate a filename from URL"""
         parsed = urlparse(url)
@@ -67,34 +184,39 @@ class WebScraper:
         return path
     
     def scrape_urls(self, urls):
-        """Scrape multiple URLs and save to knowledge base"""
+        """
+        Scrape multiple URLs concurrently and save changed pages to the knowledge base
+        
+        Returns a dict of file names per status ('new', 'changed', 'unchanged',
+        'failed'); only new and changed files need re-indexing.
+        """
         print(f"\nScraping {len(urls)} URLs...\n")
         
-        for url in urls:
-            # Scrape content
-            content = self.scrape_url(url)
-            
-            if content:
-                # Generate filename
-                filename = self.generate_filename(url)
-                filepath = os.path.join(self.output_dir, filename)
-                
-                # Save content
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(f"Source: {url}\n\n")
-                    f.write(content)
-                
+        results = {'new': [], 'changed': [], 'unchanged': [], 'failed': []}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scraper') as executor:
+            for url, (status, filename) in zip(urls, executor.map(self.fetch_page, urls)):
+                results[status].append(filename)
+                if status == 'failed':
+                    print(f"✗ Failed to scrape: {url}")
+                    continue
                 # Update mapping
                 self.url_mapping[filename] = url
-                
-                print(f"✓ Saved to: {filename}\n")
-            else:
-                print(f"✗ Failed to scrape: {url}\n")
+                if status == 'unchanged':
+                    print(f"= Unchanged: {filename}")
+                else:
+                    print(f"✓ Saved to: {filename} ({status})")
         
-        # Save URL mapping
+        # Save URL mapping and scrape state
         self._save_url_mapping()
+        self._save_state()
         
-        print(f"Scraping complete! Scraped {len(self.url_mapping)} pages.")
+        print(f"\nScraping complete! {len(results['new'])} new, {len(results['changed'])} changed, "
+              f"{len(results['unchanged'])} unchanged, {len(results['failed'])} failed.")
+        if results['new'] or results['changed']:
+            print("Files to re-index:")
+            for filename in results['new'] + results['changed']:
+                print(f"  - {filename}")
+        return results
     
     def _save_url_mapping(self):
         """Save URL mapping to JSON file"""
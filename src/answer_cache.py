@@ -0,0 +1,160 @@
+"""
+Answer Cache
+Semantic cache of chatbot answers keyed by question embedding
+"""
+import os
+import json
+import atexit
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain.schema import Document
+
+
+def _unit(vector):
+    """Vector scaled to length 1, so a dot product is the cosine similarity"""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class AnswerCache:
+    """
+    Returns a previously generated answer when a new question is close
+    enough (cosine similarity >= threshold) to one already answered.
+
+    Entries are namespaced by model name and knowledge base version, so
+    switching models or rebuilding the knowledge base never serves stale
+    answers. The cache holds at most max_entries answers (LRU eviction)
+    and is optionally persisted to persist_path as JSON.
+    """
+
+    def __init__(self, embeddings, threshold=0.95, max_entries=500,
+                 persist_path=None, save_every=10):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    def embed(self, question):
+        """Return the normalized embedding for a question"""
+        return _unit(self.embeddings.embed_query(question))
+
+    def lookup(self, embedding, model, kb_version):
+        """Return the best cached entry above the threshold, or None"""
+        embedding = _unit(embedding)
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id, entry in self._entries.items():
+                if entry['model'] != model or entry['kb_version'] != kb_version:
+                    continue
+                score = float(np.dot(entry['embedding'], embedding))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {
+                'question': entry['question'],
+                'answer': entry['answer'],
+                'sources': [Document(**source) for source in entry['sources']],
+                'token_usage': entry['token_usage'],
+                'similarity': round(best_score, 4)
+            }
+
+    def store(self, question, embedding, model, kb_version, result):
+        """Cache the result of answering question"""
+        entry = {
+            'question': question,
+            'embedding': _unit(embedding),
+            'model': model,
+            'kb_version': kb_version,
+            'answer': result['answer'],
+            'sources': [
+                {'page_content': doc.page_content, 'metadata': doc.metadata}
+                for doc in result['sources']
+            ],
+            'token_usage': result.get('token_usage')
+        }
+
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            should_save = self.persist_path and self._unsaved >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache statistics for monitoring"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def save(self):
+        """Persist the cache to disk"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            data = [
+                {**entry, 'embedding': entry['embedding'].tolist()}
+                for entry in self._entries.values()
+            ]
+            self._unsaved = 0
+
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.persist_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+
+    def _load(self):
+        """Load a previously persisted cache"""
+        if not os.path.exists(self.persist_path):
+            return
+
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load answer cache: {e}")
+            return
+
+        for entry in data[-self.max_entries:]:
+            entry['embedding'] = _unit(entry['embedding'])
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+        print(f"Loaded {len(self._entries)} cached answers")
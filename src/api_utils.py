@@ -0,0 +1,139 @@
+"""
+API Utilities
+Components and helpers shared by the Flask (api_server.py) and ASGI (asgi_server.py) servers
+"""
+import os
+import json
+
+from src.chatbot_pool import ChatbotPool
+from src.citation_index import CitationIndex
+
+
+def load_citation_index(index_path="./knowledge_base/knowledge_index.json"):
+    """Load the keyword citation index, or None if it is missing"""
+    try:
+        return CitationIndex(index_path)
+    except Exception as e:
+        print(f"Error loading citation index: {e}")
+        return None
+
+
+def create_answer_cache(kb_loader):
+    """Create the semantic answer cache configured in the environment (or None)"""
+    if os.getenv('ANSWER_CACHE', 'true').lower() != 'true':
+        return None
+    from src.answer_cache import AnswerCache
+    return AnswerCache(
+        kb_loader.embeddings,
+        threshold=float(os.getenv('ANSWER_CACHE_THRESHOLD', 0.95)),
+        max_entries=int(os.getenv('ANSWER_CACHE_SIZE', 500)),
+        persist_path=os.getenv('ANSWER_CACHE_PATH') or None
+    )
+
+
+def create_conversation_store():
+    """Create the session conversation store configured in the environment (or None)"""
+    if os.getenv('CONVERSATION_MEMORY', 'true').lower() != 'true':
+        return None
+    from src.conversation_store import ConversationStore
+    return ConversationStore()
+
+
+def create_chatbot_pool(vectorstore, kb_loader, answer_cache, metrics=None, usage_tracker=None,
+                        conversation_store=None):
+    """Create the pool that reuses one chatbot (LLM client + QA chain) per API key"""
+    # Imported here so the servers can bind before LangChain is loaded
+    from src.rag_chatbot import RAGChatbot
+    return ChatbotPool(
+        factory=lambda api_key: RAGChatbot(
+            vectorstore,
+            api_key=api_key,
+            kb_loader=kb_loader,
+            answer_cache=answer_cache,
+            metrics=metrics,
+            usage_tracker=usage_tracker,
+            conversation_store=conversation_store
+        ),
+        max_size=int(os.getenv('CHATBOT_POOL_SIZE', 32)),
+        ttl=int(os.getenv('CHATBOT_POOL_TTL', 3600))
+    )
+
+
+def session_id_error(data):
+    """Validate the optional session_id of a chat request; returns an error message or None"""
+    session_id = data.get('session_id')
+    if session_id is None:
+        return None
+    if not isinstance(session_id, str) or not 0 < len(session_id) <= 128:
+        return 'session_id must be a string of 1 to 128 characters'
+    return None
+
+
+def batch_questions_error(questions):
+    """Validate the questions of a /chat/batch request; returns an error message or None"""
+    if not questions or not isinstance(questions, list):
+        return 'No questions provided'
+    max_questions = int(os.getenv('BATCH_MAX_QUESTIONS', 500))
+    if len(questions) > max_questions:
+        return f'Too many questions (maximum {max_questions})'
+    for index, question in enumerate(questions):
+        if not isinstance(question, str) or not question.strip():
+            return f'Question {index} must be a non-empty string'
+    return None
+
+
+def format_sources(documents):
+    """Convert source documents into unique citation dicts for the web UI"""
+    sources = []
+    seen_sources = set()
+
+    for doc in documents:
+        source_file = os.path.basename(doc.metadata.get('source', 'Unknown'))
+        url = doc.metadata.get('url', '')
+
+        # Create unique identifier
+        source_id = f"{source_file}|{url}"
+        if source_id in seen_sources:
+            continue
+        seen_sources.add(source_id)
+
+        if url:
+            sources.append({
+                'name': source_file.replace('.txt', '').replace('-', ' ').title(),
+                'url': url,
+                'file': source_file
+            })
+
+    return sources
+
+
+def batch_line(chatbot, item):
+    """Encode one ask_batch() result as an NDJSON line for /chat/batch"""
+    if 'error' in item:
+        line = {'index': item['index'], 'question': item['question'], 'error': item['error']}
+    else:
+        is_non_bafog = chatbot._is_non_bafog_response(item['answer'])
+        line = {
+            'index': item['index'],
+            'question': item['question'],
+            'answer': item['answer'],
+            'sources': [] if is_non_bafog else format_sources(item['sources']),
+            'token_usage': item.get('token_usage'),
+            'cache_hit': item.get('cache_hit', False),
+            'faq_match': item.get('faq_match')
+        }
+    return json.dumps(line, ensure_ascii=False) + "\n"
+
+
+def batch_concurrency(requested):
+    """Clamp a requested batch concurrency to BATCH_MAX_CONCURRENCY"""
+    limit = int(os.getenv('BATCH_MAX_CONCURRENCY', 8))
+    try:
+        return max(1, min(int(requested or os.getenv('BATCH_CONCURRENCY', 4)), limit))
+    except (TypeError, ValueError):
+        return min(int(os.getenv('BATCH_CONCURRENCY', 4)), limit)
+
+
+def sse_event(event, data):
+    """Encode a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
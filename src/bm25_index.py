@@ -0,0 +1,126 @@
+"""
+BM25 Index
+Precomputed lexical (BM25) inverted index over knowledge base chunks
+"""
+import re
+import json
+import math
+import heapq
+
+UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+# Common German function words (after umlaut normalization)
+GERMAN_STOPWORDS = {
+    'der', 'die', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einen', 'einem',
+    'einer', 'eines', 'und', 'oder', 'aber', 'als', 'auch', 'auf', 'aus', 'bei',
+    'bis', 'durch', 'fuer', 'gegen', 'im', 'in', 'ist', 'sind', 'war', 'wird',
+    'werden', 'wurde', 'kann', 'koennen', 'mit', 'nach', 'nicht', 'noch', 'nur',
+    'ob', 'ohne', 'sich', 'sie', 'er', 'es', 'ich', 'wir', 'ihr', 'man', 'so',
+    'um', 'von', 'vom', 'vor', 'wie', 'was', 'wer', 'wann', 'wenn', 'zu', 'zum',
+    'zur', 'ueber', 'unter', 'dass', 'da', 'hat', 'haben', 'mein', 'meine',
+    'gibt', 'am', 'an', 'dann', 'denn', 'doch', 'hier', 'mehr', 'sehr',
+}
+
+
+def normalize(text):
+    """Lowercase and replace umlauts/ß so 'Bedarfssätze' matches 'bedarfssaetze'"""
+    return text.lower().translate(UMLAUTS)
+
+
+def stem(token):
+    """Strip common German inflection suffixes (very light stemming)"""
+    for suffix in ('ern', 'en', 'er', 'es', 'e', 's', 'n'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized, stemmed terms without stopwords"""
+    return [
+        stem(token)
+        for token in re.findall(r'[a-z0-9]+', normalize(text))
+        if len(token) > 1 and token not in GERMAN_STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 weights precomputed per posting, so a query
+    is a sum over the postings of its terms.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.postings = {}
+
+    def build(self, ids, texts, metadatas):
+        """Build the index from chunk IDs, texts and metadata"""
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+
+        term_counts = [self._count_terms(text) for text in self.texts]
+        doc_lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+        document_frequency = {}
+        for counts in term_counts:
+            for term in counts:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        num_docs = len(self.texts)
+        self.postings = {}
+        for doc_index, counts in enumerate(term_counts):
+            length_norm = 1 - self.b + self.b * (doc_lengths[doc_index] / avg_length if avg_length else 0)
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                self.postings.setdefault(term, []).append((doc_index, weight))
+        return self
+
+    def _count_terms(self, text):
+        counts = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+    def search(self, query, k=10):
+        """Return up to k (document index, score) pairs, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            for doc_index, weight in self.postings.get(term, ()):
+                scores[doc_index] = scores.get(doc_index, 0.0) + weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path):
+        """Save the index as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'ids': self.ids,
+                'texts': self.texts,
+                'metadatas': self.metadatas,
+                'postings': self.postings
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(k1=data['k1'], b=data['b'])
+        index.ids = data['ids']
+        index.texts = data['texts']
+        index.metadatas = data['metadatas']
+        index.postings = {
+            term: [tuple(posting) for posting in postings]
+            for term, postings in data['postings'].items()
+        }
+        return index
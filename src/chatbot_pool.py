@@ -0,0 +1,85 @@
+"""
+Chatbot Pool
+Bounded, thread-safe cache of chatbot instances keyed by API key
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def hash_api_key(api_key):
+    """Return a stable hash of an API key so raw keys are never stored"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class ChatbotPool:
+    """
+    Keeps one chatbot per API key so steady-state requests skip building
+    the LLM client, retriever, prompt and QA chain.
+
+    Entries are evicted least-recently-used once max_size is reached, and
+    expire after ttl seconds (ttl=None disables expiry).
+    """
+
+    def __init__(self, factory, max_size=32, ttl=3600):
+        self.factory = factory
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, api_key):
+        """Return the chatbot for api_key, creating it on a miss"""
+        key_hash = hash_api_key(api_key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is not None:
+                chatbot, created_at = entry
+                if self.ttl is None or now - created_at < self.ttl:
+                    self._entries.move_to_end(key_hash)
+                    self.hits += 1
+                    return chatbot
+                # Expired entry
+                del self._entries[key_hash]
+                self.evictions += 1
+            self.misses += 1
+
+        # Build outside the lock so a slow construction doesn't block other keys
+        chatbot = self.factory(api_key)
+
+        with self._lock:
+            self._entries[key_hash] = (chatbot, now)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return chatbot
+
+    def invalidate(self, api_key):
+        """Drop the chatbot for api_key (e.g. after an authentication error)"""
+        with self._lock:
+            self._entries.pop(hash_api_key(api_key), None)
+
+    def clear(self):
+        """Drop all pooled chatbots"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return pool statistics for monitoring"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,162 @@
+"""
+Chunking
+Splits knowledge base documents into chunks along their structure
+"""
+import os
+import re
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+STRATEGIES = ('recursive', 'structured')
+
+# Paragraphs are separated by blank lines in the scraped files
+PARAGRAPH_PATTERN = re.compile(r'\n\s*\n')
+
+# Headings and questions are single short lines; headings have no closing punctuation
+MAX_HEADING_CHARS = 150
+
+
+def is_question(paragraph):
+    return '\n' not in paragraph and len(paragraph) <= MAX_HEADING_CHARS * 2 and paragraph.endswith('?')
+
+
+def is_heading(paragraph):
+    return ('\n' not in paragraph and len(paragraph) <= MAX_HEADING_CHARS
+            and not paragraph.startswith('[') and paragraph[-1] not in '.!:;,)]"“')
+
+
+def split_sections(text):
+    """
+    Group paragraphs into (title, paragraphs) sections
+
+    A question or heading line starts a new section; the paragraphs after it
+    (the answer) belong to it. Consecutive headings without text between them
+    are joined, so "Berechnung" followed by "Info: ..." stays one section.
+    """
+    sections = []
+    title = None
+    body = []
+    for paragraph in PARAGRAPH_PATTERN.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if is_question(paragraph) or is_heading(paragraph):
+            if body or title is None:
+                if title is not None or body:
+                    sections.append((title, body))
+                title, body = paragraph, []
+            else:
+                title = f"{title}\n{paragraph}"
+            continue
+        body.append(paragraph)
+    if title is not None or body:
+        sections.append((title, body))
+    return sections
+
+
+class StructuredSplitter:
+    """
+    Splits on question/answer and heading boundaries
+
+    Every section (a heading or question with the text up to the next one)
+    becomes one chunk when it fits chunk_size. Short neighbouring sections are
+    packed together up to chunk_size; long sections are split with the
+    recursive splitter and each part repeats the section title. Chunks carry
+    the file title, section title and whether the section is a Q&A pair as
+    metadata.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=100):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_documents(self, documents):
+        chunks = []
+        for doc in documents:
+            chunks.extend(self.split_document(doc))
+        return chunks
+
+    def split_document(self, doc):
+        sections = split_sections(doc.page_content)
+        doc_title = sections[0][0] if sections and sections[0][0] else \
+            os.path.splitext(os.path.basename(doc.metadata.get('source', '')))[0]
+        chunks = []
+        pending = None
+
+        for title, body in sections:
+            text = "\n\n".join(([title] if title else []) + body)
+            metadata = dict(doc.metadata, title=doc_title, section=self._section_name(title),
+                            qa=bool(title and title.endswith('?')))
+
+            if len(text) > self.chunk_size:
+                if pending:
+                    chunks.append(pending)
+                    pending = None
+                chunks.extend(self._split_long(title, body, metadata))
+                continue
+
+            # Pack short sections together, but never two Q&A pairs into one chunk
+            if pending and not (pending.metadata['qa'] and metadata['qa']) \
+                    and len(pending.page_content) + len(text) + 2 <= self.chunk_size:
+                pending.page_content = f"{pending.page_content}\n\n{text}"
+                pending.metadata['qa'] = pending.metadata['qa'] or metadata['qa']
+                pending.metadata['section'] = pending.metadata['section'] or metadata['section']
+                continue
+            if pending:
+                chunks.append(pending)
+            pending = Document(page_content=text, metadata=metadata)
+
+        if pending:
+            chunks.append(pending)
+        return chunks
+
+    def _section_name(self, title):
+        # Joined headings: the last one is the most specific
+        return title.split('\n')[-1] if title else ''
+
+    def _split_long(self, title, body, metadata):
+        """Split an oversized section, repeating its title in every part"""
+        prefix = f"{title}\n\n" if title else ''
+        # Leave room for the title, but never split into tiny parts
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max(self.chunk_size - len(prefix), self.chunk_size // 2),
+            chunk_overlap=min(self.chunk_overlap, self.chunk_size // 4),
+            length_function=len,
+        )
+        parts = [prefix + part for part in splitter.split_text("\n\n".join(body))]
+        return [Document(page_content=part, metadata=dict(metadata)) for part in parts]
+
+
+def create_splitter(strategy=None, chunk_size=1000, chunk_overlap=100):
+    """Text splitter for CHUNKING_STRATEGY: 'structured' (default) or 'recursive'"""
+    strategy = (strategy or os.getenv("CHUNKING_STRATEGY", "structured")).lower()
+    if strategy not in STRATEGIES:
+        print(f"Unknown CHUNKING_STRATEGY '{strategy}', using 'structured'")
+        strategy = 'structured'
+    if strategy == 'recursive':
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+    return StructuredSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def chunk_size_stats(chunks):
+    """Chunk count and character length distribution"""
+    sizes = sorted(len(chunk.page_content) for chunk in chunks)
+    if not sizes:
+        return {'chunks': 0}
+
+    def percentile(p):
+        return sizes[min(len(sizes) - 1, int(round(p / 100 * (len(sizes) - 1))))]
+
+    return {
+        'chunks': len(sizes),
+        'min': sizes[0],
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'max': sizes[-1],
+        'mean': round(sum(sizes) / len(sizes))
+    }
@@ -0,0 +1,57 @@
+"""
+Citation Index
+Looks up source citations for a question in knowledge_index.json
+"""
+import re
+import json
+import heapq
+
+# Must match create_knowledge_index.py and app.js
+TOKEN_PATTERN = re.compile(r'[a-zäöüß]+')
+
+
+class CitationIndex:
+    """
+    Inverted index built by create_knowledge_index.py. A lookup only
+    touches the postings of the question's terms (plus their German
+    synonyms), so its cost grows with the question, not the corpus.
+    """
+
+    def __init__(self, index_path="./knowledge_base/knowledge_index.json"):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.documents = index['documents']
+        self.stopwords = set(index['stopwords'])
+        self.synonyms = index['synonyms']
+        self.postings = index['postings']
+        self.default_sources = index.get('default_sources', [])
+
+    def query_terms(self, question):
+        """Tokenize a question and expand it with German synonyms"""
+        terms = {
+            term for term in TOKEN_PATTERN.findall(question.lower())
+            if len(term) > 2 and term not in self.stopwords
+        }
+        terms |= {self.synonyms[term] for term in terms if term in self.synonyms}
+        return terms
+
+    def lookup(self, question, k=3):
+        """Return up to k citation dicts (name, url, file), best match first"""
+        scores = {}
+        for term in self.query_terms(question):
+            for doc_index, weight in self.postings.get(term, ()):
+                scores[doc_index] = scores.get(doc_index, 0.0) + weight
+
+        if scores:
+            ranked = [doc_index for doc_index, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+        else:
+            ranked = self.default_sources[:k]
+
+        return [
+            {
+                'name': self.documents[doc_index]['name'],
+                'url': self.documents[doc_index]['url'],
+                'file': self.documents[doc_index]['file']
+            }
+            for doc_index in ranked
+        ]
@@ -0,0 +1,154 @@
+"""
+Context Builder
+Assembles the retrieved chunks into a compact prompt context within a token budget
+"""
+import os
+import re
+import json
+
+from langchain.schema import Document
+from src.bm25_index import tokenize
+
+# Rough token estimate for German text, avoids a tokenizer per request
+CHARS_PER_TOKEN = 4
+
+# Sentence ends followed by an uppercase letter or digit, or line breaks
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?:])\s+(?=[A-ZÄÖÜ0-9„"])|\n+')
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def parse_budgets(value):
+    """Parse CONTEXT_TOKEN_BUDGETS: JSON mapping model -> token budget"""
+    if not value:
+        return {}
+    try:
+        return {model: int(budget) for model, budget in json.loads(value).items()}
+    except (ValueError, TypeError) as e:
+        print(f"Ignoring invalid CONTEXT_TOKEN_BUDGETS: {e}")
+        return {}
+
+
+class ContextBuilder:
+    """
+    Sits between the retriever and the prompt:
+
+    1. Removes repeated text: exact duplicate chunks and the overlap that
+       consecutive chunks of the same file share (the splitter overlaps
+       chunks by chunk_overlap characters).
+    2. Drops sentences whose share of question terms is below
+       min_relevance, keeping the neighbours of relevant sentences for
+       coherence. Chunks without any question term (e.g. an English
+       question against German text) are kept whole, since lexical
+       overlap cannot judge them.
+    3. Adds chunks in retrieval order until the model's token budget is
+       used up, cutting the last one at a sentence boundary (a first
+       sentence longer than the whole budget is cut at a word boundary).
+    """
+
+    def __init__(self, token_budget=None, model_budgets=None, min_relevance=None,
+                 min_overlap=20, max_overlap=300):
+        if token_budget is None:
+            token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))
+        if model_budgets is None:
+            model_budgets = parse_budgets(os.getenv("CONTEXT_TOKEN_BUDGETS"))
+        if min_relevance is None:
+            min_relevance = float(os.getenv("CONTEXT_MIN_RELEVANCE", 0.2))
+        self.token_budget = token_budget
+        self.model_budgets = model_budgets
+        self.min_relevance = min_relevance
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+
+    def budget_for(self, model):
+        """Context token budget for a model"""
+        return self.model_budgets.get(model, self.token_budget)
+
+    def build(self, question, documents, model=None):
+        """Return compressed copies of the documents that fit the budget"""
+        question_terms = set(tokenize(question))
+        budget = self.budget_for(model)
+        used = 0
+        context = []
+
+        for doc in self.deduplicate(documents):
+            sentences = self.relevant_sentences(doc.page_content, question_terms)
+            kept = []
+            for sentence in sentences:
+                tokens = estimate_tokens(sentence)
+                if used + tokens > budget:
+                    if not context and not kept:
+                        # One sentence longer than the whole budget: send its start, not nothing
+                        kept.append(self._truncate(sentence, budget))
+                        used = budget
+                    break
+                kept.append(sentence)
+                used += tokens
+            if kept:
+                context.append(Document(page_content="\n".join(kept), metadata=doc.metadata))
+            if used >= budget or len(kept) < len(sentences):
+                break
+
+        return context
+
+    def _truncate(self, text, tokens):
+        """The start of text within tokens, cut at a word boundary"""
+        cut = text[:tokens * CHARS_PER_TOKEN]
+        if len(cut) < len(text) and ' ' in cut:
+            cut = cut[:cut.rfind(' ')]
+        return cut.rstrip()
+
+    def deduplicate(self, documents):
+        """Drop repeated chunks and strip text overlapping an earlier chunk of the same file"""
+        kept = []
+        for doc in documents:
+            text = doc.page_content
+            source = doc.metadata.get('source')
+            duplicate = False
+            for previous in kept:
+                if previous.metadata.get('source') != source:
+                    continue
+                if text in previous.page_content:
+                    duplicate = True
+                    break
+                # Overlap: end of one chunk repeated at the start of the other
+                overlap = self._overlap(previous.page_content, text)
+                if overlap:
+                    text = text[overlap:].lstrip()
+                else:
+                    overlap = self._overlap(text, previous.page_content)
+                    if overlap:
+                        text = text[:-overlap].rstrip()
+            if not duplicate and text.strip():
+                kept.append(Document(page_content=text, metadata=doc.metadata))
+        return kept
+
+    def _overlap(self, first, second):
+        """Length of the longest suffix of first that is a prefix of second"""
+        longest = min(len(first), len(second), self.max_overlap)
+        for length in range(longest, self.min_overlap - 1, -1):
+            if first.endswith(second[:length]):
+                return length
+        return 0
+
+    def relevant_sentences(self, text, question_terms):
+        """Sentences of a chunk worth sending for the question terms"""
+        sentences = [s.strip() for s in SENTENCE_PATTERN.split(text) if s and s.strip()]
+        if not question_terms or not self.min_relevance:
+            return sentences
+
+        relevant = [
+            len(question_terms & set(tokenize(sentence))) / len(question_terms) >= self.min_relevance
+            for sentence in sentences
+        ]
+        if not any(relevant):
+            return sentences
+
+        # Keep relevant sentences and their direct neighbours
+        keep = set()
+        for index, is_relevant in enumerate(relevant):
+            if is_relevant:
+                keep.update((index - 1, index, index + 1))
+        return [sentence for index, sentence in enumerate(sentences) if index in keep]
@@ -0,0 +1,247 @@
+"""
+Conversation Store
+Session-scoped conversation history for multi-turn chats, bounded in memory and tokens
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from src.bm25_index import tokenize, normalize
+from src.context_builder import SENTENCE_PATTERN, estimate_tokens
+
+# Openings of follow-up questions that refer back to the previous turn
+# (matched after normalize(), so umlauts are spelled out)
+FOLLOW_UP_PATTERN = re.compile(
+    r'^(und|aber|auch|oder|was ist mit|wie ist es mit|wie sieht es mit|gilt das|'
+    r'das|dies\w*|da(?:fuer|zu|von|rauf|mit|bei|nach|r)|es|er|ihn|ihm|dort|dann|trotzdem|'
+    r'and|what about|how about|is that|does that|it)\b'
+)
+
+SUMMARY_HEADER = "Zusammenfassung früherer Fragen:"
+
+
+def first_sentence(text):
+    sentences = [s.strip() for s in SENTENCE_PATTERN.split(text or '') if s and s.strip()]
+    return sentences[0] if sentences else ''
+
+
+def truncate_tokens(text, max_tokens, keep='start'):
+    """Cut text to about max_tokens at sentence boundaries, keeping its start or end"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = [s.strip() for s in SENTENCE_PATTERN.split(text) if s and s.strip()]
+    if keep == 'end':
+        sentences.reverse()
+    kept = []
+    used = 0
+    for sentence in sentences:
+        used += estimate_tokens(sentence)
+        if used > max_tokens and kept:
+            break
+        kept.append(sentence)
+    if keep == 'end':
+        kept.reverse()
+    result = ' '.join(kept)
+    # A single sentence longer than the budget is cut by characters
+    return result[:max_tokens * 4] if estimate_tokens(result) > max_tokens else result
+
+
+def extractive_summary(summary, turns):
+    """Fold turns into the summary: each question with the first sentence of its answer"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        lines.append(f"{turn['question']} → {first_sentence(turn['answer'])}")
+    return '\n'.join(lines)
+
+
+def trim_summary(summary, max_tokens):
+    """Drop the oldest summary lines until it fits max_tokens"""
+    lines = summary.split('\n') if summary else []
+    while lines and estimate_tokens('\n'.join(lines)) > max_tokens:
+        if len(lines) == 1:
+            return truncate_tokens(lines[0], max_tokens, keep='end') if max_tokens > 0 else ''
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def is_follow_up(question):
+    """Heuristic: short questions or ones opening with a back-reference depend on the previous turn"""
+    return len(tokenize(question)) <= 2 or bool(FOLLOW_UP_PATTERN.match(normalize(question).strip()))
+
+
+def rewrite_query(question, history):
+    """
+    Make a follow-up question self-contained for retrieval
+
+    "Und für Schüler?" after "Wie hoch ist der Höchstsatz für Studierende?"
+    retrieves with both questions, so the search has the topic the follow-up
+    leaves out. Questions that stand on their own are returned unchanged.
+    No LLM call is needed.
+    """
+    if not history or not history['turns'] or not is_follow_up(question):
+        return question
+    return f"{history['turns'][-1]['question']} {question}"
+
+
+class ConversationStore:
+    """
+    In-memory conversation history per session:
+
+    - At most max_sessions sessions are kept (LRU); evicted sessions are
+      written to spill_dir as JSON if configured, else dropped.
+    - Sessions expire ttl seconds after their last turn.
+    - Each session's history stays within token_budget: the last keep_turns
+      turns are kept verbatim and share two thirds of the budget (long
+      answers are cut), older turns are folded into a rolling summary, which
+      gets the rest of the budget and loses its oldest lines first.
+    """
+
+    def __init__(self, max_sessions=None, ttl=None, token_budget=None, spill_dir=None, keep_turns=2):
+        if max_sessions is None:
+            max_sessions = int(os.getenv("CONVERSATION_MAX_SESSIONS", 1000))
+        if ttl is None:
+            ttl = int(os.getenv("CONVERSATION_TTL", 1800))
+        if token_budget is None:
+            token_budget = int(os.getenv("CONVERSATION_TOKEN_BUDGET", 400))
+        if spill_dir is None:
+            spill_dir = os.getenv("CONVERSATION_SPILL_DIR") or None
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.spill_dir = spill_dir
+        self.keep_turns = keep_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.spilled = 0
+        self.summarized = 0
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + ".json")
+
+    def _expired(self, session, now):
+        return self.ttl is not None and now - session['updated'] > self.ttl
+
+    def _load_spilled(self, key, now):
+        """Bring an evicted session back from disk"""
+        if not self.spill_dir or not os.path.exists(self._spill_path(key)):
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return None if self._expired(session, now) else session
+
+    def _evict(self):
+        """Drop or spill least recently used sessions beyond max_sessions"""
+        while len(self._sessions) > self.max_sessions:
+            key, session = self._sessions.popitem(last=False)
+            self.evictions += 1
+            if self.spill_dir:
+                with open(self._spill_path(key), 'w', encoding='utf-8') as f:
+                    json.dump(session, f, ensure_ascii=False)
+                self.spilled += 1
+
+    def get(self, key):
+        """Copy of a session's history ({'summary', 'turns'}), or None if unknown or expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._load_spilled(key, now)
+                if session is not None:
+                    self._sessions[key] = session
+                    self._evict()
+            elif self._expired(session, now):
+                del self._sessions[key]
+                session = None
+            if session is None:
+                return None
+            self._sessions.move_to_end(key)
+            return {'summary': session['summary'], 'turns': list(session['turns'])}
+
+    def add_turn(self, key, question, answer, summarize=None):
+        """
+        Append a question/answer turn and enforce the token budget
+
+        summarize(summary, turns) -> new summary folds old turns into the
+        summary (default: extractive, no LLM call).
+        """
+        turn_budget = self.token_budget * 2 // 3 // max(self.keep_turns, 1)
+        answer = truncate_tokens(answer, max(turn_budget - estimate_tokens(question) - 4, 10))
+        now = time.time()
+        with self._lock:
+            session = self._sessions.pop(key, None) or self._load_spilled(key, now)
+            if session is None or self._expired(session, now):
+                session = {'summary': '', 'turns': []}
+            session['turns'].append({'question': question, 'answer': answer})
+            session['updated'] = now
+            self._sessions[key] = session
+            self._evict()
+            old_turns = []
+            if self.tokens(session) > self.token_budget and len(session['turns']) > self.keep_turns:
+                old_turns = session['turns'][:-self.keep_turns]
+                session['turns'] = session['turns'][-self.keep_turns:]
+            summary = session['summary']
+            kept_turns = list(session['turns'])
+
+        if not old_turns:
+            return
+        # Summarize outside the lock: an LLM summarizer is slow
+        try:
+            summary = (summarize or extractive_summary)(summary, old_turns)
+        except Exception as e:
+            print(f"Conversation summary failed, using extractive summary: {e}")
+            summary = extractive_summary(summary, old_turns)
+        # The summary gets what the kept turns and the headers leave of the budget
+        used = self.tokens({'summary': SUMMARY_HEADER, 'turns': kept_turns})
+        summary = trim_summary(summary, self.token_budget - used)
+        with self._lock:
+            if key in self._sessions:
+                self._sessions[key]['summary'] = summary
+                self.summarized += 1
+
+    def clear(self, key):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(key, None)
+            if self.spill_dir and os.path.exists(self._spill_path(key)):
+                os.remove(self._spill_path(key))
+
+    def tokens(self, session):
+        return estimate_tokens(self.history_text(session))
+
+    def history_text(self, session):
+        """The conversation so far as prompt text (German, like the prompt)"""
+        if not session:
+            return ''
+        lines = []
+        if session['summary']:
+            lines.append(f"{SUMMARY_HEADER}\n{session['summary']}")
+        for turn in session['turns']:
+            lines.append(f"Nutzer: {turn['question']}\nAssistent: {turn['answer']}")
+        return '\n'.join(lines)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'evictions': self.evictions,
+                'spilled': self.spilled,
+                'summarized': self.summarized
+            }
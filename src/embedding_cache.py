@@ -0,0 +1,169 @@
+"""
+Embedding Cache
+Persistent cache of text embeddings keyed by content hash and model name
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model and caches its vectors on disk.
+
+    Vectors are stored as raw float32 rows in vectors.f32 (read through a
+    memory map) and index.json maps hash(model name + text) to a row.
+    Document embeddings computed while indexing are appended to the disk
+    cache; query embeddings computed at serve time are kept in a bounded
+    in-memory LRU so concurrent server processes never write the cache.
+    """
+
+    def __init__(self, embeddings, model_name, cache_dir="./embedding_cache", max_queries=1024):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_queries = max_queries
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._queries = OrderedDict()
+        self._dim = None
+        self._rows = {}
+        self._vectors = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()[:32]
+
+    def _load(self):
+        """Open the index and memory-map the stored vectors"""
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self._dim = index['dim']
+        self._rows = index['rows']
+        self._map_vectors()
+
+    def _map_vectors(self):
+        if not self._rows:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode='r',
+            shape=(len(self._rows), self._dim)
+        )
+
+    def _lookup(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return self._vectors[row].tolist()
+
+    def _append(self, keys, vectors):
+        """Append new vectors to the disk cache"""
+        array = np.asarray(vectors, dtype=np.float32)
+        if self._dim is None:
+            self._dim = array.shape[1]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write vectors before the index so the index never points past the file end
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(len(self._rows) * self._dim * 4)
+            f.write(array.tobytes())
+        for key in keys:
+            self._rows[key] = len(self._rows)
+
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self._dim, 'rows': self._rows}, f)
+        os.replace(tmp_path, self._index_path)
+        self._map_vectors()
+
+    def embed_documents(self, texts):
+        """Embed documents, computing only texts not already cached"""
+        with self._lock:
+            keys = [self._key(text) for text in texts]
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+                self._append(list(missing.keys()), vectors)
+
+            return [self._lookup(key) for key in keys]
+
+    def embed_query(self, text):
+        """Embed a query, reusing cached vectors for repeated query strings"""
+        key = self._key(text)
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                self.hits += 1
+                return self._queries[key]
+            vector = self._lookup(key)
+            if vector is not None:
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+
+        with self._lock:
+            self._queries[key] = vector
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return vector
+
+    def embed_queries(self, texts):
+        """Embed several queries, computing all uncached ones in one batch"""
+        vectors = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self._key(text)
+                if key in self._queries:
+                    self._queries.move_to_end(key)
+                    vectors[i] = self._queries[key]
+                else:
+                    vectors[i] = self._lookup(key)
+                if vectors[i] is None:
+                    missing.append(i)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, computed):
+                    vectors[i] = vector
+                    self._queries[self._key(texts[i])] = vector
+                while len(self._queries) > self.max_queries:
+                    self._queries.popitem(last=False)
+        return vectors
+
+    def clear_queries(self):
+        """Drop the in-memory query vectors (stored document vectors are kept)"""
+        with self._lock:
+            self._queries.clear()
+
+    def stats(self):
+        """Return cache statistics"""
+        with self._lock:
+            return {
+                'stored_vectors': len(self._rows),
+                'cached_queries': len(self._queries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,118 @@
+"""
+Embedding Pipeline
+Batched, multi-core embedding of document chunks for knowledge base builds
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps a HuggingFaceEmbeddings model and embeds documents in batches.
+
+    - threads > 1 embeds several batches concurrently in one process
+      (PyTorch releases the GIL while encoding)
+    - processes > 1 spreads batches over a pool of worker processes, each
+      with its own copy of the sentence-transformers model (PyTorch backend
+      only; other models fall back to threads)
+
+    Progress is printed while embedding and throughput is kept in stats.
+    Queries are passed straight through to the wrapped model.
+    """
+
+    def __init__(self, embeddings, batch_size=64, threads=1, processes=0, show_progress=True):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.threads = max(1, threads)
+        self.processes = processes
+        self.show_progress = show_progress
+        self.stats = {'chunks': 0, 'seconds': 0.0}
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts):
+        """Embed documents in batches, reporting progress and throughput"""
+        if not texts:
+            return []
+
+        start_time = time.perf_counter()
+        if self.processes > 1 and hasattr(self.embeddings, 'client'):
+            vectors = self._embed_multi_process(texts)
+        else:
+            vectors = self._embed_threaded(texts)
+
+        elapsed = time.perf_counter() - start_time
+        self.stats['chunks'] += len(texts)
+        self.stats['seconds'] += elapsed
+        return vectors
+
+    def _batches(self, texts, size):
+        return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    def _report(self, done, total, start_time):
+        if not self.show_progress:
+            return
+        elapsed = time.perf_counter() - start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(f"  Embedded {done}/{total} chunks ({rate:.1f} chunks/s)")
+
+    def _embed_threaded(self, texts):
+        batches = self._batches(texts, self.batch_size)
+        start_time = time.perf_counter()
+        vectors = []
+
+        if self.threads == 1:
+            for batch in batches:
+                vectors.extend(self.embeddings.embed_documents(batch))
+                self._report(len(vectors), len(texts), start_time)
+            return vectors
+
+        torch_threads = self._limit_torch_threads()
+        try:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                # map() yields results in order, so vectors stay aligned with texts
+                for result in executor.map(self.embeddings.embed_documents, batches):
+                    vectors.extend(result)
+                    self._report(len(vectors), len(texts), start_time)
+        finally:
+            # The thread count is process-wide: give later torch calls their cores back
+            if torch_threads is not None:
+                sys.modules['torch'].set_num_threads(torch_threads)
+        return vectors
+
+    def _embed_multi_process(self, texts):
+        model = self.embeddings.client
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * self.processes)
+        start_time = time.perf_counter()
+        vectors = []
+        try:
+            # Feed the pool in large slices so progress can be reported
+            slice_size = self.batch_size * self.processes * 4
+            for texts_slice in self._batches(texts, slice_size):
+                result = model.encode_multi_process(texts_slice, pool, batch_size=self.batch_size)
+                vectors.extend(result.tolist())
+                self._report(len(vectors), len(texts), start_time)
+        finally:
+            model.stop_multi_process_pool(pool)
+        return vectors
+
+    def _limit_torch_threads(self):
+        """Split CPU cores between embedding threads to avoid oversubscription; returns the old count"""
+        # Nothing to limit if the model doesn't run on PyTorch (ONNX backend)
+        torch = sys.modules.get('torch')
+        if torch is None:
+            return None
+        previous = torch.get_num_threads()
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.threads))
+        return previous
+
+    def throughput(self):
+        """Return embedded chunks per second, or None if nothing was embedded"""
+        if not self.stats['chunks'] or not self.stats['seconds']:
+            return None
+        return self.stats['chunks'] / self.stats['seconds']
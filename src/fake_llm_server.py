@@ -0,0 +1,138 @@
+"""
+Fake LLM Server
+Local OpenAI-compatible completions endpoint with simulated latency, for benchmarks
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer:
+    """
+    Serves POST /completions like OpenRouter does, without a model behind it.
+
+    Every response waits `latency` seconds (time to first token) and then
+    produces `completion_tokens` tokens at `tokens_per_second`, streamed as
+    server-sent events when the request asks for it. Token usage is reported
+    in the `usage` field (prompt tokens estimated as characters / 4).
+    With a `price` (USD per million tokens), requests asking for usage
+    accounting (`usage.include`) also get the `cost` field OpenRouter adds.
+    The first `rate_limited` requests are answered with HTTP 429 and a
+    Retry-After header instead.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=100.0, completion_tokens=50,
+                 host='127.0.0.1', port=0, rate_limited=0, price=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_limited = rate_limited
+        self.price = price
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass as the LLM client's base_url"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _token_delay(self):
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                server.requests += 1
+                if server.requests <= server.rate_limited:
+                    self._send_json({'error': {'message': 'Rate limit exceeded', 'code': 429}}, status=429,
+                                    headers={'Retry-After': '0'})
+                    return
+
+                prompt = body.get('prompt', '')
+                if isinstance(prompt, list):
+                    prompt = prompt[0] if prompt else ''
+                usage = {
+                    'prompt_tokens': max(1, len(prompt) // 4),
+                    'completion_tokens': server.completion_tokens,
+                    'total_tokens': max(1, len(prompt) // 4) + server.completion_tokens
+                }
+                if server.price is not None and (body.get('usage') or {}).get('include'):
+                    usage['cost'] = usage['total_tokens'] * server.price / 1_000_000
+                tokens = [f"token{i} " for i in range(server.completion_tokens)]
+
+                time.sleep(server.latency)
+                if body.get('stream'):
+                    self._stream(body, tokens, usage)
+                else:
+                    time.sleep(server._token_delay() * len(tokens))
+                    self._send_json(self._completion(body, ''.join(tokens), usage))
+
+            def _completion(self, body, text, usage=None):
+                completion = {
+                    'id': 'cmpl-fake',
+                    'object': 'text_completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'fake'),
+                    'choices': [{'text': text, 'index': 0, 'logprobs': None,
+                                 'finish_reason': 'stop' if usage else None}]
+                }
+                if usage:
+                    completion['usage'] = usage
+                return completion
+
+            def _send_json(self, data, status=200, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, tokens, usage):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for token in tokens:
+                    chunk = json.dumps(self._completion(body, token))
+                    self.wfile.write(f"data: {chunk}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(server._token_delay())
+                if (body.get('stream_options') or {}).get('include_usage'):
+                    chunk = json.dumps({**self._completion(body, ''), 'choices': [], 'usage': usage})
+                    self.wfile.write(f"data: {chunk}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,154 @@
+"""
+FAQ Store
+Canonical question/answer pairs from the knowledge base, matched by question embedding
+"""
+import os
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+from langchain.schema import Document
+
+from src.chunking import split_sections
+from src.retrieval_cache import normalize_query
+
+FAQ_STORE_FILE = "faq_store.json"
+
+# Long answers are cut at a paragraph boundary; the source link has the rest
+MAX_ANSWER_CHARS = 1500
+
+
+def _is_question_title(title):
+    # Joined headings: the last line is the section's own title
+    return bool(title) and title.split('\n')[-1].endswith('?')
+
+
+def _answer_text(paragraphs, max_chars=MAX_ANSWER_CHARS):
+    kept = []
+    used = 0
+    for paragraph in paragraphs:
+        if kept and used + len(paragraph) > max_chars:
+            break
+        kept.append(paragraph)
+        used += len(paragraph) + 2
+    # Don't end on a lead-in to a list that was cut off
+    while len(kept) > 1 and kept[-1].endswith(':'):
+        kept.pop()
+    return "\n\n".join(kept)
+
+
+def extract_pairs(text, source, url=''):
+    """
+    Question/answer pairs of one knowledge base file
+
+    Every section titled with a question is a pair; the answer is its text
+    plus the following sections with plain headings, up to the next
+    question. Files like gibt-es-eine-altersgrenze.txt are one pair, the
+    FAQ page Fragen_und_Antworten.txt is many.
+    """
+    pairs = []
+    current = None
+    for title, body in split_sections(text):
+        if _is_question_title(title):
+            current = {'question': title.split('\n')[-1], 'paragraphs': list(body)}
+            pairs.append(current)
+        elif current is not None:
+            current['paragraphs'].extend(([title] if title else []) + body)
+    return [
+        {'question': pair['question'], 'answer': _answer_text(pair['paragraphs']), 'source': source, 'url': url}
+        for pair in pairs if pair['paragraphs']
+    ]
+
+
+def extract_faq(knowledge_base_path, url_mapping=None):
+    """
+    Pairs of all knowledge base files
+    A question asked in several files keeps the longest answer: overview
+    pages only tease the answer of the page dedicated to the question.
+    """
+    url_mapping = url_mapping or {}
+    pairs = {}
+    for path in sorted(Path(knowledge_base_path).glob("**/*.txt")):
+        text = path.read_text(encoding='utf-8')
+        for pair in extract_pairs(text, str(path), url_mapping.get(path.name, '')):
+            key = normalize_query(pair['question'])
+            if key not in pairs or len(pair['answer']) > len(pairs[key]['answer']):
+                pairs[key] = pair
+    return list(pairs.values())
+
+
+class FaqStore:
+    """
+    Answers questions that match a canonical FAQ question closely enough
+    (cosine similarity of the question embeddings >= threshold) with the
+    canonical answer and its source, without retrieval or an LLM call.
+
+    The store is built by create_faq_store.py and records the embedding model
+    and knowledge base version it was built with; load() refuses a store
+    built for another model or an older knowledge base.
+    """
+
+    def __init__(self, pairs, vectors, threshold=None):
+        if threshold is None:
+            threshold = float(os.getenv("FAQ_THRESHOLD", 0.92))
+        self.pairs = pairs
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(pairs), -1) if pairs else np.zeros((0, 1))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(cls, pairs, embeddings):
+        return cls(pairs, embeddings.embed_documents([pair['question'] for pair in pairs]))
+
+    def save(self, path, embedding_name, kb_version):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'embedding': embedding_name,
+                'kb_version': kb_version,
+                'pairs': self.pairs,
+                'vectors': [[round(float(x), 6) for x in vector] for vector in self.vectors]
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, embedding_name, kb_version, threshold=None):
+        """The store at path, or None if it is missing or was built for another model or version"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data['embedding'] != embedding_name:
+            print(f"FAQ store was built with {data['embedding']}, not {embedding_name}; "
+                  "run python create_faq_store.py")
+            return None
+        if kb_version is not None and data['kb_version'] != kb_version:
+            print("FAQ store is older than the knowledge base; run python create_faq_store.py")
+            return None
+        return cls(data['pairs'], data['vectors'], threshold)
+
+    def match(self, embedding):
+        """Best matching pair with its similarity, or None below the threshold"""
+        if not self.pairs or embedding is None:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm > 0 else query)
+        best = int(scores.argmax())
+        with self._lock:
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {**self.pairs[best], 'similarity': round(float(scores[best]), 4)}
+
+    def document(self, pair):
+        """The answer as a source document, for citations"""
+        return Document(page_content=pair['answer'], metadata={'source': pair['source'], 'url': pair['url']})
+
+    def stats(self):
+        with self._lock:
+            return {'pairs': len(self.pairs), 'threshold': self.threshold, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,65 @@
+"""
+Hybrid Retriever
+Combines BM25 lexical search with vector similarity search
+"""
+from typing import Any, List
+
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves fetch_k candidates from the vector store and from the BM25
+    index and merges them with reciprocal rank fusion:
+
+        score(doc) = sum over rankings of 1 / (rrf_k + rank)
+
+    Exact statutory terms ("Flexibilitätssemester", "Bedarfssätze") are
+    found by the lexical side even when the embedding model misses them.
+    """
+
+    vectorstore: VectorStore
+    lexical_index: Any
+    k: int = 3
+    fetch_k: int = 10
+    rrf_k: int = 60
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.search(query)
+
+    def search(self, query, embedding=None, k=None):
+        """
+        Hybrid search, reusing the query embedding if it was already computed
+        k overrides self.k, e.g. to over-fetch candidates for reranking.
+        """
+        k = k or self.k
+        fetch_k = max(self.fetch_k, k)
+        if embedding is None:
+            vector_docs = self.vectorstore.similarity_search(query, k=fetch_k)
+        else:
+            vector_docs = self.vectorstore.similarity_search_by_vector(embedding, k=fetch_k)
+        lexical_docs = [
+            Document(
+                page_content=self.lexical_index.texts[doc_index],
+                metadata=self.lexical_index.metadatas[doc_index]
+            )
+            for doc_index, _ in self.lexical_index.search(query, k=fetch_k)
+        ]
+        return self.fuse([vector_docs, lexical_docs])[:k]
+
+    def fuse(self, rankings):
+        """Merge ranked document lists with reciprocal rank fusion"""
+        scores = {}
+        documents = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking, start=1):
+                key = (doc.metadata.get('source'), doc.page_content)
+                documents.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [documents[key] for key in ranked]
@@ -4,21 +4,121 @@ Loads and processes BAföG text files into a vector database
 """
 import os
 import json
+import hashlib
 from pathlib import Path
 from langchain_community.document_loaders import TextLoader, DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
+from src.embedding_cache import CachedEmbeddings
+from src.embedding_pipeline import BatchedEmbeddings
+from src.bm25_index import BM25Index
+from src.numpy_vectorstore import NumpyVectorStore
+from src.retrieval_cache import RetrievalCache
+from src.faq_store import FaqStore, FAQ_STORE_FILE
+from src.reranker import Reranker
+from src.chunking import create_splitter, chunk_size_stats
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 
 class KnowledgeBaseLoader:
-    def __init__(self, knowledge_base_path="./knowledge_base", persist_directory="./chroma_db"):
+    def __init__(self, knowledge_base_path="./knowledge_base", persist_directory="./chroma_db",
+                 embedding_cache_dir=None, embedding_batch_size=None, embedding_threads=None,
+                 embedding_processes=None, chunk_size=None, chunk_overlap=None, chunking_strategy=None,
+                 vector_backend=None, quantize=None, embedding_backend=None):
         self.knowledge_base_path = knowledge_base_path
         self.persist_directory = persist_directory
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+        self.chunk_size = chunk_size or int(os.getenv("CHUNK_SIZE", 1000))
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else int(os.getenv("CHUNK_OVERLAP", 100))
+        self.chunking_strategy = chunking_strategy or os.getenv("CHUNKING_STRATEGY", "structured")
+        
+        # Vector store: "chroma" or "numpy" (memory-mapped matrix, exact search)
+        self.vector_backend = (vector_backend or os.getenv("VECTOR_BACKEND", "chroma")).lower()
+        if self.vector_backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown VECTOR_BACKEND: {self.vector_backend}")
+        # Each backend keeps its store, manifest and BM25 index in its own folder;
+        # Chroma uses persist_directory itself, where its stores have always been
+        self.store_directory = persist_directory
+        if self.vector_backend == "numpy":
+            self.store_directory = os.path.join(persist_directory, "numpy")
+        if quantize is None:
+            quantize = os.getenv("VECTOR_QUANTIZE", "false").lower() == "true"
+        self.quantize = quantize
+        
+        # Batching and parallelism of the embedding stage used for index builds
+        if embedding_batch_size is None:
+            embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+        if embedding_threads is None:
+            embedding_threads = int(os.getenv("EMBEDDING_THREADS", 1))
+        if embedding_processes is None:
+            embedding_processes = int(os.getenv("EMBEDDING_PROCESSES", 0))
+        
+        # Embedding model: "torch" (sentence-transformers) or "onnx" (exported
+        # with export_onnx_model.py, run by ONNX Runtime without PyTorch)
+        self.embedding_backend = (embedding_backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+        if self.embedding_backend == "onnx":
+            from src.onnx_embeddings import OnnxEmbeddings
+            model = OnnxEmbeddings(
+                os.getenv("ONNX_MODEL_DIR", "./onnx_model"),
+                quantized=os.getenv("ONNX_QUANTIZED", "false").lower() == "true",
+                batch_size=embedding_batch_size
+            )
+            self.embedding_name = model.name
+        elif self.embedding_backend == "torch":
+            model = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL,
+                encode_kwargs={'batch_size': embedding_batch_size}
+            )
+            self.embedding_name = EMBEDDING_MODEL
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {self.embedding_backend}")
+        
+        self.embedding_pipeline = BatchedEmbeddings(
+            model,
+            batch_size=embedding_batch_size,
+            threads=embedding_threads,
+            processes=embedding_processes
         )
+        self.embeddings = self.embedding_pipeline
+        
+        # Cache embeddings on disk so rebuilds only embed new chunk text
+        # (set EMBEDDING_CACHE_DIR to an empty string to disable)
+        if embedding_cache_dir is None:
+            embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+        if embedding_cache_dir:
+            self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_name, embedding_cache_dir)
+        
         self.url_mapping = self._load_url_mapping()
+        self.version = None
+        self.lexical_index = None
+        
+        # Question embeddings and top-k results, shared by every chatbot built
+        # on this loader and emptied when the version changes
+        # (RETRIEVAL_CACHE=false disables)
+        self.retrieval_cache = None
+        if os.getenv("RETRIEVAL_CACHE", "true").lower() == "true":
+            self.retrieval_cache = RetrievalCache()
+        # Precomputed FAQ answers (create_faq_store.py), loaded for the current version
+        self.faq_store = None
+        # Cross-encoder second stage over over-fetched candidates (RERANK=true enables)
+        self.reranker = None
+        if os.getenv("RERANK", "false").lower() == "true":
+            self.reranker = Reranker()
+    
+    def _set_version(self, version):
+        self.version = version
+        if self.retrieval_cache:
+            self.retrieval_cache.set_version(version)
+        self.faq_store = self.load_faq_store()
+    
+    def load_faq_store(self):
+        """The FAQ answer store if built for this knowledge base and embedding model (FAQ_ANSWERS=false disables)"""
+        if os.getenv("FAQ_ANSWERS", "true").lower() != "true":
+            return None
+        store = FaqStore.load(os.path.join(self.knowledge_base_path, FAQ_STORE_FILE), self.embedding_name, self.version)
+        if store:
+            print(f"Loaded {len(store.pairs)} FAQ answers")
+        return store
     
     def _load_url_mapping(self):
         """Load URL mapping from JSON file if exists"""
@@ -28,6 +128,39 @@ class KnowledgeBaseLoader:
                 return json.load(f)
         return {}
     
+    def _source_files(self):
+        """Return all .txt files in the knowledge base, sorted by path"""
+        return sorted(Path(self.knowledge_base_path).glob("**/*.txt"))
+    
+    def _file_key(self, path):
+        """Manifest key for a knowledge base file (path relative to the knowledge base)"""
+        return Path(path).relative_to(self.knowledge_base_path).as_posix()
+    
+    def _hash_file(self, path):
+        """Content hash of a file, including its mapped URL (stored in chunk metadata)"""
+        digest = hashlib.sha256(Path(path).read_bytes())
+        digest.update(self.url_mapping.get(Path(path).name, '').encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get_version(self):
+        """
+        Compute a version string for the knowledge base contents
+        Changes whenever a .txt file or the URL mapping is added, removed or
+        edited, and when the store is re-indexed with another embedding model
+        or chunking settings (as recorded in its manifest)
+        """
+        digest = hashlib.sha256()
+        for path in self._source_files():
+            digest.update(self._file_key(path).encode('utf-8'))
+            digest.update(self._hash_file(path).encode('utf-8'))
+        manifest = self.load_manifest()
+        indexed_with = {
+            'embedding': self._manifest_embedding(manifest),
+            'chunking': manifest.get('chunking') if manifest else self._chunking_config()
+        }
+        digest.update(json.dumps(indexed_with, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
     def load_documents(self):
         """Load all text documents from knowledge base directory"""
         print(f"Loading documents from {self.knowledge_base_path}...")
@@ -39,55 +172,267 @@ class KnowledgeBaseLoader:
             loader_kwargs={'encoding': 'utf-8'}
         )
         documents = loader.load()
+        self._add_url_metadata(documents)
         
-        # Add URL metadata from mapping
+        print(f"Loaded {len(documents)} documents")
+        return documents
+    
+    def load_files(self, paths):
+        """Load a subset of knowledge base files"""
+        documents = []
+        for path in paths:
+            documents.extend(TextLoader(str(path), encoding='utf-8').load())
+        self._add_url_metadata(documents)
+        return documents
+    
+    def _add_url_metadata(self, documents):
+        """Add URL metadata from mapping"""
         for doc in documents:
             source_file = os.path.basename(doc.metadata.get('source', ''))
             if source_file in self.url_mapping:
                 doc.metadata['url'] = self.url_mapping[source_file]
-        
-        print(f"Loaded {len(documents)} documents")
-        return documents
     
     def split_documents(self, documents):
-        """Split documents into smaller chunks"""
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-            length_function=len,
-        )
+        """Split documents into smaller chunks (see CHUNKING_STRATEGY)"""
+        text_splitter = create_splitter(self.chunking_strategy, self.chunk_size, self.chunk_overlap)
         chunks = text_splitter.split_documents(documents)
-        print(f"Split into {len(chunks)} chunks")
+        stats = chunk_size_stats(chunks)
+        if chunks:
+            print(f"Split into {len(chunks)} chunks ({self.chunking_strategy}; chars min {stats['min']}, "
+                  f"p50 {stats['p50']}, p90 {stats['p90']}, max {stats['max']})")
+        else:
+            print("Split into 0 chunks")
         return chunks
     
+    def chunk_ids(self, chunks):
+        """
+        Stable IDs for chunks: file path, position in the file and a hash of the text
+        The same file content always produces the same IDs
+        """
+        ids = []
+        counters = {}
+        for chunk in chunks:
+            file_key = self._file_key(chunk.metadata['source'])
+            index = counters.get(file_key, 0)
+            counters[file_key] = index + 1
+            text_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()[:12]
+            ids.append(f"{file_key}:{index}:{text_hash}")
+        return ids
+    
+    def _manifest_path(self):
+        return os.path.join(self.store_directory, "manifest.json")
+    
+    def load_manifest(self):
+        """Load the file hash -> chunk IDs manifest of the vector store, or None"""
+        manifest_file = self._manifest_path()
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _new_manifest(self):
+        return {'backend': self.vector_backend, 'embedding': self.embedding_name,
+                'chunking': self._chunking_config(), 'files': {}}
+    
+    def _chunking_config(self):
+        """Splitter settings the chunks depend on; changing any of them changes every chunk"""
+        return {'strategy': self.chunking_strategy, 'chunk_size': self.chunk_size,
+                'chunk_overlap': self.chunk_overlap}
+    
+    def _manifest_embedding(self, manifest):
+        """Embedding model the store was built with (manifests without it predate the ONNX backend)"""
+        if manifest is None:
+            return self.embedding_name
+        return manifest.get('embedding', EMBEDDING_MODEL)
+    
+    def save_manifest(self, manifest):
+        """Save the manifest next to the vector store"""
+        os.makedirs(self.store_directory, exist_ok=True)
+        with open(self._manifest_path(), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    
+    def _index_files(self, vectorstore, paths, manifest):
+        """Split, embed and add files to the vector store, recording their chunks"""
+        chunks = self.split_documents(self.load_files(paths)) if paths else []
+        ids = self.chunk_ids(chunks)
+        if chunks:
+            vectorstore.add_documents(chunks, ids=ids)
+        self._record_files(manifest, paths, chunks, ids)
+    
+    def _record_files(self, manifest, paths, chunks, ids):
+        """Record file hashes and their chunk IDs in the manifest"""
+        for path in paths:
+            manifest['files'][self._file_key(path)] = {
+                'hash': self._hash_file(path),
+                'chunk_ids': []
+            }
+        for chunk, chunk_id in zip(chunks, ids):
+            manifest['files'][self._file_key(chunk.metadata['source'])]['chunk_ids'].append(chunk_id)
+    
+    def _store_exists(self):
+        if self.vector_backend == "numpy":
+            return NumpyVectorStore.exists(self.store_directory)
+        return os.path.exists(os.path.join(self.store_directory, "chroma.sqlite3"))
+    
+    def _manifest_backend(self, manifest):
+        """Backend the manifest was written for (manifests without it predate the numpy backend)"""
+        return manifest.get('backend', 'chroma')
+    
+    def open_vector_store(self):
+        """Open the persisted vector store of the configured backend"""
+        if self.vector_backend == "numpy":
+            return NumpyVectorStore(self.store_directory, self.embeddings, quantize=self.quantize)
+        return Chroma(
+            persist_directory=self.store_directory,
+            embedding_function=self.embeddings
+        )
+    
     def create_vector_store(self, documents):
         """Create or load vector store from documents
         
         Note: If vector store exists, it loads the existing one for efficiency.
-        To include new documents, delete the vector store directory first using:
-        python kb_manager.py rebuild
+        To include new or changed documents, run:
+        python kb_manager.py sync
         """
-        if os.path.exists(self.persist_directory):
+        manifest = self.load_manifest() if self._store_exists() else None
+        if manifest is not None and self._manifest_backend(manifest) != self.vector_backend:
+            # Left by the other backend when both shared one folder: its file
+            # list says nothing about this store, so re-index it completely
+            print(f"Warning: the manifest in {self.store_directory} belongs to the "
+                  f"{self._manifest_backend(manifest)} backend, not {self.vector_backend}. Re-indexing all files...")
+            self.sync()
+            return self.open_vector_store()
+        if self._store_exists():
             print("Loading existing vector store...")
-            print("(To rebuild with new documents, run: python kb_manager.py rebuild)")
-            vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings
-            )
+            print("(To index new or changed documents, run: python kb_manager.py sync)")
+            vectorstore = self.open_vector_store()
+            self.load_lexical_index(vectorstore)
+            indexed_with = self._manifest_embedding(manifest)
+            if indexed_with != self.embedding_name:
+                print(f"Warning: the vector store was embedded with {indexed_with}, queries use "
+                      f"{self.embedding_name}. Run python kb_manager.py sync to re-index.")
+            if manifest is not None and manifest.get('chunking') != self._chunking_config():
+                print(f"Warning: the vector store was split with {manifest.get('chunking', 'older settings')}, "
+                      f"not {self._chunking_config()}. Run python kb_manager.py sync to re-index.")
         else:
-            print("Creating new vector store...")
+            print(f"Creating new vector store ({self.vector_backend})...")
             chunks = self.split_documents(documents)
-            vectorstore = Chroma.from_documents(
-                documents=chunks,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory
-            )
+            ids = self.chunk_ids(chunks)
+            if self.vector_backend == "numpy":
+                vectorstore = NumpyVectorStore.from_documents(
+                    documents=chunks,
+                    embedding=self.embeddings,
+                    ids=ids,
+                    persist_directory=self.store_directory,
+                    quantize=self.quantize
+                )
+            else:
+                vectorstore = Chroma.from_documents(
+                    documents=chunks,
+                    embedding=self.embeddings,
+                    ids=ids,
+                    persist_directory=self.store_directory
+                )
+            
+            manifest = self._new_manifest()
+            paths = [doc.metadata['source'] for doc in documents]
+            self._record_files(manifest, paths, chunks, ids)
+            self.save_manifest(manifest)
+            self.build_lexical_index(vectorstore)
             print("Vector store created and persisted")
         
         return vectorstore
     
+    def _lexical_index_path(self):
+        return os.path.join(self.store_directory, "bm25_index.json")
+    
+    def build_lexical_index(self, vectorstore):
+        """Build the BM25 index from the chunks stored in the vector store"""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        self.lexical_index = BM25Index().build(data['ids'], data['documents'], data['metadatas'])
+        self.lexical_index.save(self._lexical_index_path())
+        print(f"BM25 index built with {len(self.lexical_index.ids)} chunks")
+        return self.lexical_index
+    
+    def load_lexical_index(self, vectorstore):
+        """Load the persisted BM25 index, building it if missing"""
+        if os.path.exists(self._lexical_index_path()):
+            self.lexical_index = BM25Index.load(self._lexical_index_path())
+            return self.lexical_index
+        return self.build_lexical_index(vectorstore)
+    
+    def sync(self):
+        """
+        Incrementally update the vector store to match the knowledge base
+        
+        Only added or changed files are re-split and re-embedded; chunks of
+        changed or removed files are deleted. The store stays usable while
+        this runs. Cached retrieval results of the old version are dropped.
+        """
+        if not self._store_exists():
+            self.create_vector_store(self.load_documents())
+            self._set_version(self.get_version())
+            return {'added': len(self._source_files()), 'changed': 0, 'removed': 0}
+        
+        vectorstore = self.open_vector_store()
+        
+        manifest = self.load_manifest()
+        if manifest is None or self._manifest_backend(manifest) != self.vector_backend \
+                or self._manifest_embedding(manifest) != self.embedding_name \
+                or manifest.get('chunking') != self._chunking_config():
+            # Store was built before manifests existed, the manifest belongs to
+            # the other backend, the chunks were embedded by another model or
+            # split with other settings (manifests without them predate this
+            # check): re-index everything once
+            print("No manifest found for this vector store, embedding model and chunking settings, "
+                  "re-indexing all files...")
+            existing_ids = vectorstore.get()['ids']
+            if existing_ids:
+                vectorstore.delete(ids=existing_ids)
+            manifest = self._new_manifest()
+        
+        current = {self._file_key(path): path for path in self._source_files()}
+        added = [path for key, path in current.items() if key not in manifest['files']]
+        changed = [
+            path for key, path in current.items()
+            if key in manifest['files'] and manifest['files'][key]['hash'] != self._hash_file(path)
+        ]
+        removed = [key for key in manifest['files'] if key not in current]
+        
+        # Delete chunks of changed and removed files
+        stale_ids = []
+        for key in removed + [self._file_key(path) for path in changed]:
+            stale_ids.extend(manifest['files'].pop(key)['chunk_ids'])
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+        
+        self._index_files(vectorstore, added + changed, manifest)
+        self.save_manifest(manifest)
+        self.build_lexical_index(vectorstore)
+        self.print_embedding_stats()
+        self._set_version(self.get_version())
+        
+        summary = {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+        print(f"Sync complete: {summary['added']} added, {summary['changed']} changed, "
+              f"{summary['removed']} removed ({len(stale_ids)} chunks deleted)")
+        return summary
+    
     def setup(self):
         """Setup the knowledge base"""
+        self._set_version(self.get_version())
         documents = self.load_documents()
         vectorstore = self.create_vector_store(documents)
+        self.print_embedding_stats()
         return vectorstore
+    
+    def print_embedding_stats(self):
+        """Print throughput of the embedding stage, if anything was embedded"""
+        throughput = self.embedding_pipeline.throughput()
+        if throughput is None:
+            return
+        stats = self.embedding_pipeline.stats
+        print(f"Embedded {stats['chunks']} chunks in {stats['seconds']:.1f}s "
+              f"({throughput:.1f} chunks/s)")
+        if isinstance(self.embeddings, CachedEmbeddings):
+            cache_stats = self.embeddings.stats()
+            print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
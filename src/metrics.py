@@ -0,0 +1,145 @@
+"""
+Metrics
+Timing spans, counters and histograms exposed in the Prometheus text format
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds in seconds: embedding/search are milliseconds, LLM calls seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DESCRIPTIONS = {
+    'bafog_requests_total': ('counter', 'API requests by endpoint and status'),
+    'bafog_request_duration_seconds': ('histogram', 'API request duration by endpoint'),
+    'bafog_stage_duration_seconds': ('histogram', 'Duration of answer pipeline stages'),
+    'bafog_answer_cache_total': ('counter', 'Answer cache lookups by result'),
+    'bafog_faq_total': ('counter', 'FAQ answer lookups by result'),
+    'bafog_retrieval_cache_total': ('counter', 'Retrieval cache lookups by stage and result'),
+    'bafog_rerank_total': ('counter', 'Reranking runs by result (reranked or budget fallback)'),
+    'bafog_tokens_total': ('counter', 'LLM tokens by model and direction'),
+}
+
+
+@contextmanager
+def span(stage, timings=None, metrics=None):
+    """
+    Time a block of code
+    The duration (seconds) is stored in timings[stage] and observed in the
+    stage histogram of metrics, when given.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[stage] = round(elapsed, 4)
+        if metrics is not None:
+            metrics.observe('bafog_stage_duration_seconds', elapsed, stage=stage)
+
+
+def _escape(value):
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Thread-safe in-process metrics registry
+    Series are identified by a metric name plus label values; render()
+    produces the Prometheus text exposition format for /metrics.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Increase a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record a value (in seconds) in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.buckets)
+            self._histograms[key].observe(value)
+
+    def record_request(self, endpoint, seconds, error=False):
+        """Count a finished API request and observe its duration"""
+        self.inc('bafog_requests_total', endpoint=endpoint, status='error' if error else 'ok')
+        self.observe('bafog_request_duration_seconds', seconds, endpoint=endpoint)
+
+    def record_tokens(self, model, token_usage):
+        """Count prompt and completion tokens of an LLM call"""
+        if not token_usage:
+            return
+        self.inc('bafog_tokens_total', token_usage.get('prompt_tokens', 0), model=model, direction='prompt')
+        self.inc('bafog_tokens_total', token_usage.get('completion_tokens', 0), model=model, direction='completion')
+
+    def get(self, name, **labels):
+        """Current value of a counter (0 if never increased)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def render(self):
+        """Prometheus text exposition of all series"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            lines = []
+            described = set()
+
+            for (name, labels), value in counters:
+                self._describe(lines, described, name)
+                lines.append(f"{name}{self._labels(labels)} {value}")
+
+            for (name, labels), histogram in histograms:
+                self._describe(lines, described, name)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{self._labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _describe(self, lines, described, name):
+        if name in described or name not in DESCRIPTIONS:
+            return
+        metric_type, description = DESCRIPTIONS[name]
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        described.add(name)
+
+    def _labels(self, labels, le=None):
+        pairs = list(labels)
+        if le is not None:
+            pairs.append(('le', le))
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
@@ -0,0 +1,214 @@
+"""
+NumPy Vector Store
+Exact top-k search over a memory-mapped embedding matrix, an alternative to Chroma
+for small knowledge bases
+"""
+import os
+import json
+import threading
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "vectors.json"
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _replace_atomically(path, write):
+    """Write to a temporary file and rename it over path
+
+    Processes that memory-mapped the old file keep reading it until they reload.
+    """
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vector store kept in two files in persist_directory:
+
+    - vectors.npy: one row per chunk, L2-normalized float32, or int8 with a
+      per-row scale when quantize=True (a quarter of the size)
+    - vectors.json: ids, texts, metadata and the int8 scales
+
+    The matrix is opened with np.load(mmap_mode='r'), so worker processes
+    serving the same index share one copy in the OS page cache. Search is one
+    matrix product over all rows (exact cosine similarity); for a few hundred
+    chunks that needs no ANN index or database client. Writes rewrite both
+    files and rename them into place.
+    """
+
+    def __init__(self, persist_directory, embedding_function, quantize=False):
+        self.persist_directory = persist_directory
+        self._embedding = embedding_function
+        self.quantize = quantize
+        self._lock = threading.Lock()
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.scales = None
+        self.vectors = None
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @staticmethod
+    def exists(persist_directory):
+        return os.path.exists(os.path.join(persist_directory, VECTORS_FILE))
+
+    def _vectors_path(self):
+        return os.path.join(self.persist_directory, VECTORS_FILE)
+
+    def _metadata_path(self):
+        return os.path.join(self.persist_directory, METADATA_FILE)
+
+    def _load(self):
+        """(Re)open the persisted index, memory-mapping the matrix"""
+        if not self.exists(self.persist_directory):
+            return
+        with open(self._metadata_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.ids = data['ids']
+        self.texts = data['texts']
+        self.metadatas = data['metadatas']
+        self.quantize = data.get('dtype') == 'int8'
+        self.scales = np.asarray(data['scales'], dtype=np.float32) if self.quantize else None
+        self.vectors = np.load(self._vectors_path(), mmap_mode='r') if self.ids else None
+
+    def _dense(self):
+        """All stored vectors as normalized float32 (for rewriting the index)"""
+        if self.vectors is None:
+            return None
+        if self.quantize:
+            return np.asarray(self.vectors, dtype=np.float32) * self.scales[:, None]
+        return np.array(self.vectors, dtype=np.float32)
+
+    def _save(self, ids, texts, metadatas, vectors):
+        """Persist the index and reopen it"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        scales = None
+        if vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        elif self.quantize:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+
+        def write_vectors(path):
+            with open(path, 'wb') as f:
+                np.save(f, vectors)
+
+        def write_metadata(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'dtype': 'int8' if self.quantize else 'float32',
+                    'ids': ids,
+                    'texts': texts,
+                    'metadatas': metadatas,
+                    'scales': scales.tolist() if scales is not None else None
+                }, f, ensure_ascii=False)
+
+        _replace_atomically(self._vectors_path(), write_vectors)
+        _replace_atomically(self._metadata_path(), write_metadata)
+        self._load()
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [f"chunk-{len(self.ids) + i}" for i in range(len(texts))]
+        vectors = _normalize(self._embedding.embed_documents(texts))
+
+        with self._lock:
+            # Re-adding an ID replaces the old row
+            replaced = set(ids)
+            keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in replaced]
+            existing = self._dense()
+            if existing is not None and len(keep) < len(self.ids):
+                existing = existing[keep]
+            all_vectors = vectors if existing is None or not len(keep) else np.vstack([existing, vectors])
+            self._save(
+                [self.ids[i] for i in keep] + ids,
+                [self.texts[i] for i in keep] + texts,
+                [self.metadatas[i] for i in keep] + metadatas,
+                all_vectors
+            )
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        with self._lock:
+            removed = set(ids)
+            keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in removed]
+            existing = self._dense()
+            self._save(
+                [self.ids[i] for i in keep],
+                [self.texts[i] for i in keep],
+                [self.metadatas[i] for i in keep],
+                existing[keep] if existing is not None and keep else None
+            )
+        return True
+
+    def get(self, include=None, **kwargs):
+        """Stored chunks in the shape of Chroma's get()"""
+        return {'ids': list(self.ids), 'documents': list(self.texts), 'metadatas': list(self.metadatas)}
+
+    def _scores(self, query_vectors):
+        """Cosine similarity of each query (rows) with every stored vector (columns)"""
+        scores = _normalize(query_vectors) @ self.vectors.T
+        if self.quantize:
+            scores = scores * self.scales
+        return scores
+
+    def _top_k(self, scores, k):
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+
+    def _document(self, index):
+        return Document(page_content=self.texts[index], metadata=self.metadatas[index] or {})
+
+    def similarity_search_by_vectors(self, embeddings, k=4):
+        """Top-k documents for several query vectors with one matrix product"""
+        if self.vectors is None or not len(embeddings):
+            return [[] for _ in embeddings]
+        scores = self._scores(np.asarray(embeddings, dtype=np.float32))
+        return [[self._document(i) for i in self._top_k(row, k)] for row in scores]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        if self.vectors is None:
+            return []
+        scores = self._scores(np.asarray([embedding], dtype=np.float32))[0]
+        return [(self._document(i), float(scores[i])) for i in self._top_k(scores, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1] (int8 rounding can overshoot slightly)
+        return lambda score: min(1.0, max(0.0, (score + 1) / 2))
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None,
+                   quantize=False, **kwargs):
+        store = cls(persist_directory, embedding, quantize=quantize)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
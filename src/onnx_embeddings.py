@@ -0,0 +1,105 @@
+"""
+ONNX Embeddings
+CPU inference of an exported sentence-transformers model with ONNX Runtime
+"""
+import os
+import json
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "onnx_config.json"
+
+
+def cosine_similarities(a, b):
+    """Row-wise cosine similarity of two lists of vectors"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return (a * b).sum(axis=1) / np.where(norms == 0, 1, norms)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Runs the model written by export_onnx_model.py from model_dir:
+
+    - model.onnx (or model_int8.onnx with quantized=True): the transformer,
+      returning token embeddings
+    - tokenizer.json: the fast tokenizer, used through the tokenizers library
+    - onnx_config.json: model name, max sequence length and whether the
+      sentence vectors are normalized
+
+    Mean pooling and normalization are done in NumPy, as sentence-transformers
+    does after the transformer. Neither PyTorch nor transformers is imported.
+    Batches are formed from texts of similar length so little padding is run
+    through the model.
+    """
+
+    def __init__(self, model_dir="./onnx_model", quantized=False, batch_size=32, threads=None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {model_path}. Export it with: python export_onnx_model.py"
+                + (" --quantize" if quantized else "")
+            )
+        with open(os.path.join(model_dir, CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.batch_size = batch_size
+        # Identifies the vectors this model produces (embedding cache, manifest)
+        self.name = f"{self.config['model_name']}:onnx{'-int8' if quantized else ''}"
+
+        if threads is None:
+            threads = int(os.getenv("ONNX_THREADS", 0))
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config['max_seq_length'])
+        self.tokenizer.enable_padding(pad_id=self.config.get('pad_token_id', 0),
+                                      pad_token=self.config.get('pad_token', '[PAD]'))
+
+    def _encode(self, texts):
+        """Sentence vectors for one batch"""
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': attention_mask,
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        token_embeddings = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        # Mean over the real (unpadded) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        vectors = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config.get('normalize', True):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
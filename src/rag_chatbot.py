@@ -3,40 +3,103 @@ RAG Chatbot
 Retrieval-Augmented Generation chatbot for BAföG questions
 """
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from langchain.schema import Document
 from langchain_community.llms import OpenAI
-from langchain.callbacks import get_openai_callback
+from src.hybrid_retriever import HybridRetriever
+from src.metrics import span
+from src.context_builder import ContextBuilder
+from src.chatbot_pool import hash_api_key
+from src.conversation_store import extractive_summary, rewrite_query
+
+# Asks OpenRouter to include the cost of a call in its usage report
+USAGE_ACCOUNTING = {"usage": {"include": True}}
 
 
 class RAGChatbot:
-    def __init__(self, vectorstore, api_key=None, model=None):
+    def __init__(self, vectorstore, api_key=None, model=None, kb_loader=None, answer_cache=None,
+                 retrieval_mode=None, k=None, llm=None, metrics=None, usage_tracker=None,
+                 context_builder=None, conversation_store=None, retrieval_cache=None, faq_store=None,
+                 reranker=None):
         load_dotenv()
         
+        self.vectorstore = vectorstore
+        # Optional shared Metrics registry for stage timings, cache hits and tokens
+        self.metrics = metrics
+        # Optional shared UsageTracker for per-key/per-model token and cost totals
+        self.usage_tracker = usage_tracker
+        # Optional shared ConversationStore for multi-turn sessions (ask(..., session_id))
+        self.conversation_store = conversation_store
+        self.llm_summaries = os.getenv("CONVERSATION_SUMMARIZER", "extractive").lower() == "llm"
+        # Shared back-off after a rate-limit response (monotonic time before which no LLM call starts)
+        self._pause_until = 0.0
+        self._pause_lock = threading.Lock()
+        
+        # Optional semantic answer cache, scoped to the knowledge base version
+        self.answer_cache = answer_cache
+        self.kb_loader = kb_loader
+        # Embeddings and retrieved documents of recent questions, shared through the loader
+        if retrieval_cache is None and kb_loader is not None:
+            retrieval_cache = getattr(kb_loader, 'retrieval_cache', None)
+        self.retrieval_cache = retrieval_cache
+        # Canonical answers of FAQ questions, returned without retrieval or an LLM call
+        if faq_store is None and kb_loader is not None:
+            faq_store = getattr(kb_loader, 'faq_store', None)
+        self.faq_store = faq_store
+        # Optional cross-encoder that reorders over-fetched candidates before the top k
+        if reranker is None and kb_loader is not None:
+            reranker = getattr(kb_loader, 'reranker', None)
+        self.reranker = reranker
+        
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         # self.model = model or os.getenv("OPENROUTER_MODEL", "google/gemma-2-9b-it")
         # self.model = model or os.getenv("OPENROUTER_MODEL", "meta-llama/llama-3.1-8b-instruct")
         # self.model = model or os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct")
         self.model = model or os.getenv("OPENROUTER_MODEL", "openai/gpt-oss-20b")
         
-        if not self.api_key:
-            raise ValueError("OpenRouter API key not found. Please set OPENROUTER_API_KEY in .env file")
+        if llm is not None:
+            # Injected LLM (e.g. the offline StubLLM used for evaluation)
+            self.llm = llm
+        else:
+            if not self.api_key:
+                raise ValueError("OpenRouter API key not found. Please set OPENROUTER_API_KEY in .env file")
+            
+            # Initialize LLM with OpenRouter
+            # Note: Using OpenAI-compatible API with OpenRouter's endpoint
+            self.llm = OpenAI(
+                api_key=self.api_key,
+                base_url="https://openrouter.ai/api/v1",
+                model=self.model,
+                temperature=0.7,
+            )
         
-        # Initialize LLM with OpenRouter
-        # Note: Using OpenAI-compatible API with OpenRouter's endpoint
-        self.llm = OpenAI(
-            api_key=self.api_key,
-            base_url="https://openrouter.ai/api/v1",
-            model=self.model,
-            temperature=0.7,
-        )
+        # Create retriever: "similarity" (vector only) or "hybrid" (BM25 + vector)
+        self.k = k or int(os.getenv("RETRIEVAL_K", 3))
+        self.retrieval_mode = retrieval_mode or os.getenv("RETRIEVAL_MODE", "similarity")
+        if self.retrieval_mode == "hybrid":
+            if not kb_loader or kb_loader.lexical_index is None:
+                raise ValueError("Hybrid retrieval requires a knowledge base loader with a BM25 index")
+            self.retriever = HybridRetriever(
+                vectorstore=vectorstore,
+                lexical_index=kb_loader.lexical_index,
+                k=self.k
+            )
+        elif self.retrieval_mode == "similarity":
+            self.retriever = vectorstore.as_retriever(
+                search_type="similarity",
+                search_kwargs={"k": self.k}
+            )
+        else:
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
         
-        # Create retriever from vector store
-        self.retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 3}
-        )
+        # Context compression between retrieval and prompt (CONTEXT_COMPRESSION=false disables)
+        if context_builder is None and os.getenv("CONTEXT_COMPRESSION", "true").lower() == "true":
+            context_builder = ContextBuilder()
+        self.context_builder = context_builder
         
         # Create custom prompt template
         template = """Du bist ein hilfreicher Assistent AUSSCHLIESSLICH für BAföG-Fragen. 
@@ -56,54 +119,518 @@ Für BAföG-bezogene Fragen:
 Kontext:
 {context}
 
-Frage: {question}
+{history}Frage: {question}
 
 Hilfreiche Antwort:"""
 
-        PROMPT = PromptTemplate(
+        self.prompt = PromptTemplate(
             template=template,
-            input_variables=["context", "question"]
+            input_variables=["context", "history", "question"]
+        )
+    
+    @property
+    def kb_version(self):
+        """
+        Knowledge base version answers are cached under, as last computed by
+        the loader (setup() or sync() in this process)
+        """
+        return self.kb_loader.version if self.kb_loader else None
+    
+    def ask(self, question, session_id=None):
+        """
+        Ask a question and get an answer with token usage tracking
+        
+        With a session_id (and a conversation store) earlier turns of the
+        session are added to the prompt and follow-up questions are rewritten
+        for retrieval. The result includes 'timings': seconds spent in each
+        stage (history, embedding, cache, retrieval, context, prompt, llm).
+        """
+        timings = {}
+        with span('history', timings, self.metrics):
+            history = self.load_history(session_id)
+            query = self.retrieval_query(question, history)
+        
+        with span('embedding', timings, self.metrics):
+            embedding = self.embed_question(query)
+        
+        with span('cache', timings, self.metrics):
+            cached, embedding = self.check_cache(query, embedding, history)
+        if cached:
+            self.save_turn(history, question, cached["answer"])
+            return {**cached, **self._session_fields(history, question, query), "timings": timings}
+        
+        with span('retrieval', timings, self.metrics):
+            documents = self.retrieve(query, embedding)
+        
+        with span('context', timings, self.metrics):
+            sources = self.build_context(query, documents)
+        
+        with span('prompt', timings, self.metrics):
+            prompt = self.build_prompt(question, sources, history)
+        
+        with span('llm', timings, self.metrics):
+            answer, token_usage = self._generate(prompt)
+        
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "token_usage": token_usage,
+            "cache_hit": False
+        }
+        self.remember(query, embedding, result, history)
+        self.save_turn(history, question, answer)
+        return {**result, **self._session_fields(history, question, query), "timings": timings}
+    
+    def ask_batch(self, questions, max_concurrency=4, max_retries=5):
+        """
+        Answer many questions, yielding results as they complete
+        
+        All questions are embedded in one batch and searched together;
+        LLM calls then run on at most max_concurrency threads. A rate-limit
+        (HTTP 429) response pauses every worker before retrying with
+        exponential back-off. Yields dicts with 'index' and 'question' plus
+        either the ask() result or an 'error'.
+        """
+        questions = list(questions)
+        if not questions:
+            return
+        
+        with span('embedding', None, self.metrics):
+            embeddings = self.embed_questions(questions)
+        with span('retrieval', None, self.metrics):
+            retrieved = self.retrieve_batch(questions, embeddings)
+        
+        def answer(index):
+            question, embedding, documents = questions[index], embeddings[index], retrieved[index]
+            cached, embedding = self.check_cache(question, embedding)
+            if cached:
+                return cached
+            sources = self.build_context(question, documents)
+            prompt = self.build_prompt(question, sources)
+            with span('llm', None, self.metrics):
+                answer_text, token_usage = self._generate_with_backoff(prompt, max_retries)
+            result = {
+                "answer": answer_text,
+                "sources": sources,
+                "token_usage": token_usage,
+                "cache_hit": False
+            }
+            self.remember(question, embedding, result)
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix='batch') as executor:
+            futures = {executor.submit(answer, index): index for index in range(len(questions))}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    yield {"index": index, "question": questions[index], **future.result()}
+                except Exception as e:
+                    yield {"index": index, "question": questions[index], "error": str(e)}
+    
+    def embed_questions(self, questions):
+        """Embed several questions in one batched model call (cached questions are skipped)"""
+        embeddings = getattr(self.vectorstore, 'embeddings', None)
+        if embeddings is None:
+            return [None] * len(questions)
+        vectors = [self._cache_lookup('embedding', question) for question in questions]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            texts = [questions[i] for i in missing]
+            if hasattr(embeddings, 'embed_queries'):
+                computed = embeddings.embed_queries(texts)
+            else:
+                computed = embeddings.embed_documents(texts)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                if self.retrieval_cache:
+                    self.retrieval_cache.put_embedding(questions[i], vector)
+        return vectors
+    
+    def retrieve_batch(self, questions, embeddings):
+        """
+        Retrieve documents for several questions, in one vector store query where possible
+        Questions in the retrieval cache are answered from it; only the others are searched.
+        """
+        collection = getattr(self.vectorstore, '_collection', None)
+        batched = hasattr(self.vectorstore, 'similarity_search_by_vectors')
+        if (self.retrieval_mode != "similarity" or (collection is None and not batched) or None in embeddings
+                or self.reranker):
+            return [self.retrieve(question, embedding) for question, embedding in zip(questions, embeddings)]
+
+        documents = [self._cache_lookup('retrieval', question) for question in questions]
+        missing = [i for i, docs in enumerate(documents) if docs is None]
+        if not missing:
+            return documents
+        vectors = [embeddings[i] for i in missing]
+        if batched:
+            found = self.vectorstore.similarity_search_by_vectors(vectors, k=self.k)
+        else:
+            results = collection.query(
+                query_embeddings=vectors,
+                n_results=self.k,
+                include=["documents", "metadatas"]
+            )
+            found = [
+                [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+                for texts, metadatas in zip(results["documents"], results["metadatas"])
+            ]
+        for i, docs in zip(missing, found):
+            documents[i] = docs
+            if self.retrieval_cache:
+                self.retrieval_cache.put_documents(questions[i], self._retrieval_key(), self.k, docs)
+        return documents
+    
+    def _generate_with_backoff(self, prompt, max_retries=5):
+        """_generate() that waits and retries when the provider rate-limits us"""
+        delay = 1.0
+        for attempt in range(max_retries + 1):
+            wait = self._pause_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self._generate(prompt)
+            except Exception as e:
+                retry_after = self._rate_limit_delay(e)
+                if retry_after is None or attempt == max_retries:
+                    raise
+                self._pause_llm_calls(max(retry_after, delay))
+                delay *= 2
+    
+    def _pause_llm_calls(self, seconds):
+        """Hold back every LLM call of this chatbot for seconds after a rate-limit response"""
+        print(f"Rate limited, pausing LLM calls for {seconds:.1f}s")
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+    
+    def _rate_limit_delay(self, error):
+        """Seconds to wait if error is a rate-limit response (Retry-After if given), else None"""
+        status = getattr(error, 'status_code', None)
+        response = getattr(error, 'response', None)
+        if status is None and response is not None:
+            status = getattr(response, 'status_code', None)
+        if status != 429:
+            return None
+        try:
+            return float(response.headers.get('retry-after', 0))
+        except (AttributeError, TypeError, ValueError):
+            return 0.0
+    
+    def embed_question(self, question):
+        """Embed a question once for both the answer cache and vector search"""
+        embeddings = getattr(self.vectorstore, 'embeddings', None)
+        if embeddings is None:
+            return None
+        embedding = self._cache_lookup('embedding', question)
+        if embedding is None:
+            embedding = embeddings.embed_query(question)
+            if self.retrieval_cache:
+                self.retrieval_cache.put_embedding(question, embedding)
+        return embedding
+    
+    def _cache_lookup(self, stage, question):
+        """Cached embedding or documents of a question from the retrieval cache, or None"""
+        if not self.retrieval_cache:
+            return None
+        if stage == 'embedding':
+            value = self.retrieval_cache.get_embedding(question)
+        else:
+            value = self.retrieval_cache.get_documents(question, self._retrieval_key(), self.k)
+        if self.metrics:
+            self.metrics.inc('bafog_retrieval_cache_total', stage=stage, result='miss' if value is None else 'hit')
+        return value
+    
+    def load_history(self, session_id):
+        """
+        Conversation history of a session: {'key', 'summary', 'turns'}
+        Returns None without a session_id or conversation store. Sessions are
+        scoped to the API key, so one key cannot read another key's session.
+        """
+        if not session_id or not self.conversation_store:
+            return None
+        key = f"{hash_api_key(self.api_key or '')[:12]}:{session_id}"
+        history = self.conversation_store.get(key) or {'summary': '', 'turns': []}
+        return {'key': key, **history}
+    
+    def save_turn(self, history, question, answer):
+        """Add a finished turn to its session (older turns get summarized)"""
+        if history is None:
+            return
+        summarize = self.summarize_turns if self.llm_summaries else extractive_summary
+        self.conversation_store.add_turn(history['key'], question, answer, summarize=summarize)
+    
+    def summarize_turns(self, summary, turns):
+        """Fold old turns into the rolling summary with one short LLM call"""
+        conversation = "\n".join(f"Nutzer: {t['question']}\nAssistent: {t['answer']}" for t in turns)
+        prompt = (
+            "Fasse das bisherige Gespräch über BAföG in höchstens drei kurzen Sätzen zusammen. "
+            "Behalte Zahlen, Fristen und die persönliche Situation des Nutzers.\n\n"
+            f"Bisherige Zusammenfassung:\n{summary or '-'}\n\nNeue Gesprächsrunden:\n{conversation}\n\n"
+            "Zusammenfassung:"
         )
+        summary_text, _ = self._generate(prompt)
+        return summary_text.strip()
+    
+    def retrieval_query(self, question, history):
+        """The question rewritten for retrieval if it is a follow-up in a conversation"""
+        return rewrite_query(question, history)
+    
+    def _has_history(self, history):
+        return bool(history and (history['turns'] or history['summary']))
+    
+    def _session_fields(self, history, question, query):
+        """Session info added to ask() results"""
+        if history is None:
+            return {}
+        fields = {"session_id": history['key'].split(':', 1)[1]}
+        if query != question:
+            fields["rewritten_query"] = query
+        return fields
+    
+    def check_cache(self, question, embedding=None, history=None):
+        """
+        Look up a question among the FAQ answers, then in the answer cache
+        Returns (precomputed result or None, question embedding for remember())
+        Answers within a conversation depend on its history and are not cached.
+        """
+        if self.faq_store:
+            if embedding is None:
+                embedding = self.embed_question(question)
+            pair = self.faq_store.match(embedding)
+            if self.metrics:
+                self.metrics.inc('bafog_faq_total', result='hit' if pair else 'miss')
+            if pair:
+                return self._faq_result(pair), embedding
+        if not self.answer_cache or self._has_history(history):
+            return None, embedding
+        if embedding is None:
+            embedding = self.answer_cache.embed(question)
+        cached = self.answer_cache.lookup(embedding, self.model, self.kb_version)
+        if self.metrics:
+            self.metrics.inc('bafog_answer_cache_total', result='hit' if cached else 'miss')
+        return (self._cached_result(cached) if cached else None), embedding
+    
+    def remember(self, question, embedding, result, history=None):
+        """Store a freshly generated result in the answer cache"""
+        if self.answer_cache and not self._has_history(history):
+            self.answer_cache.store(question, embedding, self.model, self.kb_version, result)
+    
+    def _generate(self, prompt):
+        """Call the LLM for a filled prompt; returns (answer, token usage)"""
+        params = self._completion_params(prompt)
+        if params is None:
+            result = self.llm.generate([prompt])
+            answer = result.generations[0][0].text
+            llm_output = result.llm_output
+        else:
+            # The raw response keeps the usage fields LangChain drops (OpenRouter's cost)
+            completion = self.llm.client.create(prompt=prompt, extra_body=USAGE_ACCOUNTING, **params)
+            answer = completion.choices[0].text
+            llm_output = {"token_usage": completion.usage.model_dump() if completion.usage else None}
+        
+        # OpenRouter reports usage in the response; fall back to a local estimate
+        token_usage = self._provider_usage(llm_output) or self._estimate_token_usage(prompt, answer)
+        self.record_usage(token_usage)
+        return answer, token_usage
+    
+    def _provider_usage(self, llm_output):
+        """Token usage reported by the provider, or None if missing or empty"""
+        usage = (llm_output or {}).get("token_usage") or {}
+        if not usage.get("total_tokens"):
+            return None
+        token_usage = {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage["total_tokens"],
+            "estimated": False
+        }
+        if usage.get("cost") is not None:
+            token_usage["cost"] = usage["cost"]
+        return token_usage
+    
+    def record_usage(self, token_usage):
+        """Count the tokens of an LLM call in the metrics and usage tracker"""
+        if self.metrics:
+            self.metrics.record_tokens(self.model, token_usage)
+        if self.usage_tracker:
+            self.usage_tracker.record(self.api_key, self.model, token_usage)
+    
+    def _faq_result(self, pair):
+        """Build an ask() result from a matching FAQ question"""
+        return {
+            "answer": pair["answer"],
+            "sources": [self.faq_store.document(pair)],
+            "token_usage": None,
+            "cache_hit": False,
+            "faq_match": {"question": pair["question"], "similarity": pair["similarity"]}
+        }
+    
+    def _cached_result(self, cached):
+        """Build an ask() result from an answer cache hit"""
+        return {
+            "answer": cached["answer"],
+            "sources": cached["sources"],
+            # No tokens were spent; report what the original answer cost
+            "token_usage": None,
+            "saved_token_usage": cached["token_usage"],
+            "cache_hit": True,
+            "cache_similarity": cached["similarity"]
+        }
+    
+    def retrieve(self, question, embedding=None):
+        """Retrieve the context documents for a question (reusing its embedding if given)"""
+        documents = self._cache_lookup('retrieval', question)
+        if documents is not None:
+            return documents
+        reranked = True
+        if self.reranker:
+            documents, reranked = self.rerank(question, self._search(question, embedding, self.reranker.fetch_k))
+        else:
+            documents = self._search(question, embedding, self.k)
+        # A budget fallback is not cached, so the next asker gets a reranked result
+        if self.retrieval_cache and reranked:
+            self.retrieval_cache.put_documents(question, self._retrieval_key(), self.k, documents)
+        return documents
+    
+    def _search(self, question, embedding, k):
+        """Top k documents of the first (bi-encoder or hybrid) retrieval stage"""
+        if self.retrieval_mode == "hybrid":
+            return self.retriever.search(question, embedding, k=k)
+        if embedding is None:
+            return self.vectorstore.similarity_search(question, k=k)
+        return self.vectorstore.similarity_search_by_vector(embedding, k=k)
+    
+    def rerank(self, question, candidates):
+        """The top k candidates by cross-encoder score; returns (documents, reranked)"""
+        with span('rerank', None, self.metrics):
+            documents, reranked = self.reranker.rerank(question, candidates, self.k)
+        if self.metrics:
+            self.metrics.inc('bafog_rerank_total', result='reranked' if reranked else 'fallback')
+        return documents, reranked
+    
+    def _retrieval_key(self):
+        """Retrieval cache mode: reranked results differ from plain top-k ones"""
+        return f"{self.retrieval_mode}+rerank" if self.reranker else self.retrieval_mode
+    
+    def build_context(self, question, documents):
+        """Deduplicate, trim and budget the retrieved documents for the prompt"""
+        if not self.context_builder:
+            return documents
+        return self.context_builder.build(question, documents, self.model)
+    
+    def build_prompt(self, question, documents, history=None):
+        """Fill the prompt template the same way the "stuff" chain does, plus the conversation so far"""
+        context = "\n\n".join(doc.page_content for doc in documents)
+        history_text = ""
+        if self._has_history(history):
+            history_text = f"Bisheriges Gespräch:\n{self.conversation_store.history_text(history)}\n\n"
+        return self.prompt.format(context=context, history=history_text, question=question)
+    
+    def ask_stream(self, question, session_id=None):
+        """
+        Ask a question and stream the answer
+        
+        Yields event dicts: one 'sources' event with the retrieved documents,
+        one 'token' event per generated chunk and a final 'done' event with
+        token usage and timings. session_id works as in ask().
+        """
+        start_time = time.perf_counter()
+        timings = {}
+        
+        with span('history', timings, self.metrics):
+            history = self.load_history(session_id)
+            query = self.retrieval_query(question, history)
+        with span('embedding', timings, self.metrics):
+            embedding = self.embed_question(query)
+        with span('cache', timings, self.metrics):
+            cached, embedding = self.check_cache(query, embedding, history)
+        if cached:
+            self.save_turn(history, question, cached["answer"])
+            yield {"type": "sources", "sources": cached["sources"]}
+            yield {"type": "token", "token": cached["answer"]}
+            timings["total"] = round(time.perf_counter() - start_time, 4)
+            yield {"type": "done", **cached, **self._session_fields(history, question, query), "timings": timings}
+            return
+        
+        with span('retrieval', timings, self.metrics):
+            documents = self.retrieve(query, embedding)
+        with span('context', timings, self.metrics):
+            sources = self.build_context(query, documents)
+        yield {"type": "sources", "sources": sources}
+        
+        prompt = self.build_prompt(question, sources, history)
+        answer_parts = []
+        provider_output = {}
+        with span('llm', timings, self.metrics):
+            for token in self._stream_tokens(prompt, provider_output):
+                if not answer_parts:
+                    timings["first_token"] = round(time.perf_counter() - start_time, 4)
+                answer_parts.append(token)
+                yield {"type": "token", "token": token}
         
-        # Create RetrievalQA chain
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": PROMPT}
+        answer = "".join(answer_parts)
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "token_usage": self._provider_usage(provider_output) or self._estimate_token_usage(prompt, answer),
+            "cache_hit": False
+        }
+        self.record_usage(result["token_usage"])
+        self.remember(query, embedding, result, history)
+        self.save_turn(history, question, answer)
+        
+        timings["total"] = round(time.perf_counter() - start_time, 4)
+        yield {"type": "done", **result, **self._session_fields(history, question, query), "timings": timings}
+    
+    def _stream_tokens(self, prompt, provider_output):
+        """
+        Stream the answer to a filled prompt chunk by chunk
+        OpenAI-compatible LLMs are streamed through their client with
+        stream_options.include_usage, and the usage of the provider's final
+        chunk is stored in provider_output['token_usage']. Other LLMs (e.g.
+        StubLLM) stream through LangChain, which drops usage.
+        """
+        params = self._completion_params(prompt)
+        if params is None:
+            yield from self.llm.stream(prompt)
+            return
+        stream = self.llm.client.create(
+            prompt=prompt,
+            stream=True,
+            extra_body={**USAGE_ACCOUNTING, "stream_options": {"include_usage": True}},
+            **params
         )
+        for chunk in stream:
+            if chunk.usage:
+                provider_output["token_usage"] = chunk.usage.model_dump()
+            if chunk.choices and chunk.choices[0].text:
+                yield chunk.choices[0].text
+    
+    def _completion_params(self, prompt):
+        """Request parameters of an OpenAI-compatible LangChain LLM, or None for other LLMs"""
+        if getattr(self.llm, "client", None) is None or not hasattr(self.llm, "get_sub_prompts"):
+            return None
+        params = dict(self.llm._invocation_params)
+        # Resolves max_tokens=-1 to the tokens left after the prompt
+        self.llm.get_sub_prompts(params, [prompt])
+        return params
     
-    def ask(self, question):
-        """Ask a question and get an answer with token usage tracking"""
+    def _estimate_token_usage(self, prompt, answer):
+        """
+        Estimate token usage locally (for LLMs that report no usage)
+        Uses the LLM's tokenizer if available, otherwise ~4 characters per token
+        """
         try:
-            # Note: get_openai_callback() is designed for OpenAI API and may not work
-            # correctly with OpenRouter's custom base_url. Token usage from the callback
-            # might be zero or incorrect. However, we still try to use it for compatibility.
-            with get_openai_callback() as cb:
-                result = self.qa_chain.invoke({"query": question})
-                
-                # Extract token usage information from callback
-                token_usage = {
-                    "prompt_tokens": cb.prompt_tokens,
-                    "completion_tokens": cb.completion_tokens,
-                    "total_tokens": cb.total_tokens
-                } if cb.total_tokens > 0 else None
-                
-                return {
-                    "answer": result["result"],
-                    "sources": result["source_documents"],
-                    "token_usage": token_usage
-                }
-        except Exception as e:
-            # If callback fails, return without token usage
-            print(f"Token usage tracking failed: {e}")
-            result = self.qa_chain.invoke({"query": question})
-            return {
-                "answer": result["result"],
-                "sources": result["source_documents"],
-                "token_usage": None
-            }
+            prompt_tokens = self.llm.get_num_tokens(prompt)
+            completion_tokens = self.llm.get_num_tokens(answer)
+        except Exception:
+            prompt_tokens = max(1, len(prompt) // 4)
+            completion_tokens = max(1, len(answer) // 4) if answer else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "estimated": True
+        }
     
     def format_sources(self, sources):
         """Format source documents for display"""
@@ -0,0 +1,94 @@
+"""
+Reranker
+Rescores retrieved chunks with a cross-encoder, within a latency budget
+"""
+import os
+import time
+import threading
+
+# Multilingual (German) MiniLM cross-encoder trained on mMARCO, ~120M parameters
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+class Reranker:
+    """
+    Second retrieval stage: the bi-encoder over-fetches fetch_k candidates,
+    the cross-encoder reads each (question, chunk) pair and the top k by its
+    score are kept.
+
+    Pairs are scored on the CPU in batches of batch_size. Before each batch
+    the elapsed time is checked against time_budget (seconds); once it is
+    exceeded the remaining batches are skipped and the candidates keep the
+    bi-encoder order, so a slow machine costs at most one batch over the
+    budget instead of the whole candidate list.
+
+    model can be anything with a sentence-transformers CrossEncoder
+    predict(pairs, batch_size=...) method; by default model_name is loaded.
+    """
+
+    def __init__(self, model_name=None, fetch_k=None, batch_size=None, time_budget=None, model=None):
+        self.model_name = model_name or os.getenv("RERANK_MODEL", RERANK_MODEL)
+        self.fetch_k = fetch_k or int(os.getenv("RERANK_FETCH_K", 20))
+        self.batch_size = batch_size or int(os.getenv("RERANK_BATCH_SIZE", 10))
+        if time_budget is None:
+            time_budget = float(os.getenv("RERANK_TIME_BUDGET", 0.5))
+        self.time_budget = time_budget
+
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            print(f"Loading reranker {self.model_name}...")
+            model = CrossEncoder(self.model_name, max_length=512, device='cpu')
+            # The first prediction initializes the model; keep it out of the first request's budget
+            model.predict([("BAföG", "BAföG")], batch_size=1, show_progress_bar=False)
+        self.model = model
+
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.fallbacks = 0
+        self.seconds = 0.0
+
+    def score(self, question, documents):
+        """Cross-encoder scores of the documents, or None if the time budget ran out"""
+        start = time.perf_counter()
+        scores = []
+        for batch_start in range(0, len(documents), self.batch_size):
+            if scores and time.perf_counter() - start > self.time_budget:
+                return None
+            batch = documents[batch_start:batch_start + self.batch_size]
+            pairs = [(question, doc.page_content) for doc in batch]
+            scores.extend(float(s) for s in self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False))
+        return scores
+
+    def rerank(self, question, documents, k):
+        """
+        The k best documents by cross-encoder score
+        Returns (documents, reranked); reranked is False when the time
+        budget was exceeded and the first k in the given order are returned.
+        """
+        start = time.perf_counter()
+        scores = self.score(question, documents) if documents else []
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.seconds += elapsed
+            if scores is None:
+                self.fallbacks += 1
+            else:
+                self.reranked += 1
+        if scores is None:
+            return documents[:k], False
+        # Stable sort: equal scores keep the bi-encoder order
+        order = sorted(range(len(documents)), key=lambda i: -scores[i])
+        return [documents[i] for i in order[:k]], True
+
+    def stats(self):
+        with self._lock:
+            calls = self.reranked + self.fallbacks
+            return {
+                'model': self.model_name,
+                'fetch_k': self.fetch_k,
+                'time_budget': self.time_budget,
+                'reranked': self.reranked,
+                'fallbacks': self.fallbacks,
+                'mean_ms': round(self.seconds / calls * 1000, 2) if calls else None
+            }
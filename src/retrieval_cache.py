@@ -0,0 +1,96 @@
+"""
+Retrieval Cache
+LRU cache of query embeddings and retrieved documents keyed by normalized query
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from src.bm25_index import normalize
+
+PUNCTUATION_PATTERN = re.compile(r'[^\w]+')
+
+
+def normalize_query(question):
+    """'  Was ist BAföG?? ' and 'was ist bafög' give the same key"""
+    return PUNCTUATION_PATTERN.sub(' ', normalize(question)).strip()
+
+
+class RetrievalCache:
+    """
+    Caches the two deterministic steps before the LLM call: the question
+    embedding and the top-k documents found with it.
+
+    Entries are keyed by the normalized question (plus retrieval mode and k
+    for the documents), hold at most max_entries questions (LRU eviction)
+    and belong to one knowledge base version: set_version() with a new
+    version empties the cache. Unlike the answer cache this also pays off
+    when the answer can't be reused, e.g. within a conversation.
+    """
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.getenv("RETRIEVAL_CACHE_SIZE", 1024))
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {'embedding': 0, 'retrieval': 0}
+        self.misses = {'embedding': 0, 'retrieval': 0}
+
+    def set_version(self, version):
+        """Switch to a knowledge base version, dropping entries of the old one"""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key, field, stage):
+        with self._lock:
+            entry = self._entries.get(key)
+            value = entry.get(field) if entry else None
+            if value is None:
+                self.misses[stage] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[stage] += 1
+            return value
+
+    def _put(self, key, field, value):
+        with self._lock:
+            self._entries.setdefault(key, {})[field] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_embedding(self, question):
+        return self._get(normalize_query(question), 'embedding', 'embedding')
+
+    def put_embedding(self, question, embedding):
+        if embedding is not None:
+            self._put(normalize_query(question), 'embedding', embedding)
+
+    def get_documents(self, question, mode, k):
+        documents = self._get(normalize_query(question), ('documents', mode, k), 'retrieval')
+        return list(documents) if documents is not None else None
+
+    def put_documents(self, question, mode, k, documents):
+        self._put(normalize_query(question), ('documents', mode, k), list(documents))
+
+    def stats(self):
+        """Entry count and hit rate per stage"""
+        with self._lock:
+            stats = {'entries': len(self._entries), 'max_entries': self.max_entries, 'kb_version': self.version}
+            for stage in ('embedding', 'retrieval'):
+                lookups = self.hits[stage] + self.misses[stage]
+                stats[stage] = {
+                    'hits': self.hits[stage],
+                    'misses': self.misses[stage],
+                    'hit_rate': round(self.hits[stage] / lookups, 3) if lookups else None
+                }
+            return stats
@@ -0,0 +1,151 @@
+"""
+Server State
+Loads the knowledge base and shared server components, optionally in the background
+"""
+import os
+import time
+import threading
+
+from src.metrics import Metrics
+from src.usage_tracker import UsageTracker
+
+
+class ServerState:
+    """
+    Holds the components shared by the API servers and loads them either
+    synchronously or in a background thread, so the HTTP server can bind
+    immediately and report a 'warming' status (with progress) on /health.
+
+    Heavy modules (sentence-transformers, Chroma, LangChain) are imported
+    inside load() so importing this module stays fast.
+    """
+
+    STAGES = [
+        'citation index',
+        'embedding model',
+        'vector store',
+        'answer cache',
+        'warm-up query',
+    ]
+
+    def __init__(self, knowledge_base_path="./knowledge_base", persist_directory="./chroma_db",
+                 warmup_query=None):
+        self.knowledge_base_path = knowledge_base_path
+        self.persist_directory = persist_directory
+        self.warmup_query = warmup_query
+        self.status = 'warming'
+        self.stage = None
+        self.completed_stages = 0
+        self.error = None
+        self.failed_stage = None
+        self.started_at = None
+        self.ready_at = None
+        self._thread = None
+
+        self.kb_loader = None
+        self.vectorstore = None
+        self.citation_index = None
+        self.answer_cache = None
+        self.chatbot_pool = None
+        self.conversation_store = None
+        # Available while warming up so request errors are counted too
+        self.metrics = Metrics()
+        self.usage_tracker = UsageTracker()
+
+    def start(self, background=True):
+        """Load all components, in a daemon thread if background is True"""
+        self.started_at = time.time()
+        if background:
+            self._thread = threading.Thread(target=self.load, name='warmup', daemon=True)
+            self._thread.start()
+        else:
+            self.load()
+
+    def _begin(self, stage):
+        self.stage = stage
+        print(f"Warm-up: loading {stage}...")
+
+    def _complete_stage(self):
+        self.completed_stages += 1
+
+    def load(self):
+        """Load the knowledge base and build the shared components"""
+        try:
+            from src.api_utils import (
+                create_answer_cache, create_chatbot_pool, create_conversation_store, load_citation_index
+            )
+
+            self._begin('citation index')
+            self.citation_index = load_citation_index(
+                os.path.join(self.knowledge_base_path, "knowledge_index.json")
+            )
+            self._complete_stage()
+
+            self._begin('embedding model')
+            from src.knowledge_base_loader import KnowledgeBaseLoader
+            self.kb_loader = KnowledgeBaseLoader(
+                knowledge_base_path=self.knowledge_base_path,
+                persist_directory=self.persist_directory
+            )
+            self._complete_stage()
+
+            self._begin('vector store')
+            self.vectorstore = self.kb_loader.setup()
+            print("Knowledge base loaded successfully!")
+            self._complete_stage()
+
+            self._begin('answer cache')
+            self.answer_cache = create_answer_cache(self.kb_loader)
+            self.conversation_store = create_conversation_store()
+            self.chatbot_pool = create_chatbot_pool(
+                self.vectorstore, self.kb_loader, self.answer_cache, self.metrics, self.usage_tracker,
+                self.conversation_store
+            )
+            self._complete_stage()
+
+            self._begin('warm-up query')
+            if self.warmup_query:
+                # Prime the embedding model and vector search code paths
+                self.vectorstore.similarity_search(self.warmup_query, k=1)
+            self._complete_stage()
+
+            self.stage = None
+            self.status = 'ok'
+            self.ready_at = time.time()
+            print(f"Warm-up complete in {self.ready_at - self.started_at:.1f}s")
+        except Exception as e:
+            print(f"Error loading knowledge base ({self.stage}): {e}")
+            self.error = str(e)
+            self.failed_stage = self.stage
+            self.stage = None
+            self.status = 'error'
+
+    def ready(self):
+        """True once the knowledge base and chatbot pool are available"""
+        return self.status == 'ok'
+
+    def health(self):
+        """Status dict for the /health endpoint"""
+        health = {
+            'status': self.status,
+            'knowledge_base_loaded': self.ready(),
+            'progress': round(self.completed_stages / len(self.STAGES), 2),
+            'stage': self.stage,
+            # Identifies the worker process when served by several (gunicorn)
+            'pid': os.getpid()
+        }
+        if self.started_at is not None:
+            end_time = self.ready_at or time.time()
+            health['warmup_seconds'] = round(end_time - self.started_at, 1)
+        if self.error:
+            health['error'] = self.error
+            health['failed_stage'] = self.failed_stage
+        if self.ready():
+            health['chatbot_pool'] = self.chatbot_pool.stats()
+            health['answer_cache'] = self.answer_cache.stats() if self.answer_cache else None
+            health['conversations'] = self.conversation_store.stats() if self.conversation_store else None
+            health['faq'] = self.kb_loader.faq_store.stats() if self.kb_loader.faq_store else None
+            retrieval_cache = self.kb_loader.retrieval_cache
+            health['retrieval_cache'] = retrieval_cache.stats() if retrieval_cache else None
+            health['reranker'] = self.kb_loader.reranker.stats() if self.kb_loader.reranker else None
+        return health
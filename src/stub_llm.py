@@ -0,0 +1,64 @@
+"""
+Stub LLM
+Offline, deterministic LLM for evaluations and benchmarks without API credits
+"""
+import re
+import time
+from langchain_core.language_models.llms import LLM
+
+WORD_PATTERN = re.compile(r'\w+')
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def _words(text):
+    return {word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 2}
+
+
+class StubLLM(LLM):
+    """
+    Answers extractively: returns the context sentences that share the most
+    words with the question. The same prompt always gives the same answer,
+    so retrieval changes show up in answer quality without network calls.
+    """
+
+    max_sentences: int = 3
+    latency: float = 0.0
+    temperature: float = 0.0
+    max_tokens: int = 256
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        context, question = self._split_prompt(prompt)
+        question_words = _words(question)
+
+        scored = []
+        for position, sentence in enumerate(SENTENCE_PATTERN.split(context)):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            overlap = len(question_words & _words(sentence))
+            if overlap:
+                scored.append((-overlap, position, sentence))
+
+        if not scored:
+            return "Das weiß ich leider nicht."
+        best = sorted(scored)[:self.max_sentences]
+        # Keep the original order of the chosen sentences
+        return " ".join(sentence for _, _, sentence in sorted(best, key=lambda item: item[1]))
+
+    def _split_prompt(self, prompt):
+        """Extract (context, question) from the RAGChatbot prompt template"""
+        match = re.search(r'Kontext:\n(.*?)\n\n(?:Bisheriges Gespräch:\n.*\n\n)?Frage: (.*?)\n', prompt, re.DOTALL)
+        if not match:
+            return prompt, prompt
+        return match.group(1), match.group(2)
+
+    def get_num_tokens(self, text):
+        # Rough estimate (~4 characters per token) that needs no tokenizer download
+        return max(1, len(text) // 4)
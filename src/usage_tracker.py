@@ -0,0 +1,121 @@
+"""
+Usage Tracker
+Aggregates LLM token usage and cost per API key and model
+"""
+import json
+import os
+import threading
+
+from src.chatbot_pool import hash_api_key
+
+
+def parse_prices(value):
+    """
+    Parse TOKEN_PRICES: JSON mapping model -> [prompt, completion] USD per
+    million tokens, e.g. '{"openai/gpt-oss-20b": [0.03, 0.15]}'
+    """
+    if not value:
+        return {}
+    try:
+        return {model: (float(prices[0]), float(prices[1])) for model, prices in json.loads(value).items()}
+    except (ValueError, TypeError, IndexError) as e:
+        print(f"Ignoring invalid TOKEN_PRICES: {e}")
+        return {}
+
+
+class UsageTracker:
+    """
+    Totals of requests, tokens and cost per (API key hash, model)
+
+    Provider-reported usage is preferred; results whose usage was only
+    estimated locally are counted separately so the report shows how
+    reliable the totals are. Cost comes from the provider's `cost` field
+    when present, otherwise from the configured per-model prices.
+    An optional token budget per API key is reported as remaining tokens.
+    """
+
+    def __init__(self, prices=None, budget_tokens=None):
+        self.prices = prices if prices is not None else parse_prices(os.getenv('TOKEN_PRICES'))
+        if budget_tokens is None and os.getenv('TOKEN_BUDGET'):
+            budget_tokens = int(os.getenv('TOKEN_BUDGET'))
+        self.budget_tokens = budget_tokens
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def cost(self, model, token_usage):
+        """Cost in USD of one call, or None if unknown"""
+        if token_usage.get('cost') is not None:
+            return float(token_usage['cost'])
+        if model not in self.prices:
+            return None
+        prompt_price, completion_price = self.prices[model]
+        return (token_usage.get('prompt_tokens', 0) * prompt_price +
+                token_usage.get('completion_tokens', 0) * completion_price) / 1_000_000
+
+    def record(self, api_key, model, token_usage):
+        """Add the usage of one LLM call"""
+        if not token_usage:
+            return
+        key = (hash_api_key(api_key or '')[:12], model)
+        cost = self.cost(model, token_usage)
+        with self._lock:
+            totals = self._totals.setdefault(key, {
+                'requests': 0,
+                'estimated_requests': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'total_tokens': 0,
+                'cost': 0.0,
+                'unpriced_requests': 0
+            })
+            totals['requests'] += 1
+            if token_usage.get('estimated'):
+                totals['estimated_requests'] += 1
+            for field in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+                totals[field] += token_usage.get(field, 0)
+            if cost is None:
+                totals['unpriced_requests'] += 1
+            else:
+                totals['cost'] += cost
+
+    def _cost_fields(self, cost, requests, unpriced_requests):
+        """
+        cost is None when no request could be priced (unknown, not free);
+        cost_partial marks a cost that leaves some requests out
+        """
+        priced = requests - unpriced_requests
+        return {'cost': round(cost, 6) if priced else None, 'cost_partial': 0 < priced < requests}
+
+    def report(self):
+        """Usage per API key (hashed) and model, with totals and budget status"""
+        with self._lock:
+            keys = {}
+            for (key_hash, model), totals in sorted(self._totals.items()):
+                entry = keys.setdefault(key_hash, {
+                    'models': {}, 'total_tokens': 0, 'cost': 0.0, 'requests': 0, 'unpriced_requests': 0
+                })
+                entry['models'][model] = {
+                    **totals, **self._cost_fields(totals['cost'], totals['requests'], totals['unpriced_requests'])
+                }
+                entry['total_tokens'] += totals['total_tokens']
+                entry['cost'] += totals['cost']
+                entry['requests'] += totals['requests']
+                entry['unpriced_requests'] += totals['unpriced_requests']
+
+        total_cost = sum(entry['cost'] for entry in keys.values())
+        requests = sum(entry['requests'] for entry in keys.values())
+        unpriced_requests = sum(entry['unpriced_requests'] for entry in keys.values())
+        for entry in keys.values():
+            entry.update(self._cost_fields(entry['cost'], entry['requests'], entry['unpriced_requests']))
+            if self.budget_tokens:
+                entry['budget_tokens'] = self.budget_tokens
+                entry['budget_remaining'] = self.budget_tokens - entry['total_tokens']
+                entry['over_budget'] = entry['total_tokens'] > self.budget_tokens
+
+        total = self._cost_fields(total_cost, requests, unpriced_requests)
+        return {
+            'api_keys': keys,
+            'total_tokens': sum(entry['total_tokens'] for entry in keys.values()),
+            'total_cost': total['cost'],
+            'total_cost_partial': total['cost_partial']
+        }
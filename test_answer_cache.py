@@ -0,0 +1,129 @@
+"""
+Test script to verify the semantic answer cache
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.answer_cache import AnswerCache
+
+
+class FixedEmbeddings:
+    """Looks up a fixed vector per question"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def make_result(answer):
+    return {
+        'answer': answer,
+        'sources': [Document(page_content="BAföG-Text", metadata={'source': 'bafoeg.txt'})],
+        'token_usage': {'total_tokens': 42}
+    }
+
+
+def test_matching():
+    """Test the similarity threshold and unnormalized embeddings"""
+    print("=== Testing Answer Cache Matching ===\n")
+
+    cache = AnswerCache(embeddings=None, threshold=0.8)
+    # Unnormalized, as embed_question() returns them
+    cache.store("Was ist BAföG?", [3.0, 4.0, 0.0], "model-a", "v1", make_result("Eine Förderung."))
+
+    hit = cache.lookup([30.0, 40.0, 0.0], "model-a", "v1")
+    assert hit is not None and hit['similarity'] == 1.0, "Vector length changed the similarity"
+    hit = cache.lookup([4.0, 3.0, 0.0], "model-a", "v1")
+    assert hit is not None and abs(hit['similarity'] - 0.96) < 1e-3, hit
+    print("✓ Cosine similarity independent of vector length")
+
+    cache = AnswerCache(embeddings=None, threshold=0.8)
+    cache.store("Was ist BAföG?", [1.0, 0.0], "model-a", "v1", make_result("Eine Förderung."))
+    assert cache.lookup([0.8, 0.6], "model-a", "v1") is not None, "Similarity 0.8 at threshold 0.8 missed"
+    assert cache.lookup([0.79, 0.61], "model-a", "v1") is None, "Similarity below threshold matched"
+    hit = cache.lookup([2.0, 0.0], "model-a", "v1")
+    assert hit['answer'] == "Eine Förderung." and hit['sources'][0].metadata['source'] == 'bafoeg.txt'
+    assert hit['token_usage'] == {'total_tokens': 42}
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1, cache.stats()
+    print("✓ Hits at the threshold, misses below it")
+
+    embeddings = FixedEmbeddings({"Was ist BAföG?": [0.0, 5.0]})
+    vector = AnswerCache(embeddings=embeddings).embed("Was ist BAföG?")
+    assert abs(sum(x * x for x in vector) - 1.0) < 1e-6
+    print("✓ embed() returns unit vectors")
+
+    print("\n=== Answer cache matching tests passed! ===")
+    return True
+
+
+def test_scoping_and_eviction():
+    """Test model/version scoping and LRU eviction"""
+    print("\n=== Testing Answer Cache Scoping ===\n")
+
+    cache = AnswerCache(embeddings=None, threshold=0.9, max_entries=2)
+    cache.store("Frage A", [1.0, 0.0, 0.0], "model-a", "v1", make_result("A"))
+    assert cache.lookup([1.0, 0.0, 0.0], "model-b", "v1") is None, "Answer of another model served"
+    assert cache.lookup([1.0, 0.0, 0.0], "model-a", "v2") is None, "Answer of an old knowledge base served"
+    print("✓ Entries scoped to model and knowledge base version")
+
+    cache.store("Frage B", [0.0, 1.0, 0.0], "model-a", "v1", make_result("B"))
+    # A is used, so B is the least recently used entry
+    assert cache.lookup([1.0, 0.0, 0.0], "model-a", "v1")['answer'] == "A"
+    cache.store("Frage C", [0.0, 0.0, 1.0], "model-a", "v1", make_result("C"))
+    assert cache.stats()['size'] == 2
+    assert cache.lookup([0.0, 1.0, 0.0], "model-a", "v1") is None, "Least recently used entry kept"
+    assert cache.lookup([1.0, 0.0, 0.0], "model-a", "v1")['answer'] == "A"
+    assert cache.lookup([0.0, 0.0, 1.0], "model-a", "v1")['answer'] == "C"
+    print("✓ Least recently used entry evicted at max_entries")
+
+    print("\n=== Answer cache scoping tests passed! ===")
+    return True
+
+
+def test_persistence():
+    """Test the save/load round-trip through persist_path"""
+    print("\n=== Testing Answer Cache Persistence ===\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cache", "answer_cache.json")
+        cache = AnswerCache(embeddings=None, threshold=0.9, persist_path=path, save_every=2)
+        cache.store("Frage A", [2.0, 0.0], "model-a", "v1", make_result("A"))
+        assert not os.path.exists(path), "Saved before save_every entries"
+        cache.store("Frage B", [0.0, 2.0], "model-a", "v1", make_result("B"))
+        assert os.path.exists(path), "Not saved after save_every entries"
+        print("✓ Saved every save_every entries")
+
+        reloaded = AnswerCache(embeddings=None, threshold=0.9, persist_path=path)
+        assert reloaded.stats()['size'] == 2
+        hit = reloaded.lookup([0.0, 1.0], "model-a", "v1")
+        assert hit['answer'] == "B" and hit['question'] == "Frage B" and hit['similarity'] == 1.0
+        assert hit['sources'][0].page_content == "BAföG-Text"
+        assert reloaded.lookup([0.0, 1.0], "model-a", "v2") is None
+        print("✓ Answers, sources and scope survive a reload")
+
+        small = AnswerCache(embeddings=None, threshold=0.9, max_entries=1, persist_path=path)
+        assert small.stats()['size'] == 1 and small.lookup([0.0, 1.0], "model-a", "v1")['answer'] == "B"
+        print("✓ Reload keeps the most recent max_entries answers")
+
+    print("\n=== Answer cache persistence tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_matching()
+        test_scoping_and_eviction()
+        test_persistence()
+        print("\n✅ All answer cache tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Test script to verify the ASGI server endpoints against the fake LLM server
+"""
+import os
+import sys
+import json
+import importlib
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from starlette.testclient import TestClient
+
+import src.knowledge_base_loader as knowledge_base_loader
+from src.fake_llm_server import FakeLLMServer
+from test_kb_sync import StubHuggingFaceEmbeddings, write_files, FILES
+from test_server_state import ENVIRONMENT
+
+
+def parse_events(text):
+    """(event, data) pairs of a server-sent event stream"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def check_health(client):
+    print("=== Testing /health ===\n")
+    health = client.get('/health').json()
+    assert health['status'] == 'ok' and health['knowledge_base_loaded'], health
+    assert health['progress'] == 1.0
+    print(f"✓ status {health['status']}, progress {health['progress']}")
+
+
+def check_chat(client, server):
+    print("\n=== Testing /chat ===\n")
+    response = client.post('/chat', json={'question': "Wie hoch ist der Höchstsatz?", 'api_key': 'test',
+                                          'debug': True})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['answer'] == "token0 token1 token2 "
+    assert body['token_usage']['estimated'] is False and body['token_usage']['completion_tokens'] == 3
+    assert 'llm' in body['timings'] and 'cache' in body['timings']
+    print(f"✓ Answer from the fake LLM with provider usage {body['token_usage']}")
+
+    for payload, error in [(["Wie hoch ist der Höchstsatz?"], 'JSON object'),
+                           ({'api_key': 'test'}, 'No question'),
+                           ({'question': "Wie hoch ist der Höchstsatz?"}, 'No API key')]:
+        response = client.post('/chat', json=payload)
+        assert response.status_code == 400 and error in response.json()['error'], response.text
+    assert client.post('/chat/batch', json=["Wo stelle ich den Antrag?"]).status_code == 400
+    print("✓ Non-object bodies, missing questions and missing API keys are rejected with 400")
+
+
+def check_chat_stream(client):
+    print("\n=== Testing /chat/stream ===\n")
+    response = client.post('/chat/stream', json={'question': "Wo stelle ich den Antrag?", 'api_key': 'test'})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    events = parse_events(response.text)
+    names = [event for event, _ in events]
+    assert names == ['sources', 'token', 'token', 'token', 'done'], names
+    done = events[-1][1]
+    assert done['answer'] == ''.join(data['token'] for event, data in events if event == 'token')
+    assert done['token_usage']['estimated'] is False, done['token_usage']
+    print(f"✓ Events {names} with provider usage {done['token_usage']}")
+
+
+def check_rate_limit(client, server):
+    print("\n=== Testing rate-limit back-off ===\n")
+    requests = server.requests
+    server.rate_limited = requests + 1
+    response = client.post('/chat', json={'question': "Gibt es eine Altersgrenze?", 'api_key': 'test'})
+    assert response.status_code == 200, response.text
+    assert server.requests == requests + 2, "Rate-limited request not retried"
+    print("✓ HTTP 429 from the LLM paused and retried")
+
+
+def test_asgi_endpoints():
+    """Test /health, /chat and /chat/stream through the Starlette test client"""
+    saved = {key: os.environ.get(key) for key in list(ENVIRONMENT) + [
+        'ANSWER_CACHE', 'BACKGROUND_WARMUP', 'WARMUP_QUERY', 'KNOWLEDGE_BASE_PATH', 'PERSIST_DIRECTORY',
+        'OPENROUTER_BASE_URL']}
+    original = knowledge_base_loader.HuggingFaceEmbeddings
+    knowledge_base_loader.HuggingFaceEmbeddings = StubHuggingFaceEmbeddings
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                FakeLLMServer(latency=0.0, tokens_per_second=0, completion_tokens=3) as server:
+            kb_path = os.path.join(tmp_dir, "knowledge_base")
+            os.makedirs(kb_path)
+            write_files(kb_path, FILES)
+            os.environ.update(ENVIRONMENT)
+            os.environ.update({
+                'ANSWER_CACHE': 'false', 'BACKGROUND_WARMUP': 'false', 'WARMUP_QUERY': '',
+                'KNOWLEDGE_BASE_PATH': kb_path, 'PERSIST_DIRECTORY': os.path.join(tmp_dir, "db"),
+                'OPENROUTER_BASE_URL': server.url
+            })
+            asgi_server = importlib.import_module('asgi_server')
+
+            with TestClient(asgi_server.app) as client:
+                check_health(client)
+                check_chat(client, server)
+                check_chat_stream(client)
+                check_rate_limit(client, server)
+    finally:
+        knowledge_base_loader.HuggingFaceEmbeddings = original
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    print("\n=== ASGI server tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_asgi_endpoints()
+        print("\n✅ All ASGI server tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
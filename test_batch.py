@@ -0,0 +1,230 @@
+"""
+Test script to verify batch answering: result indexes, per-question errors,
+rate-limit back-off, concurrency limits and the /chat/batch endpoint
+"""
+import os
+import sys
+import json
+import time
+import importlib
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+import src.knowledge_base_loader as knowledge_base_loader
+from src.numpy_vectorstore import NumpyVectorStore
+from src.stub_llm import StubLLM
+from src.rag_chatbot import RAGChatbot
+from src.chatbot_pool import ChatbotPool
+from src.api_utils import batch_concurrency, batch_line, batch_questions_error
+from test_conversation_store import TermEmbeddings
+from test_kb_sync import StubHuggingFaceEmbeddings, write_files, FILES
+from test_server_state import ENVIRONMENT
+
+DOCUMENTS = [
+    Document(page_content="Der Höchstsatz für Studierende beträgt 992 Euro im Monat.",
+             metadata={'source': 'hoechstsatz.txt', 'url': 'https://example.org/hoechstsatz'}),
+    Document(page_content="Die Rückzahlung beginnt fünf Jahre nach der Förderungshöchstdauer.",
+             metadata={'source': 'rueckzahlung.txt', 'url': 'https://example.org/rueckzahlung'}),
+    Document(page_content="Den Antrag stellt man beim Amt für Ausbildungsförderung.",
+             metadata={'source': 'antrag.txt', 'url': 'https://example.org/antrag'}),
+]
+
+QUESTIONS = [
+    "Wie hoch ist der Höchstsatz für Studierende?",
+    "Wann beginnt die Rückzahlung?",
+    "Wo stellt man den Antrag?",
+]
+
+
+class RateLimitResponse:
+    status_code = 429
+    headers = {'retry-after': '0.05'}
+
+
+class RateLimitError(Exception):
+    """Stands in for the provider client's HTTP 429 error"""
+    status_code = 429
+    response = RateLimitResponse()
+
+
+def make_chatbot(persist_directory, latency=0.0):
+    vectorstore = NumpyVectorStore.from_documents(DOCUMENTS, TermEmbeddings(), persist_directory=persist_directory)
+    return RAGChatbot(vectorstore, llm=StubLLM(latency=latency), k=1, retrieval_mode='similarity', api_key='test')
+
+
+def test_ask_batch():
+    """Test that every result carries its own index and question, and failures stay per question"""
+    print("=== Testing ask_batch ===\n")
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        chatbot = make_chatbot(persist_directory, latency=0.05)
+        results = list(chatbot.ask_batch(QUESTIONS * 2, max_concurrency=3))
+        assert sorted(item['index'] for item in results) == list(range(6)), results
+        for item in results:
+            assert item['question'] == (QUESTIONS * 2)[item['index']]
+            assert 'error' not in item, item
+        by_index = {item['index']: item for item in results}
+        assert "992 Euro" in by_index[0]['answer'] and "fünf Jahre" in by_index[1]['answer']
+        assert by_index[0]['answer'] == by_index[3]['answer']
+        print(f"✓ {len(results)} results, each matched to its question by index")
+
+        generate = chatbot._generate
+
+        def failing_generate(prompt):
+            if "Rückzahlung" in prompt.split("Frage:")[-1]:
+                raise ValueError("LLM failed")
+            return generate(prompt)
+        chatbot._generate = failing_generate
+        results = sorted(chatbot.ask_batch(QUESTIONS), key=lambda item: item['index'])
+        assert results[1]['error'] == "LLM failed" and 'answer' not in results[1], results[1]
+        assert 'error' not in results[0] and 'error' not in results[2]
+
+        error_line = json.loads(batch_line(chatbot, results[1]))
+        assert error_line == {'index': 1, 'question': QUESTIONS[1], 'error': "LLM failed"}, error_line
+        answer_line = json.loads(batch_line(chatbot, results[0]))
+        assert answer_line['answer'] == results[0]['answer'] and answer_line['sources'][0]['file'] == 'hoechstsatz.txt'
+        print("✓ A failing question yields an error line; the others are answered")
+
+    print("\n=== ask_batch tests passed! ===")
+    return True
+
+
+def test_rate_limit_backoff():
+    """Test that a 429 pauses LLM calls and is retried, and that other errors are not"""
+    print("\n=== Testing Rate-Limit Back-off ===\n")
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        chatbot = make_chatbot(persist_directory)
+        calls = []
+
+        def rate_limited_generate(prompt):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise RateLimitError("Rate limit exceeded")
+            return "Antwort", {'total_tokens': 1}
+        chatbot._generate = rate_limited_generate
+
+        assert chatbot._rate_limit_delay(RateLimitError()) == 0.05
+        assert chatbot._rate_limit_delay(ValueError()) is None
+        assert chatbot._generate_with_backoff("prompt") == ("Antwort", {'total_tokens': 1})
+        assert len(calls) == 2
+        # Retry-After is shorter than the first back-off step (1s), so the step wins
+        assert calls[1] - calls[0] >= 1.0 and chatbot._pause_until <= time.monotonic()
+        print(f"✓ Retried after {calls[1] - calls[0]:.2f}s pause")
+
+        calls.clear()
+        chatbot._generate = lambda prompt: calls.append(prompt) or (_ for _ in ()).throw(RateLimitError())
+        try:
+            chatbot._generate_with_backoff("prompt", max_retries=0)
+            assert False, "Rate limit error swallowed"
+        except RateLimitError:
+            pass
+        assert len(calls) == 1
+        print("✓ Gives up after max_retries")
+
+    print("\n=== Back-off tests passed! ===")
+    return True
+
+
+def test_request_limits():
+    """Test concurrency clamping and question validation"""
+    print("\n=== Testing Batch Request Limits ===\n")
+
+    saved = {key: os.environ.get(key) for key in ('BATCH_CONCURRENCY', 'BATCH_MAX_CONCURRENCY')}
+    os.environ.pop('BATCH_CONCURRENCY', None)
+    os.environ.pop('BATCH_MAX_CONCURRENCY', None)
+    try:
+        assert batch_concurrency(None) == 4
+        assert batch_concurrency(2) == 2
+        assert batch_concurrency(100) == 8
+        assert batch_concurrency(-3) == 1
+        assert batch_concurrency("viele") == 4
+        os.environ['BATCH_MAX_CONCURRENCY'] = '2'
+        assert batch_concurrency(None) == 2 and batch_concurrency("viele") == 2
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    print("✓ Concurrency defaults to 4 and is clamped to 1..BATCH_MAX_CONCURRENCY")
+
+    assert batch_questions_error(QUESTIONS) is None
+    assert batch_questions_error([]) == 'No questions provided'
+    assert batch_questions_error("Was ist BAföG?") == 'No questions provided'
+    assert batch_questions_error(["Was ist BAföG?", 42]) == 'Question 1 must be a non-empty string'
+    assert batch_questions_error(["  "]) == 'Question 0 must be a non-empty string'
+    assert batch_questions_error(["Was ist BAföG?"] * 501).startswith('Too many questions')
+    print("✓ Empty, non-string and too many questions are rejected")
+    return True
+
+
+def test_batch_endpoint():
+    """Test the NDJSON output of /chat/batch and its 400 responses"""
+    print("\n=== Testing /chat/batch ===\n")
+
+    saved = {key: os.environ.get(key) for key in list(ENVIRONMENT) + [
+        'ANSWER_CACHE', 'BACKGROUND_WARMUP', 'WARMUP_QUERY', 'KNOWLEDGE_BASE_PATH', 'PERSIST_DIRECTORY']}
+    original = knowledge_base_loader.HuggingFaceEmbeddings
+    knowledge_base_loader.HuggingFaceEmbeddings = StubHuggingFaceEmbeddings
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            kb_path = os.path.join(tmp_dir, "knowledge_base")
+            os.makedirs(kb_path)
+            write_files(kb_path, FILES)
+            os.environ.update(ENVIRONMENT)
+            os.environ.update({
+                'ANSWER_CACHE': 'false', 'BACKGROUND_WARMUP': 'false', 'WARMUP_QUERY': '',
+                'KNOWLEDGE_BASE_PATH': kb_path, 'PERSIST_DIRECTORY': os.path.join(tmp_dir, "db")
+            })
+            api_server = importlib.import_module('api_server')
+            state = api_server.state
+            assert state.ready(), state.health()
+            state.chatbot_pool = ChatbotPool(factory=lambda api_key: RAGChatbot(
+                state.vectorstore, api_key=api_key, kb_loader=state.kb_loader, llm=StubLLM(),
+                retrieval_mode='similarity', metrics=state.metrics
+            ))
+            client = api_server.app.test_client()
+
+            questions = ["Wie hoch ist der Höchstsatz?", "Wo stelle ich den Antrag?"]
+            response = client.post('/chat/batch', json={'questions': questions, 'api_key': 'test'})
+            assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            items = sorted(lines[:-1], key=lambda line: line['index'])
+            assert [item['question'] for item in items] == questions
+            assert "992 Euro" in items[0]['answer'] and items[1]['answer'], items
+            assert lines[-1]['done'] is True and lines[-1]['questions'] == 2 and lines[-1]['errors'] == 0
+            print(f"✓ {len(items)} answer lines and a done line")
+
+            for questions in (["Wie hoch ist der Höchstsatz?", None], ["Wie hoch ist der Höchstsatz?", ""], []):
+                response = client.post('/chat/batch', json={'questions': questions, 'api_key': 'test'})
+                assert response.status_code == 400, response.get_data(as_text=True)
+            assert state.chatbot_pool.stats()['size'] == 1, "Chatbot invalidated"
+            print("✓ Invalid questions rejected with 400 before streaming")
+    finally:
+        knowledge_base_loader.HuggingFaceEmbeddings = original
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    print("\n=== /chat/batch tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_ask_batch()
+        test_rate_limit_backoff()
+        test_request_limits()
+        test_batch_endpoint()
+        print("\n✅ All batch tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
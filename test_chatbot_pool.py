@@ -0,0 +1,81 @@
+"""
+Test script to verify the chatbot pool used by the API server
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.chatbot_pool import ChatbotPool, hash_api_key
+
+
+def test_pool_reuse_and_eviction():
+    """Test that chatbots are reused per key and evicted LRU"""
+    print("=== Testing Chatbot Pool ===\n")
+
+    created = []
+
+    def factory(api_key):
+        created.append(api_key)
+        return object()
+
+    pool = ChatbotPool(factory, max_size=2, ttl=None)
+
+    first = pool.get("sk-or-a")
+    assert pool.get("sk-or-a") is first, "Chatbot was not reused"
+    print("✓ Chatbot reused for same API key")
+
+    pool.get("sk-or-b")
+    pool.get("sk-or-a")  # a is now most recently used
+    pool.get("sk-or-c")  # evicts b
+
+    stats = pool.stats()
+    assert stats['size'] == 2, f"Unexpected pool size: {stats['size']}"
+    assert stats['hits'] == 2 and stats['misses'] == 3, f"Unexpected counters: {stats}"
+    assert stats['evictions'] == 1, f"Unexpected evictions: {stats}"
+    print("✓ Least recently used entry evicted")
+
+    pool.get("sk-or-a")
+    assert created.count("sk-or-a") == 1, "Recently used entry was evicted"
+    pool.get("sk-or-b")
+    assert created.count("sk-or-b") == 2, "Evicted entry was not rebuilt"
+    print("✓ Hit/miss counters correct")
+
+    # Raw keys must never be used as dict keys
+    assert "sk-or-a" not in pool._entries
+    assert hash_api_key("sk-or-a") in pool._entries
+    print("✓ API keys stored as hashes only")
+
+    print("\n=== Pool reuse tests passed! ===")
+    return True
+
+
+def test_pool_ttl():
+    """Test that expired entries are rebuilt"""
+    print("\n=== Testing Chatbot Pool TTL ===\n")
+
+    pool = ChatbotPool(lambda api_key: object(), max_size=4, ttl=0.05)
+    first = pool.get("sk-or-a")
+    time.sleep(0.1)
+    assert pool.get("sk-or-a") is not first, "Expired entry was reused"
+    print("✓ Expired entry rebuilt")
+
+    pool.invalidate("sk-or-a")
+    assert pool.stats()['size'] == 0, "Invalidated entry still pooled"
+    print("✓ Invalidated entry removed")
+
+    print("\n=== Pool TTL tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_pool_reuse_and_eviction()
+        test_pool_ttl()
+        print("\n✅ All chatbot pool tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
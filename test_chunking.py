@@ -0,0 +1,106 @@
+"""
+Test script to verify structure-aware chunking of knowledge base files
+"""
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.chunking import StructuredSplitter, create_splitter, chunk_size_stats, split_sections
+
+SCRIPT_DIR = Path(__file__).parent
+
+FAQ = """Häufig gestellte Fragen zum BAföG:
+
+Kann mein Studium länger mit BAföG gefördert werden?
+
+Ja, es gibt ein Flexibilitätssemester. Eine Angabe von Gründen ist nicht erforderlich.
+
+Wer bekommt die neue Studienstarthilfe?
+
+Die Studienstarthilfe in Höhe von 1.000 Euro gibt es für Studienanfänger unter 25 Jahren.
+
+Ein Antrag kann bis zum Ende des Folgemonats gestellt werden.
+"""
+
+
+def test_sections():
+    """Test that questions and headings start sections"""
+    print("=== Testing Section Detection ===\n")
+
+    sections = split_sections(FAQ)
+    titles = [title for title, body in sections]
+    assert titles == [None, "Kann mein Studium länger mit BAföG gefördert werden?",
+                      "Wer bekommt die neue Studienstarthilfe?"], f"Unexpected sections: {titles}"
+    assert len(sections[2][1]) == 2, "Answer paragraphs not kept with their question"
+    print("✓ Q&A pairs detected, multi-paragraph answers kept together")
+
+    sections = split_sections("Hanna (24), Studentin\n\nHanna studiert Medizin.\n\n"
+                              "Berechnung der BAföG-Förderung\n\nBedarf\n\nZeile 1: Grundbedarf | 475 €.")
+    assert sections[1][0] == "Berechnung der BAföG-Förderung\nBedarf", f"Headings not joined: {sections}"
+    print("✓ Consecutive headings joined into one section title")
+
+    print("\n=== Section tests passed! ===")
+    return True
+
+
+def test_structured_splitter():
+    """Test that Q&A pairs are never cut or merged, and long sections keep their title"""
+    print("\n=== Testing Structured Splitter ===\n")
+
+    doc = Document(page_content=FAQ, metadata={'source': 'knowledge_base/Fragen_und_Antworten.txt'})
+    chunks = StructuredSplitter(chunk_size=1000).split_documents([doc])
+    assert len(chunks) == 2, f"Expected one chunk per Q&A pair: {[c.page_content for c in chunks]}"
+    assert chunks[1].page_content.startswith("Wer bekommt") and "Folgemonats" in chunks[1].page_content
+    assert chunks[1].metadata['section'] == "Wer bekommt die neue Studienstarthilfe?"
+    assert chunks[1].metadata['qa'] and chunks[1].metadata['source'] == doc.metadata['source']
+    print("✓ One chunk per Q&A pair with section metadata")
+
+    long_text = "Berechnung der BAföG-Förderung\n\n" + "\n\n".join(
+        f"Zeile {i}: Rechnungsposten {i} | {i * 10},00 €." for i in range(60))
+    chunks = StructuredSplitter(chunk_size=300, chunk_overlap=30).split_documents(
+        [Document(page_content=long_text, metadata={'source': 'hanna.txt'})])
+    assert len(chunks) > 1 and all(len(c.page_content) <= 300 for c in chunks), "Chunk size exceeded"
+    assert all(c.page_content.startswith("Berechnung der BAföG-Förderung") for c in chunks), \
+        "Section title not repeated"
+    print(f"✓ Long section split into {len(chunks)} chunks, each starting with its title")
+
+    print("\n=== Structured splitter tests passed! ===")
+    return True
+
+
+def test_knowledge_base():
+    """Compare strategies on the real knowledge base files"""
+    print("\n=== Testing Chunking on the Knowledge Base ===\n")
+
+    documents = [
+        Document(page_content=path.read_text(encoding='utf-8'), metadata={'source': str(path)})
+        for path in sorted((SCRIPT_DIR / "knowledge_base").glob("*.txt"))
+    ]
+    for strategy in ('recursive', 'structured'):
+        stats = chunk_size_stats(create_splitter(strategy, 1000, 100).split_documents(documents))
+        assert stats['max'] <= 1000, f"{strategy} chunk exceeds chunk size: {stats}"
+        print(f"✓ {strategy}: {stats}")
+
+    faq = [doc for doc in documents if doc.metadata['source'].endswith("Fragen_und_Antworten.txt")]
+    for chunk in create_splitter('structured').split_documents(faq):
+        if chunk.metadata['qa']:
+            assert chunk.metadata['section'] in chunk.page_content, "Q&A chunk lost its question"
+    print("✓ Q&A chunks of Fragen_und_Antworten.txt contain their question")
+
+    print("\n=== Knowledge base chunking tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_sections()
+        test_structured_splitter()
+        test_knowledge_base()
+        print("\n✅ All chunking tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
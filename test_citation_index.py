@@ -0,0 +1,74 @@
+"""
+Test script to verify the keyword citation index
+"""
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from create_knowledge_index import build_postings
+from src.citation_index import CitationIndex
+
+SCRIPT_DIR = Path(__file__).parent
+
+
+def test_build_postings():
+    """Test that postings are weighted and sorted"""
+    print("=== Testing Posting Construction ===\n")
+
+    documents = [
+        {'name': 'Altersgrenze', 'content': 'Die Altersgrenze liegt bei 45 Jahren.'},
+        {'name': 'Rückzahlung', 'content': 'Die Rückzahlung beginnt nach der Förderungshöchstdauer.'},
+    ]
+    postings, idf = build_postings(documents)
+
+    assert 'die' not in postings, "Stopword was indexed"
+    print("✓ Stopwords not indexed")
+
+    assert postings['altersgrenze'][0][0] == 0, "Name term not indexed"
+    assert postings['altersgrenze'][0][1] > postings['jahren'][0][1], "Name boost missing"
+    print("✓ Document name terms boosted")
+
+    assert idf['rückzahlung'] > 0, "IDF not precomputed"
+    print("✓ IDF precomputed")
+
+    print("\n=== Posting tests passed! ===")
+    return True
+
+
+def test_citation_lookup():
+    """Test lookups against the generated knowledge_index.json"""
+    print("\n=== Testing Citation Lookup ===\n")
+
+    index = CitationIndex(SCRIPT_DIR / 'knowledge_base' / 'knowledge_index.json')
+
+    test_cases = [
+        ('Gibt es eine Altersgrenze?', 'gibt-es-eine-altersgrenze.txt'),
+        ('How does the repayment work?', 'wie-funktioniert-die-rueckzahlung.txt'),
+        ('Can I get BAföG abroad?', 'gibt-es-bafoeg-auch-im-ausland.txt'),
+    ]
+
+    for question, expected_file in test_cases:
+        sources = index.lookup(question)
+        files = [source['file'] for source in sources]
+        assert files and files[0] == expected_file, f"{question}: got {files}"
+        assert all(source['url'] for source in sources), "Source without URL"
+        print(f"✓ '{question}' → {expected_file}")
+
+    assert index.lookup('Wetter heute'), "No default sources for unmatched question"
+    print("✓ Default sources for unmatched question")
+
+    print("\n=== Citation lookup tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_build_postings()
+        test_citation_lookup()
+        print("\n✅ All citation index tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,124 @@
+"""
+Test script to verify context compression: overlap removal, relevance trimming and the token budget
+"""
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.context_builder import ContextBuilder, estimate_tokens
+
+
+def doc(text, source='bafoeg.txt'):
+    return Document(page_content=text, metadata={'source': source})
+
+
+def test_overlap_removal():
+    """Test that text shared by adjacent chunks of a file is sent once"""
+    print("=== Testing Overlap Removal ===\n")
+
+    builder = ContextBuilder(token_budget=1000, min_relevance=0)
+    shared = "Der Antrag wird beim Amt für Ausbildungsförderung gestellt."
+    first = doc("BAföG gibt es für Schule und Studium. " + shared)
+    second = doc(shared + " Das Amt ist am Wohnort der Eltern.")
+
+    kept = builder.deduplicate([first, second])
+    assert kept[0].page_content == first.page_content
+    assert kept[1].page_content == "Das Amt ist am Wohnort der Eltern.", kept[1].page_content
+    print("✓ Overlap at the start of the next chunk removed")
+
+    kept = builder.deduplicate([second, first])
+    assert kept[1].page_content == "BAföG gibt es für Schule und Studium.", kept[1].page_content
+    print("✓ Overlap removed when the later chunk was retrieved first")
+
+    kept = builder.deduplicate([first, doc(shared), second])
+    assert len(kept) == 2, "Chunk contained in an earlier one was kept"
+    print("✓ Chunks contained in an earlier chunk dropped")
+
+    kept = builder.deduplicate([first, doc(second.page_content, source='other.txt')])
+    assert kept[1].page_content == second.page_content, "Text of another file trimmed"
+    short = builder.deduplicate([doc("Antrag stellen. Kurz."), doc("Kurz. Dann warten.")])
+    assert short[1].page_content == "Kurz. Dann warten.", "Overlap below min_overlap removed"
+    print("✓ Other files and overlaps shorter than min_overlap are left alone")
+
+    print("\n=== Overlap removal tests passed! ===")
+    return True
+
+
+def test_relevance_trimming():
+    """Test that sentences unrelated to the question are dropped"""
+    print("\n=== Testing Relevance Trimming ===\n")
+
+    builder = ContextBuilder(token_budget=1000, min_relevance=0.5)
+    text = ("Das BAföG wurde 1971 eingeführt. Es wird oft reformiert. Viele Studierende beziehen es. "
+            "Der Höchstsatz für Studierende liegt bei 992 Euro. Er gilt ohne Elternwohnung. "
+            "Schüler bekommen weniger. Die Rückzahlung beginnt später. Das Darlehen ist zinslos.")
+    context = builder.build("Wie hoch ist der Höchstsatz?", [doc(text)])
+    kept = context[0].page_content.split("\n")
+    assert kept == ["Viele Studierende beziehen es.", "Der Höchstsatz für Studierende liegt bei 992 Euro.",
+                    "Er gilt ohne Elternwohnung."], kept
+    print("✓ Relevant sentence kept with its neighbours, the rest dropped")
+
+    english = builder.build("How much is the maximum rate?", [doc(text)])
+    assert len(english[0].page_content.split("\n")) == 8, "Chunk without question terms was trimmed"
+    print("✓ Chunks sharing no term with the question are kept whole")
+
+    unfiltered = ContextBuilder(token_budget=1000, min_relevance=0).build("Wie hoch ist der Höchstsatz?", [doc(text)])
+    assert len(unfiltered[0].page_content.split("\n")) == 8
+    print("✓ min_relevance=0 disables trimming")
+
+    print("\n=== Relevance trimming tests passed! ===")
+    return True
+
+
+def test_token_budget():
+    """Test the chars/4 budget across chunks and within a single oversized chunk"""
+    print("\n=== Testing Token Budget ===\n")
+
+    assert estimate_tokens("x" * 40) == 10 and estimate_tokens("") == 0 and estimate_tokens("ab") == 1
+    print("✓ ~4 characters per token")
+
+    sentences = [f"Satz {i} über das BAföG und seine Regeln im Detail." for i in range(6)]
+    chunks = [doc(" ".join(sentences[:3]), 'a.txt'), doc(" ".join(sentences[3:]), 'b.txt')]
+    per_sentence = estimate_tokens(sentences[0])
+
+    builder = ContextBuilder(token_budget=per_sentence * 4, min_relevance=0)
+    context = builder.build("BAföG", chunks)
+    assert [d.metadata['source'] for d in context] == ['a.txt', 'b.txt']
+    assert context[1].page_content == sentences[3], "Last chunk not cut at a sentence boundary"
+    used = sum(estimate_tokens(s) for d in context for s in d.page_content.split("\n"))
+    assert used <= builder.token_budget
+    print(f"✓ Chunks added in order until {builder.token_budget} tokens, the last cut after a sentence")
+
+    builder = ContextBuilder(token_budget=per_sentence * 2, min_relevance=0,
+                             model_budgets={'large-model': per_sentence * 10})
+    single = doc(" ".join(sentences))
+    context = builder.build("BAföG", [single])
+    assert context[0].page_content.split("\n") == sentences[:2], "Oversized chunk not cut to the budget"
+    assert len(builder.build("BAföG", [single], model='large-model')[0].page_content.split("\n")) == 6
+    print("✓ A single chunk over the budget is cut at a sentence boundary; per-model budgets apply")
+
+    long_sentence = "Das BAföG " + "fördert Schüler und Studierende " * 40 + "in Deutschland."
+    builder = ContextBuilder(token_budget=50, min_relevance=0)
+    context = builder.build("BAföG", [doc(long_sentence), doc("Noch ein Abschnitt.", 'b.txt')])
+    assert len(context) == 1 and context[0].page_content, "Sentence over the budget produced no context"
+    text = context[0].page_content
+    assert len(text) <= 50 * 4 and long_sentence.startswith(text) and long_sentence[len(text)] == ' '
+    print(f"✓ A first sentence over the whole budget is cut at a word boundary ({len(text)} chars)")
+
+    print("\n=== Token budget tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_overlap_removal()
+        test_relevance_trimming()
+        test_token_budget()
+        print("\n✅ All context builder tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,139 @@
+"""
+Test script to verify server-side conversation memory
+"""
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.conversation_store import ConversationStore, is_follow_up, rewrite_query
+from src.context_builder import estimate_tokens
+from src.numpy_vectorstore import NumpyVectorStore
+from src.bm25_index import tokenize
+from src.stub_llm import StubLLM
+from src.rag_chatbot import RAGChatbot
+
+
+class TermEmbeddings:
+    """Bag-of-terms vectors: texts sharing terms are similar"""
+
+    def __init__(self, size=256):
+        self.size = size
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for term in tokenize(text):
+            vector[sum(ord(c) for c in term) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_store():
+    """Test LRU eviction with spill to disk, TTL and the token budget"""
+    print("=== Testing Conversation Store ===\n")
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ConversationStore(max_sessions=2, ttl=60, token_budget=200, spill_dir=spill_dir)
+        for session in ("a", "b", "c"):
+            store.add_turn(session, f"Frage {session}?", f"Antwort {session}.")
+        assert store.stats()['sessions'] == 2 and store.stats()['spilled'] == 1, store.stats()
+        assert store.get("a")['turns'][0]['answer'] == "Antwort a.", "Spilled session not restored"
+        print("✓ Least recently used session spilled to disk and restored")
+
+    store = ConversationStore(ttl=0.05)
+    store.add_turn("x", "Frage?", "Antwort.")
+    time.sleep(0.1)
+    assert store.get("x") is None, "Expired session returned"
+    print("✓ Sessions expire after the TTL")
+
+    store = ConversationStore(token_budget=120, keep_turns=2)
+    for i in range(6):
+        store.add_turn("s", f"Wie ist das mit Punkt {i}?", f"Punkt {i} ist wichtig. " + "Details folgen hier. " * 10)
+    history = store.get("s")
+    assert len(history['turns']) <= 2 and "Punkt 3" in history['summary'], \
+        f"Old turns not summarized: {history}"
+    assert estimate_tokens(store.history_text(history)) <= 120, "History exceeds the token budget"
+    print(f"✓ Old turns folded into a summary ({store.tokens(history)} tokens of history)")
+
+    print("\n=== Conversation store tests passed! ===")
+    return True
+
+
+def test_query_rewriting():
+    """Test that follow-ups are rewritten and standalone questions are not"""
+    print("\n=== Testing Query Rewriting ===\n")
+
+    history = {'summary': '', 'turns': [{'question': "Wie hoch ist der Höchstsatz für Studierende?",
+                                         'answer': "992 Euro."}]}
+    assert is_follow_up("Und für Schüler?") and is_follow_up("Gilt das auch im Ausland?")
+    assert rewrite_query("Und für Schüler?", history).startswith("Wie hoch ist der Höchstsatz")
+    question = "Wann beginnt die Rückzahlung des BAföG-Darlehens?"
+    assert rewrite_query(question, history) == question, "Standalone question rewritten"
+    assert rewrite_query("Und für Schüler?", None) == "Und für Schüler?", "Rewritten without history"
+    print("✓ Follow-ups carry the previous question, standalone questions are unchanged")
+
+    print("\n=== Query rewriting tests passed! ===")
+    return True
+
+
+def test_chatbot_sessions():
+    """Test that ask() uses and updates the session history"""
+    print("\n=== Testing Chatbot Sessions ===\n")
+
+    documents = [
+        Document(page_content="Der Höchstsatz für Studierende beträgt 992 Euro im Monat.",
+                 metadata={'source': 'hoechstsatz.txt'}),
+        Document(page_content="Schülerinnen und Schüler erhalten BAföG als Zuschuss.",
+                 metadata={'source': 'schueler.txt'}),
+        Document(page_content="Die Rückzahlung beginnt fünf Jahre nach der Förderungshöchstdauer.",
+                 metadata={'source': 'rueckzahlung.txt'}),
+    ]
+    with tempfile.TemporaryDirectory() as persist_directory:
+        vectorstore = NumpyVectorStore.from_documents(documents, TermEmbeddings(),
+                                                      persist_directory=persist_directory)
+        store = ConversationStore()
+        chatbot = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity',
+                             conversation_store=store, api_key='key-one')
+        prompts = []
+        generate = chatbot._generate
+        chatbot._generate = lambda prompt: prompts.append(prompt) or generate(prompt)
+
+        first = chatbot.ask("Wie hoch ist der Höchstsatz für Studierende?", session_id="chat-1")
+        assert first['session_id'] == "chat-1" and "Bisheriges Gespräch" not in prompts[-1]
+        second = chatbot.ask("Und die Rückzahlung?", session_id="chat-1")
+        assert second['rewritten_query'].startswith("Wie hoch ist der Höchstsatz"), "Follow-up not rewritten"
+        assert "Bisheriges Gespräch" in prompts[-1] and "Höchstsatz" in prompts[-1].split("Frage:")[0]
+        print("✓ Follow-up rewritten and earlier turn included in the prompt")
+
+        other = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity',
+                           conversation_store=store, api_key='key-two')
+        other._generate = chatbot._generate
+        other.ask("Und die Rückzahlung?", session_id="chat-1")
+        assert "Bisheriges Gespräch" not in prompts[-1], "Session visible to another API key"
+        chatbot.ask("Was ist BAföG?")
+        assert "Bisheriges Gespräch" not in prompts[-1], "History used without a session_id"
+        print("✓ Sessions are scoped to the API key; no session_id means stateless")
+
+    print("\n=== Chatbot session tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_store()
+        test_query_rewriting()
+        test_chatbot_sessions()
+        print("\n✅ All conversation tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,116 @@
+"""
+Test script to verify the on-disk embedding cache (vectors.f32 + index.json)
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    """Deterministic 4-dimensional vectors; records every text it embeds"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        return [float(len(text)), float(sum(map(ord, text)) % 97), float(text.count(' ')), 1.0]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return self._vector(text)
+
+
+def test_document_cache():
+    """Test hits, misses, reopening and growing the memory-mapped vectors"""
+    print("=== Testing Document Embedding Cache ===\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "model-a", tmp_dir)
+        texts = ["BAföG ist eine Förderung.", "Der Antrag kommt zum Amt.", "BAföG ist eine Förderung."]
+        vectors = cache.embed_documents(texts)
+        assert model.embedded == texts[:2], "Duplicate text embedded twice"
+        assert vectors[0] == vectors[2] == model._vector(texts[0])
+        assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 1, cache.stats()
+        print("✓ Misses embedded once, duplicates within a batch reused")
+
+        assert cache.embed_documents(texts[:2]) == vectors[:2] and len(model.embedded) == 2
+        print("✓ Cached texts are not embedded again")
+
+        size = os.path.getsize(os.path.join(tmp_dir, "vectors.f32"))
+        assert size == 2 * 4 * 4, f"vectors.f32 is {size} bytes"
+        reopened = CachedEmbeddings(CountingEmbeddings(), "model-a", tmp_dir)
+        assert reopened.embed_documents(texts[:2]) == vectors[:2] and not reopened.embeddings.embedded
+        print("✓ A new instance reads the vectors from disk")
+
+        more = ["Die Altersgrenze liegt bei 45.", "Der Höchstsatz beträgt 992 Euro."]
+        grown = reopened.embed_documents(texts[:1] + more)
+        assert reopened.embeddings.embedded == more
+        assert os.path.getsize(os.path.join(tmp_dir, "vectors.f32")) == 4 * 4 * 4
+        assert reopened.stats()['stored_vectors'] == 4 and grown[1] == model._vector(more[0])
+        third = CachedEmbeddings(CountingEmbeddings(), "model-a", tmp_dir)
+        assert third.embed_documents(more + texts[:2]) == grown[1:] + vectors[:2]
+        assert not third.embeddings.embedded
+        print("✓ Appended vectors grow the memory map and survive another reopen")
+
+        other = CachedEmbeddings(CountingEmbeddings(), "model-b", tmp_dir)
+        other.embed_documents(texts[:1])
+        assert other.embeddings.embedded == texts[:1], "Vector of another model reused"
+        print("✓ Vectors are keyed by model name")
+
+    print("\n=== Document embedding cache tests passed! ===")
+    return True
+
+
+def test_query_cache():
+    """Test the in-memory query LRU"""
+    print("\n=== Testing Query Embedding Cache ===\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "model-a", tmp_dir, max_queries=2)
+        cache.embed_documents(["Was ist BAföG?"])
+        model.embedded.clear()
+        assert cache.embed_query("Was ist BAföG?") == model._vector("Was ist BAföG?") and not model.embedded
+        print("✓ Queries matching a stored document vector are hits")
+
+        for question in ["Frage A", "Frage B", "Frage A", "Frage C"]:
+            cache.embed_query(question)
+        assert model.embedded == ["Frage A", "Frage B", "Frage C"], model.embedded
+        assert cache.stats()['stored_vectors'] == 1
+        print("✓ Repeated queries reuse the LRU; queries are not written to disk")
+
+        cache.embed_query("Frage A")
+        cache.embed_query("Frage B")
+        assert model.embedded[-1] == "Frage B" and model.embedded.count("Frage A") == 1, model.embedded
+        assert cache.stats()['cached_queries'] == 2
+        print("✓ Least recently used query evicted at max_queries")
+
+        model.embedded.clear()
+        vectors = cache.embed_queries(["Frage B", "Frage D", "Frage E"])
+        assert model.embedded == ["Frage D", "Frage E"] and vectors[1] == model._vector("Frage D")
+        print("✓ embed_queries() computes only uncached queries, in one batch")
+
+    print("\n=== Query embedding cache tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_document_cache()
+        test_query_cache()
+        print("\n✅ All embedding cache tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
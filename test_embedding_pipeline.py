@@ -0,0 +1,103 @@
+"""
+Test script to verify batched, threaded document embedding
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.embedding_pipeline import BatchedEmbeddings
+
+
+class SlowEmbeddings:
+    """Embeds a text as [its number]; earlier batches take longer, so they finish last"""
+
+    def __init__(self):
+        self.batches = []
+        self.finished = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        first = int(texts[0].split()[-1])
+        time.sleep(0.05 / (1 + first))
+        with self._lock:
+            self.batches.append(len(texts))
+            self.finished.append(first)
+            self.threads.add(threading.get_ident())
+        return [[float(text.split()[-1])] for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.split()[-1])]
+
+
+def test_batch_order():
+    """Test that vectors come back in input order with one or several threads"""
+    print("=== Testing Batched Embeddings ===\n")
+
+    texts = [f"Abschnitt {i}" for i in range(23)]
+    expected = [[float(i)] for i in range(23)]
+    for threads in (1, 4):
+        model = SlowEmbeddings()
+        pipeline = BatchedEmbeddings(model, batch_size=5, threads=threads, show_progress=False)
+        assert pipeline.embed_documents(texts) == expected, f"Vectors out of order with {threads} threads"
+        assert sorted(model.batches) == [3, 5, 5, 5, 5], model.batches
+        if threads > 1:
+            assert model.finished != sorted(model.finished), "Batches did not overlap"
+        assert pipeline.stats['chunks'] == 23 and pipeline.throughput() > 0
+        print(f"✓ {threads} thread(s): 5 batches, vectors in input order "
+              f"({len(model.threads)} worker thread(s))")
+
+    model = SlowEmbeddings()
+    pipeline = BatchedEmbeddings(model, batch_size=4, threads=2, processes=4, show_progress=False)
+    assert pipeline.embed_documents(texts) == expected
+    print("✓ processes > 1 without a sentence-transformers model falls back to threads")
+
+    pipeline = BatchedEmbeddings(SlowEmbeddings(), show_progress=False)
+    assert pipeline.embed_documents([]) == [] and pipeline.throughput() is None
+    assert pipeline.embed_query("Frage 7") == [7.0]
+    print("✓ Empty input and queries pass through")
+
+    print("\n=== Batched embedding tests passed! ===")
+    return True
+
+
+def test_torch_threads_restored():
+    """Test that threaded embedding gives torch its thread count back, also after an error"""
+    print("\n=== Testing Torch Thread Count ===\n")
+
+    import torch
+    torch_threads = torch.get_num_threads()
+    try:
+        torch.set_num_threads(3)
+        texts = [f"Abschnitt {i}" for i in range(8)]
+        BatchedEmbeddings(SlowEmbeddings(), batch_size=2, threads=8, show_progress=False).embed_documents(texts)
+        assert torch.get_num_threads() == 3, f"Thread count left at {torch.get_num_threads()}"
+
+        failing = SlowEmbeddings()
+        failing.embed_documents = lambda batch: 1 / 0
+        try:
+            BatchedEmbeddings(failing, batch_size=2, threads=8, show_progress=False).embed_documents(texts)
+        except ZeroDivisionError:
+            pass
+        assert torch.get_num_threads() == 3, "Thread count not restored after an error"
+        print("✓ torch.set_num_threads() restored after embedding and after an error")
+    finally:
+        torch.set_num_threads(torch_threads)
+
+    print("\n=== Torch thread count tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_batch_order()
+        test_torch_threads_restored()
+        print("\n✅ All embedding pipeline tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
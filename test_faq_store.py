@@ -0,0 +1,118 @@
+"""
+Test script to verify the FAQ answer store and the ask() fast path
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.faq_store import FaqStore, extract_faq, extract_pairs
+from src.numpy_vectorstore import NumpyVectorStore
+from src.bm25_index import tokenize
+from src.metrics import Metrics
+from src.stub_llm import StubLLM
+from src.rag_chatbot import RAGChatbot
+
+
+class TermEmbeddings:
+    """Bag-of-terms vectors: texts sharing terms are similar"""
+
+    def __init__(self, size=512):
+        self.size = size
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for term in tokenize(text):
+            vector[sum(ord(c) * (i + 1) for i, c in enumerate(term)) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_extraction():
+    """Test Q&A extraction from the knowledge base"""
+    print("=== Testing FAQ Extraction ===\n")
+
+    text = "Gibt es eine Altersgrenze?\n\nGrundsätzlich bis 45.\n\nAusnahmen\n\nZweiter Bildungsweg.\n\nWie lange?\n\nBis zur Höchstdauer."
+    pairs = extract_pairs(text, "altersgrenze.txt", "https://example.org")
+    assert [p['question'] for p in pairs] == ["Gibt es eine Altersgrenze?", "Wie lange?"]
+    assert "Zweiter Bildungsweg." in pairs[0]['answer'], "Heading sections not part of the answer"
+    print("✓ Answers run up to the next question, including headed sections")
+
+    pairs = extract_faq("./knowledge_base")
+    questions = [p['question'] for p in pairs]
+    assert len(questions) == len(set(questions)) and len(pairs) >= 30, f"{len(pairs)} pairs"
+    faq_page = [p for p in pairs if p['source'].endswith("Fragen_und_Antworten.txt")]
+    assert len(faq_page) >= 15, "FAQ page pairs missing"
+    age = next(p for p in pairs if p['question'] == "Gibt es eine Altersgrenze?")
+    assert age['source'].endswith("gibt-es-eine-altersgrenze.txt"), "Teaser kept instead of the dedicated page"
+    print(f"✓ {len(pairs)} pairs, {len(faq_page)} from the FAQ page, dedicated pages preferred")
+
+    print("\n=== FAQ extraction tests passed! ===")
+    return True
+
+
+def test_fast_path():
+    """Test that matching questions skip retrieval and the LLM"""
+    print("\n=== Testing FAQ Fast Path ===\n")
+
+    embeddings = TermEmbeddings()
+    pairs = [
+        {'question': "Gibt es eine Altersgrenze?", 'answer': "Bis zum 45. Lebensjahr.",
+         'source': "knowledge_base/gibt-es-eine-altersgrenze.txt", 'url': "https://example.org/alter"},
+        {'question': "Wie hoch ist die Studienstarthilfe?", 'answer': "1.000 Euro.",
+         'source': "knowledge_base/studienstarthilfe.txt", 'url': "https://example.org/start"},
+    ]
+    store = FaqStore.build(pairs, embeddings)
+    store.threshold = 0.9
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "faq_store.json")
+        store.save(path, "term-model", "v1")
+        assert FaqStore.load(path, "other-model", "v1") is None, "Store used with another embedding model"
+        assert FaqStore.load(path, "term-model", "v2") is None, "Stale store used"
+        assert len(FaqStore.load(path, "term-model", "v1").pairs) == 2
+        print("✓ Store is refused for another embedding model or knowledge base version")
+
+        vectorstore = NumpyVectorStore.from_documents(
+            [Document(page_content="Das Semesterticket zahlt die Hochschule.", metadata={'source': 'ticket.txt'})],
+            embeddings, persist_directory=os.path.join(tmp_dir, "db"))
+        llm_calls = []
+        metrics = Metrics()
+        chatbot = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity',
+                             faq_store=store, metrics=metrics)
+        generate = chatbot._generate
+        chatbot._generate = lambda prompt: llm_calls.append(prompt) or generate(prompt)
+
+        result = chatbot.ask("gibt es eine Altersgrenze")
+        assert result['faq_match']['question'] == "Gibt es eine Altersgrenze?" and not llm_calls
+        assert result['answer'] == "Bis zum 45. Lebensjahr." and result['sources'][0].metadata['url'].endswith("alter")
+        assert 'retrieval' not in result['timings'] and result['token_usage'] is None
+        print(f"✓ FAQ question answered without retrieval or LLM ({result['timings']})")
+
+        result = chatbot.ask("Wer bezahlt das Semesterticket?")
+        assert 'faq_match' not in result and len(llm_calls) == 1, "Unrelated question answered from the FAQ"
+        assert metrics.get('bafog_faq_total', result='hit') == 1 and metrics.get('bafog_faq_total', result='miss') == 1
+        print("✓ Other questions go through retrieval and the LLM")
+
+    print("\n=== FAQ fast path tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_extraction()
+        test_fast_path()
+        print("\n✅ All FAQ store tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
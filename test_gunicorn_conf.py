@@ -0,0 +1,96 @@
+"""
+Test script to verify the gunicorn config: preloading settings and the gc.freeze() hook
+"""
+import gc
+import os
+import sys
+import runpy
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+CONFIG = str(Path(__file__).parent / "gunicorn.conf.py")
+ENVIRONMENT_KEYS = ('GUNICORN_PRELOAD', 'VECTOR_BACKEND', 'BACKGROUND_WARMUP', 'OMP_NUM_THREADS',
+                    'TOKENIZERS_PARALLELISM', 'ONNX_THREADS')
+
+
+class Log:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message, *args):
+        self.messages.append(message % args)
+
+
+class Arbiter:
+    """The parts of gunicorn's arbiter the when_ready hook uses"""
+
+    def __init__(self):
+        self.log = Log()
+
+
+def load_config(**environment):
+    """Evaluate gunicorn.conf.py with the given environment variables"""
+    for key in ENVIRONMENT_KEYS:
+        os.environ.pop(key, None)
+    os.environ.update(environment)
+    return runpy.run_path(CONFIG)
+
+
+def test_gunicorn_config():
+    """Test that preloading needs an explicit backend, warms up synchronously and freezes the heap"""
+    print("=== Testing Gunicorn Config ===\n")
+
+    saved = {key: os.environ.get(key) for key in ENVIRONMENT_KEYS}
+    try:
+        try:
+            load_config()
+            assert False, "Preloading started without VECTOR_BACKEND"
+        except RuntimeError as e:
+            assert "VECTOR_BACKEND" in str(e)
+        print("✓ Preloading without VECTOR_BACKEND is refused")
+
+        config = load_config(VECTOR_BACKEND='chroma')
+        assert config['preload_app'] is True
+        assert os.environ['VECTOR_BACKEND'] == 'chroma', "Backend switched by the config"
+        assert os.environ['BACKGROUND_WARMUP'] == 'false' and os.environ['OMP_NUM_THREADS'] == '1'
+        print("✓ An explicit backend is kept; warm-up runs synchronously in the parent")
+
+        config = load_config(VECTOR_BACKEND='numpy')
+        arbiter = Arbiter()
+        try:
+            config['when_ready'](arbiter)
+            frozen = gc.get_freeze_count()
+        finally:
+            gc.unfreeze()
+        assert frozen > 0, "Nothing frozen"
+        assert str(frozen) in arbiter.log.messages[0], arbiter.log.messages
+        print(f"✓ when_ready froze {frozen} objects")
+
+        config = load_config(GUNICORN_PRELOAD='false')
+        assert config['preload_app'] is False
+        assert 'VECTOR_BACKEND' not in os.environ and 'BACKGROUND_WARMUP' not in os.environ
+        arbiter = Arbiter()
+        config['when_ready'](arbiter)
+        assert gc.get_freeze_count() == 0 and not arbiter.log.messages
+        print("✓ Without preloading nothing is required or frozen")
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    print("\n=== Gunicorn config tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_gunicorn_config()
+        print("\n✅ All gunicorn config tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
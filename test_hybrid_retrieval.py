@@ -0,0 +1,102 @@
+"""
+Test script to verify the BM25 index used by hybrid retrieval
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.bm25_index import BM25Index, tokenize
+
+SCRIPT_DIR = Path(__file__).parent
+
+
+def test_german_tokenization():
+    """Test umlaut normalization, stopwords and light stemming"""
+    print("=== Testing German Tokenization ===\n")
+
+    assert tokenize("Bedarfssätze") == tokenize("bedarfssaetze"), "Umlauts not normalized"
+    print("✓ Umlauts normalized")
+
+    tokens = tokenize("Was ist das Flexibilitätssemester?")
+    assert tokens == tokenize("Flexibilitätssemester") and len(tokens) == 1, f"Unexpected tokens: {tokens}"
+    print("✓ Stopwords and punctuation removed")
+
+    assert tokenize("Studierenden") == tokenize("Studierende"), "Inflections not stemmed"
+    print("✓ Inflection suffixes stemmed")
+
+    print("\n=== Tokenization tests passed! ===")
+    return True
+
+
+def test_bm25_search():
+    """Test that BM25 finds exact statutory terms"""
+    print("\n=== Testing BM25 Search ===\n")
+
+    texts = [
+        "Das Flexibilitätssemester verlängert die Förderungshöchstdauer um ein Semester.",
+        "Die Bedarfssätze für Studierende steigen zum Wintersemester.",
+        "BAföG wird zur Hälfte als Zuschuss und zur Hälfte als Darlehen gezahlt.",
+    ]
+    index = BM25Index().build(
+        ids=["a", "b", "c"],
+        texts=texts,
+        metadatas=[{"source": f"{name}.txt"} for name in "abc"]
+    )
+
+    results = index.search("Was bedeutet das Flexibilitätssemester?", k=2)
+    assert results and results[0][0] == 0, f"Unexpected results: {results}"
+    print("✓ 'Flexibilitätssemester' found")
+
+    results = index.search("Wie hoch sind die Bedarfssaetze?", k=2)
+    assert results and results[0][0] == 1, f"Unexpected results: {results}"
+    print("✓ 'Bedarfssaetze' matches 'Bedarfssätze'")
+
+    assert index.search("Wetter morgen", k=2) == [], "Unrelated query matched"
+    print("✓ Unrelated query returns nothing")
+
+    print("\n=== BM25 search tests passed! ===")
+    return True
+
+
+def test_bm25_latency():
+    """Test that lexical search over the knowledge base stays well under a millisecond"""
+    print("\n=== Testing BM25 Latency ===\n")
+
+    texts = []
+    for path in sorted((SCRIPT_DIR / "knowledge_base").glob("*.txt")):
+        content = path.read_text(encoding="utf-8")
+        texts.extend(content[i:i + 1000] for i in range(0, len(content), 900))
+
+    index = BM25Index().build(
+        ids=[str(i) for i in range(len(texts))],
+        texts=texts,
+        metadatas=[{} for _ in texts]
+    )
+
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        index.search("Gibt es eine Altersgrenze für BAföG?", k=10)
+    per_query_ms = (time.perf_counter() - start) / runs * 1000
+
+    print(f"  {len(texts)} chunks, {per_query_ms:.3f} ms per query")
+    assert per_query_ms < 1.0, f"BM25 search too slow: {per_query_ms:.3f} ms"
+    print("✓ Lexical search under 1 ms")
+
+    print("\n=== BM25 latency tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_german_tokenization()
+        test_bm25_search()
+        test_bm25_latency()
+        print("\n✅ All hybrid retrieval tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,204 @@
+"""
+Test script to verify incremental knowledge base sync (manifest, file hashes, chunk IDs)
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+import src.knowledge_base_loader as knowledge_base_loader
+from src.knowledge_base_loader import KnowledgeBaseLoader
+from src.bm25_index import tokenize
+
+
+class StubHuggingFaceEmbeddings:
+    """Bag-of-terms vectors in place of the sentence-transformers model (no download)"""
+
+    def __init__(self, model_name=None, encode_kwargs=None, size=64):
+        self.size = size
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for term in tokenize(text):
+            vector[sum(ord(c) * (i + 1) for i, c in enumerate(term)) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+FILES = {
+    'altersgrenze.txt': "Gibt es eine Altersgrenze?\n\nGrundsätzlich bis zum 45. Lebensjahr.",
+    'hoechstsatz.txt': "Wie hoch ist der Höchstsatz?\n\nDer Höchstsatz beträgt 992 Euro im Monat.",
+    'antrag.txt': "Wo stelle ich den Antrag?\n\nBeim Amt für Ausbildungsförderung.",
+}
+
+
+def write_files(kb_path, files):
+    for name, text in files.items():
+        Path(kb_path, name).write_text(text, encoding='utf-8')
+
+
+def make_loader(kb_path, db_path, backend, **options):
+    return KnowledgeBaseLoader(knowledge_base_path=kb_path, persist_directory=db_path,
+                               embedding_cache_dir='', vector_backend=backend, **options)
+
+
+def stored_ids(loader):
+    return set(loader.open_vector_store().get()['ids'])
+
+
+def manifest_ids(loader):
+    manifest = loader.load_manifest()
+    return {key: entry['chunk_ids'] for key, entry in manifest['files'].items()}
+
+
+def check_backend(backend):
+    print(f"--- {backend} ---")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kb_path = os.path.join(tmp_dir, "knowledge_base")
+        db_path = os.path.join(tmp_dir, "db")
+        os.makedirs(kb_path)
+        write_files(kb_path, FILES)
+
+        loader = make_loader(kb_path, db_path, backend)
+        summary = loader.sync()
+        assert summary == {'added': 3, 'changed': 0, 'removed': 0}, summary
+        first = manifest_ids(loader)
+        assert set(first) == set(FILES) and all(first.values()), first
+        assert stored_ids(loader) == {i for ids in first.values() for i in ids}
+        print(f"✓ First sync indexes all files ({len(stored_ids(loader))} chunks)")
+
+        loader = make_loader(kb_path, db_path, backend)
+        summary = loader.sync()
+        assert summary == {'added': 0, 'changed': 0, 'removed': 0}, summary
+        assert manifest_ids(loader) == first
+        print("✓ Unchanged files are not re-indexed")
+
+        Path(kb_path, 'hoechstsatz.txt').write_text(
+            "Wie hoch ist der Höchstsatz?\n\nDer Höchstsatz beträgt 855 Euro im Monat.", encoding='utf-8')
+        os.remove(os.path.join(kb_path, 'antrag.txt'))
+        write_files(kb_path, {'darlehen.txt': "Muss ich BAföG zurückzahlen?\n\nDie Hälfte ist ein Darlehen."})
+        version = loader.version
+        summary = loader.sync()
+        assert summary == {'added': 1, 'changed': 1, 'removed': 1}, summary
+        assert loader.version != version, "Version unchanged after sync"
+
+        second = manifest_ids(loader)
+        assert second['altersgrenze.txt'] == first['altersgrenze.txt'], "IDs of an unchanged file changed"
+        assert second['hoechstsatz.txt'] != first['hoechstsatz.txt'], "Changed file kept its old chunk IDs"
+        assert 'antrag.txt' not in second and 'darlehen.txt' in second
+        ids = stored_ids(loader)
+        assert ids == {i for chunk_ids in second.values() for i in chunk_ids}, "Store and manifest disagree"
+        assert not ids & set(first['antrag.txt'] + first['hoechstsatz.txt']), "Stale chunks left in the store"
+        print("✓ Added, changed and removed files handled; unchanged chunk IDs stable")
+
+        results = loader.open_vector_store().similarity_search("Höchstsatz 855 Euro", k=1)
+        assert "855" in results[0].page_content, results
+        assert any('855' in text for text in loader.lexical_index.texts), "BM25 index not rebuilt"
+        print("✓ Changed text is searchable in the vector store and the BM25 index")
+
+        resplit = loader.chunk_ids(loader.split_documents(loader.load_documents()))
+        assert set(resplit) == ids, "Chunk IDs not reproducible"
+        print("✓ Re-splitting the same files gives the same chunk IDs")
+
+        version = loader.version
+        loader = make_loader(kb_path, db_path, backend, chunking_strategy='recursive', chunk_size=40,
+                             chunk_overlap=0)
+        assert loader.get_version() == version, "Version follows settings the store was not indexed with"
+        summary = loader.sync()
+        assert summary == {'added': 3, 'changed': 0, 'removed': 0}, "Other chunking settings not re-indexed"
+        assert loader.version != version, "Version unchanged after re-chunking"
+        chunking = loader.load_manifest()['chunking']
+        assert chunking == {'strategy': 'recursive', 'chunk_size': 40, 'chunk_overlap': 0}, chunking
+        ids = stored_ids(loader)
+        assert len(ids) > 3 and ids == {i for chunk_ids in manifest_ids(loader).values() for i in chunk_ids}
+        assert loader.sync() == {'added': 0, 'changed': 0, 'removed': 0}
+        print(f"✓ Changed chunking settings re-index every file ({len(ids)} chunks) and change the version")
+
+        manifest = loader.load_manifest()
+        manifest['embedding'] = 'another-model'
+        loader.save_manifest(manifest)
+        assert loader.get_version() != loader.version, "Version ignores the embedding model"
+        del manifest['chunking']
+        loader.save_manifest(manifest)
+        assert loader.sync()['added'] == 3, "Manifest without chunking settings trusted"
+        print("✓ Manifests without chunking settings trigger a full re-index")
+
+
+def test_backend_folders():
+    """Test that both backends can share a persist directory and foreign manifests are re-indexed"""
+    print("\n=== Testing Backend Folders ===\n")
+
+    original = knowledge_base_loader.HuggingFaceEmbeddings
+    knowledge_base_loader.HuggingFaceEmbeddings = StubHuggingFaceEmbeddings
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            kb_path = os.path.join(tmp_dir, "knowledge_base")
+            db_path = os.path.join(tmp_dir, "db")
+            os.makedirs(kb_path)
+            write_files(kb_path, FILES)
+
+            numpy_loader = make_loader(kb_path, db_path, "numpy")
+            numpy_loader.setup()
+            chroma_loader = make_loader(kb_path, db_path, "chroma")
+            assert not chroma_loader._store_exists(), "Numpy files taken for a Chroma store"
+            chroma_loader.setup()
+            assert os.path.exists(os.path.join(db_path, "chroma.sqlite3"))
+            assert numpy_loader.store_directory == os.path.join(db_path, "numpy")
+
+            for backend in ("numpy", "chroma"):
+                loader = make_loader(kb_path, db_path, backend)
+                assert loader.load_manifest()['backend'] == backend
+                assert stored_ids(loader) == {i for ids in manifest_ids(loader).values() for i in ids}
+                assert loader.sync() == {'added': 0, 'changed': 0, 'removed': 0}, backend
+            print("✓ numpy and chroma stores share a persist directory, each with its own manifest")
+
+            manifest = chroma_loader.load_manifest()
+            manifest['backend'] = 'numpy'
+            manifest['files'] = {}
+            chroma_loader.save_manifest(manifest)
+            loader = make_loader(kb_path, db_path, "chroma")
+            vectorstore = loader.setup()
+            assert loader.load_manifest()['backend'] == 'chroma'
+            assert set(manifest_ids(loader)) == set(FILES)
+            assert set(vectorstore.get()['ids']) == {i for ids in manifest_ids(loader).values() for i in ids}
+            print("✓ A manifest of the other backend triggers a full re-index on load")
+    finally:
+        knowledge_base_loader.HuggingFaceEmbeddings = original
+
+    print("\n=== Backend folder tests passed! ===")
+    return True
+
+
+def test_incremental_sync():
+    """Test sync() on both vector store backends with a stub embedding model"""
+    print("=== Testing Incremental Sync ===\n")
+
+    original = knowledge_base_loader.HuggingFaceEmbeddings
+    knowledge_base_loader.HuggingFaceEmbeddings = StubHuggingFaceEmbeddings
+    try:
+        for backend in ("numpy", "chroma"):
+            check_backend(backend)
+    finally:
+        knowledge_base_loader.HuggingFaceEmbeddings = original
+
+    print("\n=== Incremental sync tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_incremental_sync()
+        test_backend_folders()
+        print("\n✅ All sync tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Test script to verify timing spans, histograms and the Prometheus text format
+"""
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from src.metrics import Metrics, Histogram, span
+
+
+def test_span():
+    """Test that span() records durations in timings and the stage histogram"""
+    print("=== Testing Spans ===\n")
+
+    metrics = Metrics()
+    timings = {}
+    with span('retrieval', timings, metrics):
+        time.sleep(0.02)
+    assert 0.02 <= timings['retrieval'] < 0.5, timings
+    histogram = metrics._histograms[('bafog_stage_duration_seconds', (('stage', 'retrieval'),))]
+    assert histogram.count == 1 and abs(histogram.sum - timings['retrieval']) < 0.001
+    print(f"✓ Duration stored in timings and the stage histogram ({timings['retrieval']}s)")
+
+    try:
+        with span('llm', timings, metrics):
+            raise ValueError("provider down")
+    except ValueError:
+        pass
+    assert 'llm' in timings, "Failed block not timed"
+    with span('prompt'):
+        pass
+    print("✓ Blocks that raise are timed; timings and metrics are optional")
+
+    print("\n=== Span tests passed! ===")
+    return True
+
+
+def test_histogram():
+    """Test cumulative bucket counts, sum and count"""
+    print("\n=== Testing Histogram ===\n")
+
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 3.0, 30.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 3, 4], histogram.counts
+    assert histogram.count == 5 and abs(histogram.sum - 33.65) < 1e-9
+    print("✓ Buckets are cumulative and include their upper bound; values above all bounds only count")
+
+    print("\n=== Histogram tests passed! ===")
+    return True
+
+
+def test_render():
+    """Test the Prometheus text exposition format"""
+    print("\n=== Testing Rendering ===\n")
+
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.record_request('/chat', 0.5)
+    metrics.record_request('/chat', 0.05, error=True)
+    metrics.inc('bafog_faq_total', result='hit')
+    metrics.inc('custom_total', note='say "hi"\nback\\slash')
+    lines = metrics.render().splitlines()
+
+    assert lines[:2] == ["# HELP bafog_faq_total FAQ answer lookups by result",
+                         "# TYPE bafog_faq_total counter"], lines[:2]
+    assert 'bafog_faq_total{result="hit"} 1' in lines
+    assert lines.count("# TYPE bafog_requests_total counter") == 1, "Metric described twice"
+    assert 'bafog_requests_total{endpoint="/chat",status="error"} 1' in lines
+    assert 'bafog_requests_total{endpoint="/chat",status="ok"} 1' in lines
+    print("✓ Counters with HELP/TYPE once per metric and sorted labels")
+
+    assert 'custom_total{note="say \\"hi\\"\\nback\\\\slash"} 1' in lines, lines
+    assert not any(line.startswith("# HELP custom_total") for line in lines)
+    print("✓ Label values escaped; metrics without a description have no HELP line")
+
+    assert "# TYPE bafog_request_duration_seconds histogram" in lines
+    assert 'bafog_request_duration_seconds_bucket{endpoint="/chat",le="0.1"} 1' in lines
+    assert 'bafog_request_duration_seconds_bucket{endpoint="/chat",le="1.0"} 2' in lines
+    assert 'bafog_request_duration_seconds_bucket{endpoint="/chat",le="+Inf"} 2' in lines
+    assert 'bafog_request_duration_seconds_sum{endpoint="/chat"} 0.550000' in lines
+    assert 'bafog_request_duration_seconds_count{endpoint="/chat"} 2' in lines
+    print("✓ Histograms rendered as _bucket (with +Inf), _sum and _count")
+
+    print("\n=== Rendering tests passed! ===")
+    return True
+
+
+def test_concurrent_updates():
+    """Test that counters and histograms lose no updates across threads"""
+    print("\n=== Testing Concurrent Updates ===\n")
+
+    metrics = Metrics()
+
+    def work():
+        for _ in range(1000):
+            metrics.inc('bafog_answer_cache_total', result='miss')
+            metrics.observe('bafog_stage_duration_seconds', 0.001, stage='embedding')
+            metrics.get('bafog_answer_cache_total', result='miss')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.get('bafog_answer_cache_total', result='miss') == 8000
+    assert metrics.get('bafog_answer_cache_total', result='hit') == 0
+    assert 'bafog_stage_duration_seconds_count{stage="embedding"} 8000' in metrics.render().splitlines()
+    print("✓ 8 threads x 1000 updates counted exactly")
+
+    print("\n=== Concurrent update tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_span()
+        test_histogram()
+        test_render()
+        test_concurrent_updates()
+        print("\n✅ All metrics tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,88 @@
+"""
+Test script to verify the memory-mapped NumPy vector store backend
+"""
+import sys
+import hashlib
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.numpy_vectorstore import NumpyVectorStore
+
+
+class HashEmbeddings:
+    """Deterministic random vectors per text, so identical texts match exactly"""
+
+    def _vector(self, text):
+        seed = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=64).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+DOCUMENTS = [
+    Document(page_content=f"Abschnitt {i} über BAföG", metadata={'source': f"datei{i % 4}.txt"})
+    for i in range(40)
+]
+IDS = [f"chunk-{i}" for i in range(40)]
+
+
+def check_store(quantize):
+    label = "int8" if quantize else "float32"
+    with tempfile.TemporaryDirectory() as persist_directory:
+        store = NumpyVectorStore.from_documents(
+            DOCUMENTS, HashEmbeddings(), ids=IDS, persist_directory=persist_directory, quantize=quantize
+        )
+        assert isinstance(store.vectors, np.memmap) and store.vectors.dtype == np.dtype(label), \
+            f"Matrix not memory-mapped as {label}"
+
+        results = store.similarity_search("Abschnitt 7 über BAföG", k=3)
+        assert len(results) == 3 and results[0].page_content == "Abschnitt 7 über BAföG", \
+            f"Exact match not ranked first: {results}"
+        assert results[0].metadata['source'] == "datei3.txt", "Metadata not returned"
+        print(f"✓ {label}: exact top-k with metadata")
+
+        retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": 2})
+        assert retriever.get_relevant_documents("Abschnitt 9 über BAföG")[0].page_content.startswith("Abschnitt 9 ")
+        batch = store.similarity_search_by_vectors(HashEmbeddings().embed_documents(
+            ["Abschnitt 1 über BAföG", "Abschnitt 2 über BAföG"]), k=2)
+        assert [docs[0].page_content for docs in batch] == ["Abschnitt 1 über BAföG", "Abschnitt 2 über BAföG"]
+        print(f"✓ {label}: as_retriever() and batched search")
+
+        store.delete(ids=["chunk-7"])
+        store.add_documents([Document(page_content="Neuer Abschnitt", metadata={})], ids=["chunk-new"])
+        reopened = NumpyVectorStore(persist_directory, HashEmbeddings())
+        assert len(reopened.get()['ids']) == 40 and "chunk-7" not in reopened.ids, "Changes not persisted"
+        assert reopened.quantize == quantize, "Stored dtype not restored"
+        assert reopened.similarity_search("Neuer Abschnitt", k=1)[0].page_content == "Neuer Abschnitt"
+        print(f"✓ {label}: delete/add persisted and reopened")
+
+
+def test_numpy_vectorstore():
+    """Test search, retriever compatibility and persistence for both storage types"""
+    print("=== Testing NumPy Vector Store ===\n")
+
+    check_store(quantize=False)
+    check_store(quantize=True)
+
+    print("\n=== NumPy vector store tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_numpy_vectorstore()
+        print("\n✅ All vector store tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
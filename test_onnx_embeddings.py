@@ -0,0 +1,103 @@
+"""
+Test script to verify the ONNX embedding backend against PyTorch
+Exports the model to a temporary directory unless ONNX_MODEL_DIR already
+contains an export. Skipped when onnxruntime, the model download or the
+export is unavailable.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+import numpy as np
+import pytest
+from sentence_transformers import SentenceTransformer
+from src.onnx_embeddings import OnnxEmbeddings, MODEL_FILE, QUANTIZED_MODEL_FILE, cosine_similarities
+from src.chunking import StructuredSplitter
+from src.knowledge_base_loader import EMBEDDING_MODEL
+from evaluate import load_cases
+from export_onnx_model import export, quantize
+from langchain.schema import Document
+
+# Minimum cosine similarity of every ONNX vector with its PyTorch vector
+MIN_SIMILARITY = {'float32': 0.999, 'int8': 0.98}
+# Minimum cosine similarity of a query embedded alone with the same text embedded in a
+# batch; int8 activations are quantized with ranges taken over the whole batch
+MIN_QUERY_SIMILARITY = {'float32': 0.99999, 'int8': 0.995}
+
+
+def parity_texts(limit=200):
+    """Evaluation questions and knowledge base chunks"""
+    questions = [case['question'] for case in load_cases("evaluation.csv")]
+    documents = [Document(page_content=path.read_text(encoding='utf-8'), metadata={'source': str(path)})
+                 for path in sorted(Path("knowledge_base").glob("*.txt"))]
+    chunks = [chunk.page_content for chunk in StructuredSplitter().split_documents(documents)]
+    return questions, chunks[:limit]
+
+
+def check_variant(model, model_dir, quantized, questions, chunks):
+    variant = 'int8' if quantized else 'float32'
+    onnx = OnnxEmbeddings(model_dir, quantized=quantized)
+    texts = questions + chunks
+    reference = model.encode(texts, batch_size=32)
+    candidate = onnx.embed_documents(texts)
+    similarities = cosine_similarities(reference, candidate)
+    assert similarities.min() >= MIN_SIMILARITY[variant], \
+        f"{variant}: min cosine similarity {similarities.min():.5f} < {MIN_SIMILARITY[variant]}"
+    query_similarity = cosine_similarities([onnx.embed_query(questions[0])], candidate[:1]).min()
+    assert query_similarity >= MIN_QUERY_SIMILARITY[variant], \
+        f"{variant}: query and batch vectors differ (cosine similarity {query_similarity:.5f})"
+
+    # The nearest chunk for each question should not change
+    def nearest(vectors):
+        vectors = np.asarray(vectors)
+        return (vectors[:len(questions)] @ vectors[len(questions):].T).argmax(axis=1)
+    agreement = float((nearest(reference) == nearest(candidate)).mean())
+    assert agreement >= 0.9, f"{variant}: top-1 chunk agrees for only {agreement:.0%} of the questions"
+    print(f"✓ {variant}: min cosine similarity {similarities.min():.5f}, "
+          f"top-1 chunk agreement {agreement:.0%} ({len(texts)} texts)")
+
+
+def load_model(model_dir, tmp_dir):
+    """The PyTorch model and a directory with its ONNX export; skips the test if either is unavailable"""
+    pytest.importorskip("onnxruntime")
+    try:
+        if os.path.exists(os.path.join(model_dir, MODEL_FILE)):
+            return SentenceTransformer(OnnxEmbeddings(model_dir).config['model_name'], device='cpu'), model_dir
+        model = export(EMBEDDING_MODEL, tmp_dir, opset=14)
+        quantize(tmp_dir)
+        return model, tmp_dir
+    except (OSError, ImportError, RuntimeError) as e:
+        pytest.skip(f"ONNX model not available: {e}")
+
+
+def test_onnx_parity():
+    print("=== Testing ONNX Embedding Parity ===\n")
+    questions, chunks = parity_texts()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model, model_dir = load_model(os.getenv("ONNX_MODEL_DIR", "./onnx_model"), tmp_dir)
+
+        check_variant(model, model_dir, False, questions, chunks)
+        if os.path.exists(os.path.join(model_dir, QUANTIZED_MODEL_FILE)):
+            check_variant(model, model_dir, True, questions, chunks)
+        else:
+            print("(no int8 model, skipped)")
+
+    print("\n=== ONNX parity tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_onnx_parity()
+        print("\n✅ All ONNX embedding tests passed!")
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,148 @@
+"""
+Test script to verify cross-encoder reranking and its time budget
+"""
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.reranker import Reranker
+from src.retrieval_cache import RetrievalCache
+from src.numpy_vectorstore import NumpyVectorStore
+from src.bm25_index import tokenize
+from src.metrics import Metrics
+from src.stub_llm import StubLLM
+from src.rag_chatbot import RAGChatbot
+
+
+class TermEmbeddings:
+    """Bag-of-terms vectors: texts sharing terms are similar"""
+
+    def __init__(self, size=512):
+        self.size = size
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for term in tokenize(text):
+            vector[sum(ord(c) * (i + 1) for i, c in enumerate(term)) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class KeywordCrossEncoder:
+    """Stands in for a CrossEncoder: scores a pair by how often the keyword occurs in the passage"""
+
+    def __init__(self, keyword, delay=0.0):
+        self.keyword = keyword
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=None):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return [passage.lower().count(self.keyword) for _, passage in pairs]
+
+
+def make_documents():
+    return [
+        Document(page_content="Allgemeines zum BAföG.", metadata={'source': 'a.txt'}),
+        Document(page_content="Der Antrag wird beim Amt gestellt.", metadata={'source': 'b.txt'}),
+        Document(page_content="Die Altersgrenze liegt bei 45 Jahren. Ausnahmen zur Altersgrenze gibt es.",
+                 metadata={'source': 'c.txt'}),
+        Document(page_content="Zur Altersgrenze siehe unten.", metadata={'source': 'd.txt'}),
+        Document(page_content="Der Höchstsatz beträgt 992 Euro.", metadata={'source': 'e.txt'}),
+    ]
+
+
+def test_rerank():
+    """Test reordering, batching and the budget fallback"""
+    print("=== Testing Reranker ===\n")
+
+    documents = make_documents()
+    model = KeywordCrossEncoder("altersgrenze")
+    reranker = Reranker(model=model, fetch_k=5, batch_size=2, time_budget=10.0)
+    reranked, ok = reranker.rerank("Gibt es eine Altersgrenze?", documents, 2)
+    assert ok and [doc.metadata['source'] for doc in reranked] == ['c.txt', 'd.txt'], reranked
+    assert model.batches == [2, 2, 1], f"Unexpected batches {model.batches}"
+    print("✓ Candidates rescored in batches of 2, best two kept")
+
+    reranked, _ = reranker.rerank("Wie hoch ist der Höchstsatz?", documents, 3)
+    assert [doc.metadata['source'] for doc in reranked] == ['c.txt', 'd.txt', 'a.txt'], "Ties not in input order"
+    print("✓ Equal scores keep the bi-encoder order")
+
+    slow = KeywordCrossEncoder("altersgrenze", delay=0.05)
+    reranker = Reranker(model=slow, fetch_k=5, batch_size=2, time_budget=0.01)
+    reranked, ok = reranker.rerank("Gibt es eine Altersgrenze?", documents, 2)
+    assert not ok and reranked == documents[:2], "Budget overrun did not fall back to the input order"
+    assert slow.batches == [2], "Batches scored after the budget ran out"
+    stats = reranker.stats()
+    assert stats['fallbacks'] == 1 and stats['reranked'] == 0 and stats['mean_ms'] >= 50
+    print(f"✓ Over budget: first 2 candidates returned after one batch ({stats['mean_ms']} ms)")
+
+    print("\n=== Reranker tests passed! ===")
+    return True
+
+
+def test_chatbot_integration():
+    """Test over-fetching and caching of reranked results in the chatbot"""
+    print("\n=== Testing Reranking in the Chatbot ===\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = NumpyVectorStore.from_documents(make_documents(), TermEmbeddings(),
+                                                      persist_directory=os.path.join(tmp_dir, "db"))
+        model = KeywordCrossEncoder("altersgrenze")
+        reranker = Reranker(model=model, fetch_k=4, batch_size=8, time_budget=10.0)
+        cache = RetrievalCache()
+        metrics = Metrics()
+        chatbot = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity',
+                             reranker=reranker, retrieval_cache=cache, metrics=metrics)
+
+        result = chatbot.ask("Altersgrenze beim BAföG Antrag")
+        assert model.batches == [4], f"Cross-encoder saw {model.batches} candidates, expected fetch_k=4"
+        assert [doc.metadata['source'] for doc in result['sources']] == ['c.txt']
+        assert metrics.get('bafog_rerank_total', result='reranked') == 1
+        print("✓ 4 candidates over-fetched, reranked down to k=1")
+
+        plain = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity', retrieval_cache=cache)
+        plain.retrieve("Altersgrenze beim BAföG Antrag")
+        assert cache.hits['retrieval'] == 0, "Reranked documents served to a chatbot without reranking"
+        chatbot.retrieve("Altersgrenze beim BAföG Antrag")
+        assert cache.hits['retrieval'] == 1 and model.batches == [4], "Reranked result not cached"
+        print("✓ Reranked results cached separately from plain top-k results")
+
+        reranker.time_budget = 0.0
+        model.delay = 0.01
+        reranker.batch_size = 2
+        chatbot.retrieve("Wo stelle ich den Antrag?")
+        chatbot.retrieve("Wo stelle ich den Antrag?")
+        assert metrics.get('bafog_rerank_total', result='fallback') == 2, "Fallback result was cached"
+        print("✓ Budget fallbacks are not cached")
+
+        questions = ["Altersgrenze?", "Höchstsatz?"]
+        batch = chatbot.retrieve_batch(questions, chatbot.embed_questions(questions))
+        assert [len(documents) for documents in batch] == [1, 1]
+        print("✓ Batch retrieval reranks every question")
+
+    print("\n=== Chatbot reranking tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_rerank()
+        test_chatbot_integration()
+        print("\n✅ All reranker tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,123 @@
+"""
+Test script to verify the retrieval cache
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from src.retrieval_cache import RetrievalCache, normalize_query
+from src.numpy_vectorstore import NumpyVectorStore
+from src.bm25_index import tokenize
+from src.metrics import Metrics
+from src.stub_llm import StubLLM
+from src.rag_chatbot import RAGChatbot
+
+
+class CountingEmbeddings:
+    """Bag-of-terms vectors that count query embeddings"""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.queries = 0
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for term in tokenize(text):
+            vector[sum(ord(c) for c in term) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self._vector(text)
+
+
+def test_cache():
+    """Test key normalization, LRU eviction and version invalidation"""
+    print("=== Testing Retrieval Cache ===\n")
+
+    assert normalize_query("  Was ist BAföG?? ") == normalize_query("was ist bafög")
+    assert normalize_query("Was ist BAföG?") != normalize_query("Was ist kein BAföG?")
+    print("✓ Case, umlauts, punctuation and spacing are normalized")
+
+    cache = RetrievalCache(max_entries=2)
+    cache.set_version("v1")
+    for question in ("eins", "zwei", "drei"):
+        cache.put_embedding(question, [1.0])
+    assert cache.get_embedding("eins") is None and cache.get_embedding("drei") == [1.0]
+    print("✓ Least recently used question evicted")
+
+    cache.put_documents("drei", "similarity", 3, [Document(page_content="x")])
+    assert cache.get_documents("drei", "similarity", 5) is None, "Documents shared across k"
+    cache.set_version("v2")
+    assert cache.get_embedding("drei") is None, "Entry survived a knowledge base version change"
+    stats = cache.stats()
+    assert stats['kb_version'] == "v2" and stats['embedding']['hits'] == 1, stats
+    print(f"✓ New knowledge base version empties the cache ({stats['embedding']})")
+
+    print("\n=== Retrieval cache tests passed! ===")
+    return True
+
+
+def test_chatbot():
+    """Test that repeated questions skip embedding and search in ask()"""
+    print("\n=== Testing Chatbot Retrieval Cache ===\n")
+
+    documents = [
+        Document(page_content="Der Höchstsatz beträgt 992 Euro im Monat.", metadata={'source': 'a.txt'}),
+        Document(page_content="Die Rückzahlung beginnt fünf Jahre später.", metadata={'source': 'b.txt'}),
+    ]
+    with tempfile.TemporaryDirectory() as persist_directory:
+        embeddings = CountingEmbeddings()
+        vectorstore = NumpyVectorStore.from_documents(documents, embeddings, persist_directory=persist_directory)
+        cache = RetrievalCache()
+        metrics = Metrics()
+        chatbot = RAGChatbot(vectorstore, llm=StubLLM(), k=1, retrieval_mode='similarity',
+                             retrieval_cache=cache, metrics=metrics)
+        searches = []
+        search = vectorstore.similarity_search_by_vector
+        vectorstore.similarity_search_by_vector = lambda *args, **kwargs: searches.append(1) or search(*args, **kwargs)
+
+        first = chatbot.ask("Wie hoch ist der Höchstsatz?")
+        second = chatbot.ask("wie hoch ist der höchstsatz")
+        assert embeddings.queries == 1 and len(searches) == 1, "Repeated question embedded or searched again"
+        assert [d.page_content for d in first['sources']] == [d.page_content for d in second['sources']]
+        assert metrics.get('bafog_retrieval_cache_total', stage='retrieval', result='hit') == 1
+        print("✓ Repeated question reused the embedding and the top-k documents")
+
+        chatbot.embed_questions(["Wie hoch ist der Höchstsatz?", "Wann beginnt die Rückzahlung?"])
+        assert embeddings.queries == 1, "Batch embedded a cached question"
+        print(f"✓ Batch embedding skips cached questions ({cache.stats()['embedding']})")
+
+        batches = []
+        search_batch = vectorstore.similarity_search_by_vectors
+        vectorstore.similarity_search_by_vectors = lambda vectors, **kwargs: batches.append(len(vectors)) or \
+            search_batch(vectors, **kwargs)
+        questions = ["Wie hoch ist der Höchstsatz?", "Wann beginnt die Rückzahlung?"]
+        results = chatbot.retrieve_batch(questions, chatbot.embed_questions(questions))
+        assert batches == [1], f"Batch searched cached questions ({batches})"
+        assert results[0][0].page_content == first['sources'][0].page_content
+        assert "Rückzahlung" in results[1][0].page_content
+        again = chatbot.retrieve_batch(questions, chatbot.embed_questions(questions))
+        assert batches == [1] and [r[0].page_content for r in again] == [r[0].page_content for r in results]
+        print("✓ Batch retrieval answers cached questions from the cache and searches the rest together")
+
+    print("\n=== Chatbot retrieval cache tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_cache()
+        test_chatbot()
+        print("\n✅ All retrieval cache tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
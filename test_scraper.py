@@ -0,0 +1,125 @@
+"""
+Test script to verify the concurrent scraper against a local HTTP fixture server
+"""
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(str(Path(__file__).parent))
+
+from scraper import WebScraper
+
+PAGES = {
+    '/bafoeg/altersgrenze.html': '<html><body><nav>Menü</nav><p>Die Altersgrenze liegt bei 45 Jahren.</p></body></html>',
+    '/bafoeg/ausland.html': '<html><body><p>BAföG gibt es auch im Ausland.</p></body></html>',
+    '/bafoeg/rueckzahlung.html': '<html><body><p>Die Hälfte ist ein Zuschuss.</p></body></html>',
+}
+# Served without ETag/Last-Modified: only the content hash detects changes
+NO_VALIDATORS = {'/bafoeg/rueckzahlung.html'}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        cls = FixtureHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(0.05)
+            body = PAGES.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            etag = '"' + hashlib.md5(body.encode('utf-8')).hexdigest() + '"'
+            conditional = self.headers.get('If-None-Match')
+            cls.requests.append((self.path, conditional))
+
+            if self.path not in NO_VALIDATORS and conditional == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            if self.path not in NO_VALIDATORS:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+def test_scraper():
+    """Test conditional requests, change detection and per-host limits"""
+    print("=== Testing Concurrent Scraper ===\n")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [base_url + path for path in PAGES] + [base_url + '/missing.html']
+
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            scraper = WebScraper(output_dir, max_workers=8, per_host_concurrency=2, min_interval=0.0)
+            results = scraper.scrape_urls(urls)
+            assert len(results['new']) == 3, f"Expected 3 new pages: {results}"
+            assert len(results['failed']) == 1, "Missing page not reported as failed"
+            assert FixtureHandler.max_in_flight <= 2, f"Per-host limit exceeded: {FixtureHandler.max_in_flight}"
+            text = (Path(output_dir) / 'bafoeg_altersgrenze.html.txt').read_text(encoding='utf-8')
+            assert 'Altersgrenze liegt bei 45' in text and 'Menü' not in text, "Page text not extracted"
+            print(f"✓ First run saved 3 pages (max {FixtureHandler.max_in_flight} requests in flight)")
+
+            # Second run: unchanged pages are skipped (304 or same content hash)
+            FixtureHandler.requests.clear()
+            scraper = WebScraper(output_dir, min_interval=0.0)
+            results = scraper.scrape_urls(urls)
+            assert len(results['unchanged']) == 3, f"Expected 3 unchanged pages: {results}"
+            assert all(conditional for path, conditional in FixtureHandler.requests
+                       if path not in NO_VALIDATORS), "Conditional GET not sent"
+            print("✓ Second run: unchanged pages skipped via ETag and content hash")
+
+            # Changed page is re-downloaded and flagged for re-indexing
+            PAGES['/bafoeg/rueckzahlung.html'] = '<html><body><p>Die Hälfte ist ein Darlehen.</p></body></html>'
+            results = WebScraper(output_dir, min_interval=0.0).scrape_urls(urls)
+            assert results['changed'] == ['bafoeg_rueckzahlung.html.txt'], f"Change not detected: {results}"
+            print("✓ Changed page detected and flagged for re-indexing")
+
+            # Politeness: requests to one host are spaced by min_interval
+            scraper = WebScraper(str(Path(output_dir) / 'polite'), min_interval=0.2)
+            start = time.time()
+            scraper.scrape_urls(urls[:3])
+            assert time.time() - start >= 0.4, "Rate limit not applied"
+            print("✓ Per-host rate limit applied")
+    finally:
+        server.shutdown()
+
+    print("\n=== Scraper tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_scraper()
+        print("\n✅ All scraper tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Test script to verify server warm-up: status transitions, progress and load errors
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+import src.knowledge_base_loader as knowledge_base_loader
+from src.server_state import ServerState
+from test_kb_sync import StubHuggingFaceEmbeddings, write_files, FILES
+
+ENVIRONMENT = {'VECTOR_BACKEND': 'numpy', 'EMBEDDING_CACHE_DIR': '', 'ANSWER_CACHE_PATH': '',
+               'RERANK': 'false', 'FAQ_ANSWERS': 'false'}
+
+
+def make_state(tmp_dir, warmup_query=None):
+    kb_path = os.path.join(tmp_dir, "knowledge_base")
+    os.makedirs(kb_path, exist_ok=True)
+    write_files(kb_path, FILES)
+    return ServerState(knowledge_base_path=kb_path, persist_directory=os.path.join(tmp_dir, "db"),
+                       warmup_query=warmup_query)
+
+
+def record_stages(state):
+    """(stage, status, progress) as each stage begins"""
+    seen = []
+    begin = state._begin
+
+    def recording_begin(stage):
+        seen.append((stage, state.health()['status'], state.health()['progress']))
+        begin(stage)
+    state._begin = recording_begin
+    return seen
+
+
+def test_warmup():
+    """Test warming -> ok with progress per stage, and warming -> error with the failed stage"""
+    print("=== Testing Server Warm-up ===\n")
+
+    saved = {key: os.environ.get(key) for key in list(ENVIRONMENT) + ['EMBEDDING_BACKEND']}
+    original = knowledge_base_loader.HuggingFaceEmbeddings
+    os.environ.update(ENVIRONMENT)
+    knowledge_base_loader.HuggingFaceEmbeddings = StubHuggingFaceEmbeddings
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = make_state(tmp_dir, warmup_query="Was ist BAföG?")
+            health = state.health()
+            assert health['status'] == 'warming' and health['progress'] == 0.0 and not health['knowledge_base_loaded']
+            seen = record_stages(state)
+            state.start(background=True)
+            state._thread.join(timeout=60)
+
+            assert [stage for stage, _, _ in seen] == ServerState.STAGES, seen
+            assert all(status == 'warming' for _, status, _ in seen)
+            assert [progress for _, _, progress in seen] == [0.0, 0.2, 0.4, 0.6, 0.8], seen
+            print(f"✓ warming through {len(seen)} stages, progress {[p for _, _, p in seen]}")
+
+            health = state.health()
+            assert health['status'] == 'ok' and health['progress'] == 1.0 and health['stage'] is None, health
+            assert health['knowledge_base_loaded'] and 'error' not in health and 'warmup_seconds' in health
+            assert health['chatbot_pool'] is not None
+            print("✓ ok with progress 1.0 and the component stats")
+
+        os.environ['EMBEDDING_BACKEND'] = 'unknown'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = make_state(tmp_dir)
+            state.start(background=True)
+            state._thread.join(timeout=60)
+            health = state.health()
+            assert health['status'] == 'error' and not health['knowledge_base_loaded'], health
+            assert "Unknown EMBEDDING_BACKEND" in health['error'], health
+            assert health['failed_stage'] == 'embedding model' and health['stage'] is None, health
+            assert health['progress'] == 0.2 and 'chatbot_pool' not in health, health
+            print(f"✓ error reports the failed stage ({health['failed_stage']}) and the progress before it")
+    finally:
+        knowledge_base_loader.HuggingFaceEmbeddings = original
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    print("\n=== Server warm-up tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_warmup()
+        print("\n✅ All server state tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
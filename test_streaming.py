@@ -0,0 +1,102 @@
+"""
+Test script to verify streamed answers: event order, provider token usage and the SSE format
+"""
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from langchain_community.llms import OpenAI
+from src.numpy_vectorstore import NumpyVectorStore
+from src.stub_llm import StubLLM
+from src.fake_llm_server import FakeLLMServer
+from src.rag_chatbot import RAGChatbot
+from src.api_utils import sse_event
+from test_conversation_store import TermEmbeddings
+
+DOCUMENTS = [
+    Document(page_content="Der Höchstsatz für Studierende beträgt 992 Euro im Monat.",
+             metadata={'source': 'hoechstsatz.txt', 'url': 'https://example.org/hoechstsatz'}),
+    Document(page_content="Die Rückzahlung beginnt fünf Jahre nach der Förderungshöchstdauer.",
+             metadata={'source': 'rueckzahlung.txt', 'url': 'https://example.org/rueckzahlung'}),
+]
+
+
+def stream_events(llm, question):
+    with tempfile.TemporaryDirectory() as persist_directory:
+        vectorstore = NumpyVectorStore.from_documents(DOCUMENTS, TermEmbeddings(),
+                                                      persist_directory=persist_directory)
+        chatbot = RAGChatbot(vectorstore, llm=llm, k=1, retrieval_mode='similarity', api_key='test')
+        return list(chatbot.ask_stream(question))
+
+
+def test_event_order():
+    """Test that ask_stream yields sources, then tokens, then done"""
+    print("=== Testing Stream Event Order ===\n")
+
+    events = stream_events(StubLLM(), "Wie hoch ist der Höchstsatz für Studierende?")
+    types = [event['type'] for event in events]
+    assert types[0] == 'sources' and types[-1] == 'done', types
+    assert set(types[1:-1]) == {'token'}, types
+    assert events[0]['sources'][0].metadata['source'] == 'hoechstsatz.txt'
+    print(f"✓ Events in order: {types}")
+
+    done = events[-1]
+    assert done['answer'] == ''.join(event['token'] for event in events[1:-1])
+    assert "992 Euro" in done['answer']
+    # StubLLM reports no usage, so it is estimated
+    assert done['token_usage']['estimated'] is True
+    for stage in ('history', 'embedding', 'cache', 'retrieval', 'context', 'llm', 'total'):
+        assert stage in done['timings'], f"No {stage} timing"
+    print(f"✓ done event carries the joined answer, estimated usage and timings {sorted(done['timings'])}")
+    return True
+
+
+def test_provider_usage():
+    """Test that usage reported in the final stream chunk replaces the estimate"""
+    print("\n=== Testing Streamed Provider Usage ===\n")
+
+    with FakeLLMServer(latency=0.0, tokens_per_second=0, completion_tokens=5) as server:
+        llm = OpenAI(api_key='test', base_url=server.url, model='fake', temperature=0.7)
+        events = stream_events(llm, "Wann beginnt die Rückzahlung?")
+        assert server.requests == 1
+
+    tokens = [event['token'] for event in events if event['type'] == 'token']
+    assert tokens == [f"token{i} " for i in range(5)], tokens
+    usage = events[-1]['token_usage']
+    assert usage['estimated'] is False, usage
+    assert usage['completion_tokens'] == 5
+    assert usage['total_tokens'] == usage['prompt_tokens'] + 5
+    print(f"✓ {len(tokens)} tokens streamed, provider usage {usage}")
+    return True
+
+
+def test_sse_format():
+    """Test the server-sent event encoding"""
+    print("\n=== Testing SSE Format ===\n")
+
+    encoded = sse_event('token', {'token': 'Höchstsatz\n'})
+    assert encoded.endswith("\n\n") and encoded.count("\n\n") == 1
+    lines = encoded.rstrip("\n").split("\n")
+    assert lines[0] == "event: token", lines
+    assert lines[1].startswith("data: ") and len(lines) == 2, lines
+    assert json.loads(lines[1][len("data: "):]) == {'token': 'Höchstsatz\n'}
+    assert "Höchstsatz" in encoded, "Non-ASCII characters escaped"
+    print(f"✓ {encoded!r}")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_event_order()
+        test_provider_usage()
+        test_sse_format()
+        print("\n✅ All streaming tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
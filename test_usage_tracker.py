@@ -0,0 +1,108 @@
+"""
+Test script to verify token usage and cost reporting
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from langchain.schema import Document
+from langchain_community.llms import OpenAI
+from src.usage_tracker import UsageTracker
+from src.numpy_vectorstore import NumpyVectorStore
+from src.fake_llm_server import FakeLLMServer
+from src.rag_chatbot import RAGChatbot
+from test_conversation_store import TermEmbeddings
+
+
+def usage(prompt_tokens, completion_tokens, cost=None):
+    token_usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                   'total_tokens': prompt_tokens + completion_tokens}
+    if cost is not None:
+        token_usage['cost'] = cost
+    return token_usage
+
+
+def test_cost_report():
+    """Test priced, unpriced and partially priced totals"""
+    print("=== Testing Usage Report ===\n")
+
+    tracker = UsageTracker(prices={'priced-model': (1.0, 2.0)}, budget_tokens=1000)
+    tracker.record("key-a", "priced-model", usage(1000, 500))
+    tracker.record("key-a", "priced-model", usage(10, 10, cost=0.5))
+    report = tracker.report()
+    entry = next(iter(report['api_keys'].values()))
+    assert entry['cost'] == 0.502 and not entry['cost_partial'], entry
+    assert entry['models']['priced-model']['cost'] == 0.502
+    assert entry['budget_remaining'] == 1000 - 1520 and entry['over_budget']
+    print("✓ Priced requests: cost from TOKEN_PRICES and the provider's cost field")
+
+    tracker = UsageTracker(prices={})
+    tracker.record("key-b", "unknown-model", usage(100, 50))
+    report = tracker.report()
+    entry = next(iter(report['api_keys'].values()))
+    assert entry['cost'] is None and entry['models']['unknown-model']['cost'] is None, entry
+    assert entry['models']['unknown-model']['unpriced_requests'] == 1
+    assert report['total_cost'] is None and not report['total_cost_partial']
+    assert report['total_tokens'] == 150
+    print("✓ No priced request: cost is None, not 0.0")
+
+    tracker = UsageTracker(prices={'priced-model': (1.0, 2.0)})
+    tracker.record("key-c", "priced-model", usage(1000, 0))
+    tracker.record("key-c", "unknown-model", usage(1000, 0))
+    report = tracker.report()
+    entry = next(iter(report['api_keys'].values()))
+    assert entry['cost'] == 0.001 and entry['cost_partial'], entry
+    assert not entry['models']['priced-model']['cost_partial']
+    assert entry['models']['unknown-model']['cost'] is None
+    assert report['total_cost'] == 0.001 and report['total_cost_partial']
+    print("✓ Some requests priced: cost covers them and is flagged partial")
+
+    print("\n=== Usage report tests passed! ===")
+    return True
+
+
+def test_provider_usage():
+    """Test that usage and cost reported by the LLM server reach the tracker"""
+    print("\n=== Testing Provider Usage ===\n")
+
+    documents = [Document(page_content="Der Höchstsatz beträgt 992 Euro im Monat.",
+                          metadata={'source': 'hoechstsatz.txt'})]
+    tracker = UsageTracker(prices={})
+    with tempfile.TemporaryDirectory() as persist_directory, \
+            FakeLLMServer(latency=0.0, tokens_per_second=0, completion_tokens=4, price=2.0) as server:
+        vectorstore = NumpyVectorStore.from_documents(documents, TermEmbeddings(),
+                                                      persist_directory=persist_directory)
+        llm = OpenAI(api_key='key-a', base_url=server.url, model='fake', temperature=0.7)
+        chatbot = RAGChatbot(vectorstore, api_key='key-a', model='fake', llm=llm, k=1,
+                             retrieval_mode='similarity', usage_tracker=tracker)
+        result = chatbot.ask("Wie hoch ist der Höchstsatz?")
+        streamed = list(chatbot.ask_stream("Wie hoch ist der Höchstsatz für Studierende?"))[-1]
+
+    for token_usage in (result['token_usage'], streamed['token_usage']):
+        assert token_usage['estimated'] is False and token_usage['completion_tokens'] == 4, token_usage
+        assert token_usage['cost'] == token_usage['total_tokens'] * 2.0 / 1_000_000, token_usage
+    print(f"✓ Provider usage with cost from the response: {result['token_usage']}")
+
+    entry = next(iter(tracker.report()['api_keys'].values()))['models']['fake']
+    total_tokens = result['token_usage']['total_tokens'] + streamed['token_usage']['total_tokens']
+    assert entry['requests'] == 2 and entry['estimated_requests'] == 0, entry
+    assert entry['total_tokens'] == total_tokens
+    assert entry['cost'] == round(total_tokens * 2.0 / 1_000_000, 6) and entry['unpriced_requests'] == 0, entry
+    print(f"✓ Tracker priced both calls from the provider's cost without TOKEN_PRICES: {entry['cost']}")
+
+    print("\n=== Provider usage tests passed! ===")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        test_cost_report()
+        test_provider_usage()
+        print("\n✅ All usage tracker tests passed!")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)